@@ -0,0 +1,11 @@
+# dashboard/benchmark/__init__.py
+"""
+Bộ công cụ đo hiệu năng của dashboard:
+- generator: sinh dữ liệu bán hàng dạng Superstore xác định theo seed (10k/100k/1M dòng)
+- scenarios: các endpoint và tổ hợp bộ lọc cần đo
+- runner: đo tốc độ nhập, thời gian/số truy vấn/bộ nhớ của từng endpoint, xuất JSON
+
+Dùng qua các lệnh `manage.py generate_benchmark_data` và `manage.py run_benchmark`.
+"""
+
+from .generator import SIZES, default_path, generate_frame, parse_size, write_dataset
@@ -0,0 +1,209 @@
+# dashboard/benchmark/generator.py
+
+import datetime
+import os
+
+import numpy as np
+import pandas as pd
+
+# Các kích thước dữ liệu chuẩn
+SIZES = {
+    '10k': 10_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+
+# Thị trường -> (mã trong Order ID, vùng, tỷ trọng đơn hàng, [quốc gia])
+MARKETS = {
+    'APAC': ('AP', 'Asia Pacific', 0.21, ['Australia', 'China', 'India', 'Indonesia', 'Japan', 'Philippines']),
+    'EU': ('EU', 'Europe', 0.19, ['France', 'Germany', 'United Kingdom', 'Italy', 'Spain', 'Netherlands']),
+    'US': ('US', 'North America', 0.19, ['United States']),
+    'LATAM': ('LA', 'Latin America', 0.20, ['Mexico', 'Brazil', 'Argentina', 'Chile', 'Colombia']),
+    'EMEA': ('EM', 'EMEA', 0.10, ['Turkey', 'Saudi Arabia', 'Israel', 'Ukraine']),
+    'Africa': ('AF', 'Africa', 0.09, ['Nigeria', 'Egypt', 'South Africa', 'Morocco']),
+    'Canada': ('CA', 'North America', 0.02, ['Canada']),
+}
+
+# Toạ độ (vĩ độ, kinh độ) của các quốc gia, dùng cho bản đồ
+COUNTRY_COORDINATES = {
+    'Australia': (-25.27, 133.78), 'China': (35.86, 104.20), 'India': (20.59, 78.96),
+    'Indonesia': (-0.79, 113.92), 'Japan': (36.20, 138.25), 'Philippines': (12.88, 121.77),
+    'France': (46.23, 2.21), 'Germany': (51.17, 10.45), 'United Kingdom': (55.38, -3.44),
+    'Italy': (41.87, 12.57), 'Spain': (40.46, -3.75), 'Netherlands': (52.13, 5.29),
+    'United States': (37.09, -95.71), 'Mexico': (23.63, -102.55), 'Brazil': (-14.24, -51.93),
+    'Argentina': (-38.42, -63.62), 'Chile': (-35.68, -71.54), 'Colombia': (4.57, -74.30),
+    'Turkey': (38.96, 35.24), 'Saudi Arabia': (23.89, 45.08), 'Israel': (31.05, 34.85),
+    'Ukraine': (48.38, 31.17), 'Nigeria': (9.08, 8.68), 'Egypt': (26.82, 30.80),
+    'South Africa': (-30.56, 22.94), 'Morocco': (31.79, -7.09), 'Canada': (56.13, -106.35),
+}
+
+# Danh mục -> danh mục con (giống bộ dữ liệu Global Superstore)
+CATEGORIES = {
+    'Furniture': ['Bookcases', 'Chairs', 'Furnishings', 'Tables'],
+    'Office Supplies': ['Appliances', 'Art', 'Binders', 'Envelopes', 'Fasteners',
+                        'Labels', 'Paper', 'Storage', 'Supplies'],
+    'Technology': ['Accessories', 'Copiers', 'Machines', 'Phones'],
+}
+
+# Phân khúc khách hàng và tỷ trọng
+SEGMENTS = {'Consumer': 0.52, 'Corporate': 0.30, 'Home Office': 0.18}
+
+BRANDS = ['Acme', 'Apex', 'Bravo', 'Cisco', 'Eldon', 'Fellowes', 'Hon', 'Logitech', 'Novimex', 'Smead']
+STATES_PER_COUNTRY = 6
+CITIES_PER_STATE = 5
+PRODUCTS_PER_SUBCATEGORY = 40
+DISCOUNTS = [0.0, 0.1, 0.2, 0.3, 0.5]
+DISCOUNT_WEIGHTS = [0.55, 0.2, 0.15, 0.05, 0.05]
+FIRST_DATE = datetime.date(2011, 1, 1)
+DAYS = 4 * 365 + 1
+
+# Thứ tự cột giống file Excel gốc mà import_data_streaming đọc
+COLUMNS = [
+    'Row ID', 'Order ID', 'Order Date', 'Customer ID', 'Segment',
+    'City', 'State', 'Country', 'Country latitude', 'Country longitude', 'Market', 'Region',
+    'Category', 'Subcategory', 'Product', 'Sales', 'Quantity', 'Discount', 'Profit',
+]
+
+
+def parse_size(value):
+    """Số dòng từ tên kích thước chuẩn (10k, 100k, 1m) hoặc một số nguyên"""
+    value = str(value).lower().replace('_', '')
+    if value in SIZES:
+        return SIZES[value]
+    try:
+        rows = int(value)
+    except ValueError:
+        raise ValueError(f"Kích thước không hợp lệ: {value} (dùng {', '.join(SIZES)} hoặc một số nguyên)")
+    if rows <= 0:
+        raise ValueError("Số dòng phải lớn hơn 0")
+    return rows
+
+
+def _geography():
+    """Bảng địa lý: danh sách (thành phố, bang, quốc gia, thị trường) và tỷ trọng của từng thành phố"""
+    cities, weights = [], []
+    for market, (_, _, market_weight, countries) in MARKETS.items():
+        for country in countries:
+            for state in range(STATES_PER_COUNTRY):
+                for city in range(CITIES_PER_STATE):
+                    cities.append((f'{country} City {state}-{city}', f'{country} State {state}', country, market))
+                    weights.append(market_weight / len(countries) / STATES_PER_COUNTRY / CITIES_PER_STATE)
+    return cities, np.array(weights) / sum(weights)
+
+
+def _catalog(rng):
+    """Danh mục sản phẩm: (tên, danh mục con, danh mục, giá cơ sở, tỷ suất lợi nhuận cơ sở)"""
+    products = []
+    for category, subcategories in CATEGORIES.items():
+        for subcategory in subcategories:
+            for model in range(PRODUCTS_PER_SUBCATEGORY):
+                name = f'{BRANDS[model % len(BRANDS)]} {subcategory} {model + 1:03d}'
+                products.append((name, subcategory, category))
+    prices = np.round(rng.lognormal(mean=4.0, sigma=1.1, size=len(products)), 2) + 1
+    margins = rng.normal(0.15, 0.1, size=len(products))
+    return products, prices, margins
+
+
+def generate_frame(rows, seed=42, start_row=1):
+    """
+    Sinh DataFrame dữ liệu bán hàng dạng Superstore với rows dòng.
+    Cùng seed luôn cho cùng dữ liệu; start_row cho phép sinh thêm các lô Row ID nối tiếp.
+    """
+    rng = np.random.default_rng(seed)
+    cities, city_weights = _geography()
+    products, prices, margins = _catalog(rng)
+
+    # Khách hàng: mã dạng 'AB-10001', phân khúc cố định cho mỗi khách hàng
+    customer_count = max(20, rows // 30)
+    letters = np.array(list('ABCDEFGHIJKLMNOPQRSTUVWXYZ'))
+    customer_index = np.arange(customer_count)
+    customer_ids = np.char.add(
+        np.char.add(letters[customer_index % 26], letters[customer_index // 26 % 26]),
+        np.char.add('-', (10000 + customer_index).astype(str))
+    ).astype(object)
+    customer_segments = rng.choice(list(SEGMENTS), size=customer_count, p=list(SEGMENTS.values()))
+
+    # Đơn hàng: mỗi đơn 1-8 dòng (trung bình khoảng 2)
+    lines_per_order = np.minimum(rng.geometric(0.5, size=rows), 8)
+    order_count = int(np.searchsorted(np.cumsum(lines_per_order), rows)) + 1
+    lines_per_order = lines_per_order[:order_count]
+    lines_per_order[-1] -= lines_per_order.sum() - rows
+
+    # Thuộc tính cấp đơn hàng: ngày (tăng dần theo thời gian), khách hàng, thành phố
+    days = np.floor(DAYS * rng.random(order_count) ** 0.8).astype(int)
+    order_dates = np.datetime64(FIRST_DATE) + days
+    order_customers = rng.integers(0, customer_count, size=order_count)
+    order_cities = rng.choice(len(cities), size=order_count, p=city_weights)
+    city_table = np.array(cities, dtype=object)
+    market_codes = np.array([MARKETS[city[3]][0] for city in cities], dtype=object)
+    years = order_dates.astype('datetime64[Y]').astype(int) + 1970
+    order_ids = np.array([
+        f'{code}-{year}-{100000 + number}'
+        for number, (code, year) in enumerate(zip(market_codes[order_cities], years))
+    ], dtype=object)
+
+    # Mở rộng đơn hàng thành từng dòng
+    line_order = np.repeat(np.arange(order_count), lines_per_order)
+    line_city = city_table[order_cities[line_order]]
+    line_customer = order_customers[line_order]
+
+    # Sản phẩm, số lượng, giảm giá, doanh số và lợi nhuận của từng dòng
+    line_product = rng.integers(0, len(products), size=rows)
+    product_table = np.array(products, dtype=object)
+    quantity = np.minimum(rng.geometric(0.3, size=rows), 14)
+    discount = rng.choice(DISCOUNTS, size=rows, p=DISCOUNT_WEIGHTS)
+    sales = np.round(prices[line_product] * quantity * (1 - discount) * rng.uniform(0.9, 1.1, size=rows), 2)
+    margin = margins[line_product] - discount * 1.2 + rng.normal(0, 0.05, size=rows)
+    profit = np.round(sales * margin, 2)
+
+    countries = line_city[:, 2]
+    coordinates = np.array([COUNTRY_COORDINATES[country] for country in countries]).reshape(-1, 2)
+    markets = line_city[:, 3]
+    return pd.DataFrame({
+        'Row ID': np.arange(start_row, start_row + rows),
+        'Order ID': order_ids[line_order],
+        'Order Date': pd.to_datetime(order_dates[line_order]),
+        'Customer ID': customer_ids[line_customer],
+        'Segment': customer_segments[line_customer],
+        'City': line_city[:, 0],
+        'State': line_city[:, 1],
+        'Country': countries,
+        'Country latitude': coordinates[:, 0],
+        'Country longitude': coordinates[:, 1],
+        'Market': markets,
+        'Region': np.array([MARKETS[market][1] for market in markets], dtype=object),
+        'Category': product_table[line_product, 2],
+        'Subcategory': product_table[line_product, 1],
+        'Product': product_table[line_product, 0],
+        'Sales': sales,
+        'Quantity': quantity,
+        'Discount': discount,
+        'Profit': profit,
+    }, columns=COLUMNS)
+
+
+def default_path(size, file_format='csv', seed=42):
+    """Đường dẫn mặc định của file dữ liệu benchmark (tái sử dụng giữa các lần chạy)"""
+    from django.conf import settings
+
+    return os.path.join(settings.BASE_DIR, '.cache', 'benchmark', f'superstore-{size}-seed{seed}.{file_format}')
+
+
+def write_dataset(path, rows, seed=42):
+    """Sinh dữ liệu và ghi ra file theo phần mở rộng (.csv, .xlsx, .parquet)"""
+    file_format = os.path.splitext(path)[1].lower().lstrip('.')
+    if file_format not in ('csv', 'xlsx', 'parquet'):
+        raise ValueError(f"Định dạng file không được hỗ trợ: .{file_format}")
+
+    frame = generate_frame(rows, seed=seed)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if file_format == 'csv':
+        frame.to_csv(path, index=False, date_format='%Y-%m-%d')
+    elif file_format == 'xlsx':
+        frame.to_excel(path, index=False, engine='openpyxl')
+    else:
+        try:
+            frame.to_parquet(path, index=False)
+        except ImportError:
+            raise ValueError("Cần cài đặt pyarrow để ghi file Parquet")
+    return path
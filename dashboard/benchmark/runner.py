@@ -0,0 +1,309 @@
+# dashboard/benchmark/runner.py
+
+import asyncio
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+
+import django
+from asgiref.sync import ThreadSensitiveContext, async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.db import close_old_connections, connection, connections
+from django.test import AsyncRequestFactory, RequestFactory, override_settings
+from django.urls import resolve
+
+from ..perf import percentile
+from ..serialization import compress
+from ..utils import CHUNK_SIZE, import_data_streaming
+from .scenarios import ASYNC_ENDPOINTS, ENDPOINTS, scenarios
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class QueryCounter:
+    """execute_wrapper đếm số câu lệnh SQL và tổng thời gian chờ DB (không lưu SQL)"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.count += 1
+                self.seconds += elapsed
+
+
+@contextmanager
+def _counting_queries(counter):
+    """Gắn counter vào kết nối của mọi alias (các truy vấn đọc đi qua kết nối chỉ đọc)"""
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(counter))
+        yield counter
+
+
+def peak_rss_mb():
+    """Bộ nhớ thường trú lớn nhất của tiến trình từ lúc khởi động (MB), None nếu không đo được"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux trả về KB, macOS trả về byte
+    return round(peak / (1 << 20 if sys.platform == 'darwin' else 1 << 10), 1)
+
+
+def environment():
+    """Thông tin môi trường để so sánh kết quả giữa các commit"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'engine': getattr(settings, 'DASHBOARD_ENGINE', 'orm'),
+        'widget_workers': getattr(settings, 'DASHBOARD_WIDGET_WORKERS', 1),
+        'widget_pool_size': getattr(settings, 'DASHBOARD_WIDGET_POOL_SIZE', 4),
+        'machine': platform.machine(),
+    }
+
+
+def benchmark_import(path, chunk_size=CHUNK_SIZE):
+    """Nhập file và đo thời gian, tốc độ (dòng/giây), số truy vấn và bộ nhớ"""
+    counter = QueryCounter()
+    started = time.perf_counter()
+    with _counting_queries(counter):
+        success, message, report = import_data_streaming(path, chunk_size=chunk_size)
+    seconds = time.perf_counter() - started
+    if not success:
+        raise RuntimeError(message)
+    return {
+        'file': os.path.basename(path),
+        'file_mb': round(os.path.getsize(path) / (1 << 20), 2),
+        'rows': report['rows'],
+        'seconds': round(seconds, 3),
+        'rows_per_second': round(report['rows'] / seconds) if seconds else None,
+        'queries': counter.count,
+        'db_seconds': round(counter.seconds, 3),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def benchmark_endpoint(path, query_string, iterations=5):
+    """
+    Đo một endpoint: lần gọi đầu (có thể gồm nạp dữ liệu/làm nóng), các lần gọi tiếp theo,
+    số truy vấn, kích thước response (gốc và sau khi nén gzip) và bộ nhớ Python cấp phát
+    nhiều nhất trong một lần gọi.
+    """
+    view = resolve(path).func
+    if iscoroutinefunction(view):
+        view = async_to_sync(view)
+    request = RequestFactory().get(f'{path}?{query_string}')
+
+    counter = QueryCounter()
+    started = time.perf_counter()
+    with _counting_queries(counter):
+        response = view(request)
+    first = time.perf_counter() - started
+
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        view(request)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+
+    tracemalloc.start()
+    try:
+        view(request)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'endpoint': path,
+        'query': query_string,
+        'status': response.status_code,
+        'bytes': len(response.content),
+        'gzip_bytes': len(compress(response.content, 'gzip')),
+        'queries': counter.count,
+        'db_ms': round(counter.seconds * 1000, 2),
+        'first_ms': round(first * 1000, 2),
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 2),
+        'p50_ms': round(percentile(timings, 50) * 1000, 2),
+        'p95_ms': round(percentile(timings, 95) * 1000, 2),
+        'min_ms': round(timings[0] * 1000, 2),
+        'peak_alloc_kb': round(peak / 1024, 1),
+    }
+
+
+def _latency_summary(timings, seconds):
+    """Thông lượng và phân vị độ trễ của một loạt request chạy đồng thời"""
+    timings = sorted(timings)
+    return {
+        'requests_per_second': round(len(timings) / seconds, 1) if seconds else None,
+        'p50_ms': round(percentile(timings, 50) * 1000, 2),
+        'p95_ms': round(percentile(timings, 95) * 1000, 2),
+        'max_ms': round(timings[-1] * 1000, 2),
+    }
+
+
+def _run_threaded(view, url, clients, requests):
+    """Mỗi client một luồng (như server WSGI nhiều luồng), kết nối DB xử lý như sau mỗi request của Django"""
+    factory = RequestFactory()
+
+    def call():
+        started = time.perf_counter()
+        try:
+            view(factory.get(url))
+        finally:
+            close_old_connections()
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        timings = list(executor.map(lambda _: call(), range(requests)))
+    return _latency_summary(timings, time.perf_counter() - started)
+
+
+def _run_async(view, url, clients, requests):
+    """Mọi client trên một event loop (như server ASGI), tối đa clients request cùng lúc"""
+    factory = AsyncRequestFactory()
+
+    async def run():
+        limit = asyncio.Semaphore(clients)
+
+        async def call():
+            async with limit:
+                started = time.perf_counter()
+                # Mỗi request có luồng đồng bộ riêng như ASGIHandler của Django
+                async with ThreadSensitiveContext():
+                    await view(factory.get(url))
+                return time.perf_counter() - started
+
+        started = time.perf_counter()
+        timings = await asyncio.gather(*(call() for _ in range(requests)))
+        return _latency_summary(timings, time.perf_counter() - started)
+
+    return asyncio.run(run())
+
+
+def benchmark_concurrency(path, query_string, clients, requests):
+    """
+    So sánh một API trang dưới nhiều client đồng thời theo ba cách phục vụ:
+    - sync_serial: view đồng bộ, mỗi client một luồng, các widget tính tuần tự
+    - sync: view đồng bộ, các widget chạy song song trên pool dùng chung (DASHBOARD_WIDGET_POOL_SIZE luồng)
+    - async: view async trên một event loop, các widget chạy đồng thời (asyncio.gather)
+    """
+    url = f'{path}?{query_string}'
+    async_path = ASYNC_ENDPOINTS[path]
+    sync_view = resolve(path).func
+    async_view = resolve(async_path).func
+    # Làm nóng (nạp dữ liệu cột, mở kết nối) trước khi đo
+    sync_view(RequestFactory().get(url))
+
+    result = {'endpoint': path, 'async_endpoint': async_path, 'query': query_string,
+              'clients': clients, 'requests': requests}
+    with override_settings(DASHBOARD_WIDGET_WORKERS=1):
+        result['sync_serial'] = _run_threaded(sync_view, url, clients, requests)
+    with override_settings(DASHBOARD_WIDGET_WORKERS=getattr(settings, 'DASHBOARD_WIDGET_POOL_SIZE', 4)):
+        result['sync'] = _run_threaded(sync_view, url, clients, requests)
+    result['async'] = _run_async(async_view, f'{async_path}?{query_string}', clients, requests)
+    return result
+
+
+def run_benchmark(dataset=None, iterations=5, chunk_size=CHUNK_SIZE, endpoints=None, engines=None,
+                  use_cache=False, clients=None, log=None):
+    """
+    Chạy benchmark trên DB hiện tại: nhập dataset (nếu có) rồi đo mọi endpoint với mọi tổ hợp
+    bộ lọc, cho từng backend trong engines (mặc định theo DASHBOARD_ENGINE).
+    Với clients (danh sách số client đồng thời), so sánh thêm view đồng bộ và async của các
+    API trang (tổ hợp bộ lọc đầu tiên, iterations request mỗi client).
+    Cache dùng alias 'default' để không ảnh hưởng cache dùng chung của server,
+    không làm nóng cache sau khi nhập để các lần đo đầu tiên vẫn là truy vấn thật.
+    Trả về dict có thể ghi ra JSON.
+    """
+    log = log or (lambda message: None)
+    engines = engines or [getattr(settings, 'DASHBOARD_ENGINE', 'orm')]
+    results = {'environment': environment(), 'iterations': iterations, 'import': None, 'endpoints': [],
+               'concurrency': []}
+
+    with override_settings(DASHBOARD_CACHE_ALIAS='default', DASHBOARD_CACHE_ENABLED=use_cache,
+                           DASHBOARD_WARM_ON_IMPORT=False):
+        if dataset:
+            log(f"Nhập {dataset}...")
+            results['import'] = benchmark_import(dataset, chunk_size)
+            log(f"  {results['import']['rows']} dòng, {results['import']['rows_per_second']} dòng/giây")
+        for engine in engines:
+            with override_settings(DASHBOARD_ENGINE=engine):
+                for path, query_string in scenarios(endpoints):
+                    result = {'engine': engine, **benchmark_endpoint(path, query_string, iterations)}
+                    results['endpoints'].append(result)
+                    log(f"  [{engine}] {path}?{query_string}: p50 {result['p50_ms']} ms, "
+                        f"{result['queries']} truy vấn")
+                for count in clients or []:
+                    for path in endpoints or ENDPOINTS:
+                        if path not in ASYNC_ENDPOINTS:
+                            continue
+                        query_string = scenarios([path])[0][1]
+                        result = {'engine': engine,
+                                  **benchmark_concurrency(path, query_string, count, count * iterations)}
+                        results['concurrency'].append(result)
+                        log(f"  [{engine}] {path} x{count} client: " + ', '.join(
+                            f"{mode} p50 {result[mode]['p50_ms']} ms ({result[mode]['requests_per_second']} req/s)"
+                            for mode in ('sync_serial', 'sync', 'async')
+                        ))
+    results['peak_rss_mb'] = peak_rss_mb()
+    return results
+
+
+def compare_results(previous, current):
+    """
+    So sánh hai kết quả benchmark: tỷ lệ p50 (hiện tại / trước) theo endpoint và bộ lọc,
+    cùng tỷ lệ tốc độ nhập. Tỷ lệ > 1 nghĩa là chậm hơn.
+    """
+    def key(row):
+        return row.get('engine', 'orm'), row['endpoint'], row['query']
+
+    before = {key(row): row for row in previous.get('endpoints', [])}
+    rows = []
+    for row in current.get('endpoints', []):
+        old = before.get(key(row))
+        if old is None:
+            continue
+        rows.append({
+            'engine': row.get('engine', 'orm'),
+            'endpoint': row['endpoint'],
+            'query': row['query'],
+            'p50_before': old['p50_ms'],
+            'p50_after': row['p50_ms'],
+            'ratio': round(row['p50_ms'] / old['p50_ms'], 2) if old['p50_ms'] else None,
+            'queries_before': old['queries'],
+            'queries_after': row['queries'],
+        })
+    comparison = {'endpoints': rows, 'import_ratio': None}
+    if previous.get('import') and current.get('import') and current['import']['rows_per_second']:
+        comparison['import_ratio'] = round(
+            previous['import']['rows_per_second'] / current['import']['rows_per_second'], 2
+        )
+    return comparison
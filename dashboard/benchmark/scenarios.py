@@ -0,0 +1,69 @@
+# dashboard/benchmark/scenarios.py
+
+from ..models import Category, CustomerSegment, Market, Product, SalesRollup, Subcategory
+
+# Các API dữ liệu và những tổ hợp bộ lọc được đo ({...} được thay bằng id/năm có trong DB)
+ENDPOINTS = {
+    '/api/overview-data/': [
+        '', 'year={year}', 'year={year}&quarter=2', 'month=5', 'year={year}&month=5',
+        'market_id={market_id}', 'segment_id={segment_id}', 'category_id={category_id}',
+        'format=compact',
+    ],
+    '/api/market-data/': ['', 'market_id={market_id}', 'format=compact'],
+    '/api/customer-data/': ['', 'segment_id={segment_id}', 'format=compact'],
+    '/api/product-data/': [
+        '', 'category_id={category_id}', 'subcategory_id={subcategory_id}', 'product_id={product_id}',
+        'format=compact',
+    ],
+    '/api/product-metrics/': [
+        '', 'sort=margin&order=asc&limit=100', 'q=phone&fields=product,sales', 'limit=200&format=compact',
+    ],
+    '/api/async/overview-data/': ['', 'year={year}'],
+    '/api/async/market-data/': [''],
+    '/api/async/customer-data/': [''],
+    '/api/async/product-data/': [''],
+    '/api/top-n/': ['', 'year={year}&group=region&item=customer&metric=profit'],
+    '/api/timeseries/': [
+        '', 'granularity=week&measures=sales,profit,orders',
+        'start={year}-01-01&end={year}-12-31&granularity=month&market_id={market_id}',
+    ],
+    '/api/cohorts/': ['', 'segment_id={segment_id}'],
+    '/api/rfm/top-customers/': ['', 'n=50&order=score&segment_id={segment_id}', 'rfm_segment=champions'],
+    '/api/rfm/distribution/': ['', 'segment_id={segment_id}'],
+    '/api/rfm/breakdown/': [''],
+    '/api/widgets/': [
+        'widgets=sales_by_market,top_customers,sales_by_month_day',
+        'widgets=overview_kpi,sales_by_market,profit_by_category&year={year}',
+    ],
+}
+
+# API trang đồng bộ -> bản async tương ứng (so sánh khi có nhiều client đồng thời)
+ASYNC_ENDPOINTS = {
+    '/api/overview-data/': '/api/async/overview-data/',
+    '/api/market-data/': '/api/async/market-data/',
+    '/api/customer-data/': '/api/async/customer-data/',
+    '/api/product-data/': '/api/async/product-data/',
+}
+
+
+def sample_params():
+    """Giá trị mẫu cho các bộ lọc: năm gần nhất và id đầu tiên của mỗi dimension"""
+    latest = SalesRollup.objects.order_by('-year').values_list('year', flat=True).first()
+    return {
+        'year': latest or 2014,
+        'market_id': Market.objects.values_list('id', flat=True).first() or 1,
+        'segment_id': CustomerSegment.objects.values_list('id', flat=True).first() or 1,
+        'category_id': Category.objects.values_list('id', flat=True).first() or 1,
+        'subcategory_id': Subcategory.objects.values_list('id', flat=True).first() or 1,
+        'product_id': Product.objects.values_list('id', flat=True).first() or 1,
+    }
+
+
+def scenarios(endpoints=None):
+    """Danh sách (endpoint, query string) cần đo, với giá trị mẫu lấy từ DB hiện tại"""
+    samples = sample_params()
+    return [
+        (path, template.format(**samples))
+        for path in (endpoints or ENDPOINTS)
+        for template in ENDPOINTS[path]
+    ]
@@ -0,0 +1,228 @@
+# dashboard/cache.py
+
+import hashlib
+import threading
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .queries import parse_int
+from .serialization import format_error
+
+# Khoá lưu phiên bản dữ liệu hiện tại; mọi khoá cache đều chứa phiên bản này
+DATA_VERSION_KEY = 'dashboard:data-version'
+
+# Các tham số lọc được chuẩn hoá về số nguyên trước khi tạo khoá
+INTEGER_PARAMS = [
+    'year', 'month', 'quarter',
+    'market_id', 'segment_id',
+    'category_id', 'subcategory_id', 'product_id',
+    'top_n', 'bin_width', 'max_bin', 'limit',
+]
+
+# Bộ đếm hit/miss theo endpoint (trong bộ nhớ của tiến trình hiện tại)
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def get_cache():
+    """Cache backend dùng cho dữ liệu dashboard"""
+    return caches[getattr(settings, 'DASHBOARD_CACHE_ALIAS', 'default')]
+
+
+def get_data_version():
+    """
+    Phiên bản dữ liệu hiện tại (timestamp nano giây của lần nhập gần nhất).
+    Nếu khoá bị mất khỏi cache, một phiên bản mới được tạo nên không thể trùng với khoá cũ.
+    """
+    cache = get_cache()
+    version = cache.get(DATA_VERSION_KEY)
+    if version is None:
+        cache.add(DATA_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(DATA_VERSION_KEY)
+    return version
+
+
+def bump_data_version():
+    """Đổi phiên bản dữ liệu: toàn bộ response đã cache trở nên vô hiệu cùng lúc"""
+    version = time.time_ns()
+    get_cache().set(DATA_VERSION_KEY, version, timeout=None)
+    return version
+
+
+def normalize_params(query_dict):
+    """Chuẩn hoá tham số truy vấn: bỏ giá trị rỗng, chuẩn hoá số nguyên và sắp xếp theo tên"""
+    params = []
+    for name in sorted(query_dict.keys()):
+        for value in sorted(query_dict.getlist(name)):
+            value = value.strip()
+            if not value:
+                continue
+            number = parse_int(value) if name in INTEGER_PARAMS else None
+            if number is not None:
+                value = str(number)
+            params.append((name, value))
+    return params
+
+
+def _params_digest(endpoint, query_dict):
+    """Mã băm của endpoint và tham số đã chuẩn hoá"""
+    return hashlib.md5(f"{endpoint}?{urlencode(normalize_params(query_dict))}".encode()).hexdigest()
+
+
+def cache_key(endpoint, query_dict, version=None):
+    """Khoá cache = phiên bản dữ liệu + endpoint + tham số đã chuẩn hoá"""
+    if version is None:
+        version = get_data_version()
+    return f'dashboard:{version}:{endpoint}:{_params_digest(endpoint, query_dict)}'
+
+
+def etag_for(endpoint, query_dict, version=None):
+    """ETag mạnh của response: đổi khi dữ liệu được nhập lại hoặc tham số lọc khác đi"""
+    if version is None:
+        version = get_data_version()
+    return f'"{version:x}-{_params_digest(endpoint, query_dict)}"'
+
+
+def _record(endpoint, hit):
+    """Cập nhật bộ đếm hit/miss"""
+    with _stats_lock:
+        counters = _stats.setdefault(endpoint, {'hits': 0, 'misses': 0})
+        counters['hits' if hit else 'misses'] += 1
+
+
+def cache_stats():
+    """Thống kê hit/miss theo endpoint và tổng cộng"""
+    with _stats_lock:
+        endpoints = {name: dict(counters) for name, counters in _stats.items()}
+    hits = sum(counters['hits'] for counters in endpoints.values())
+    misses = sum(counters['misses'] for counters in endpoints.values())
+    for counters in endpoints.values():
+        total = counters['hits'] + counters['misses']
+        counters['hit_ratio'] = round(counters['hits'] / total, 4) if total else None
+    return {
+        'data_version': get_data_version(),
+        'endpoints': endpoints,
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else None,
+    }
+
+
+def cached_api(view):
+    """
+    Decorator cho các API JSON: lưu nội dung response theo endpoint và tham số lọc,
+    tự động vô hiệu khi phiên bản dữ liệu thay đổi sau mỗi lần nhập.
+    Dùng được cho cả view đồng bộ và view async (thao tác cache chạy trên luồng phụ).
+    """
+    endpoint = view.__name__
+
+    def lookup(request):
+        """(khoá cache, response đã cache hoặc None); khoá None khi request không dùng cache"""
+        if request.method != 'GET' or not getattr(settings, 'DASHBOARD_CACHE_ENABLED', True):
+            return None, None
+
+        key = cache_key(endpoint, request.GET)
+        content = get_cache().get(key)
+        if content is None:
+            _record(endpoint, hit=False)
+            return key, None
+
+        _record(endpoint, hit=True)
+        response = HttpResponse(content, content_type='application/json')
+        response['X-Cache'] = 'HIT'
+        return key, response
+
+    def store(key, response):
+        """Lưu response thành công vào cache"""
+        if response.status_code == 200:
+            get_cache().set(key, response.content, getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', None))
+        response['X-Cache'] = 'MISS'
+        return response
+
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            key, cached = await sync_to_async(lookup, thread_sensitive=False)(request)
+            if cached is not None:
+                return cached
+            response = await view(request, *args, **kwargs)
+            if key is None:
+                return response
+            return await sync_to_async(store, thread_sensitive=False)(key, response)
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key, cached = lookup(request)
+        if cached is not None:
+            return cached
+        response = view(request, *args, **kwargs)
+        if key is None:
+            return response
+        return store(key, response)
+
+    return wrapper
+
+
+def conditional_api(view):
+    """
+    Decorator cho các API JSON: gắn ETag và Last-Modified theo phiên bản dữ liệu,
+    trả về 304 khi If-None-Match (hoặc If-Modified-Since) khớp mà không chạy truy vấn nào.
+    Tham số format= không hợp lệ bị từ chối (400) trước khi view tính dữ liệu.
+    Dùng được cho cả view đồng bộ và view async.
+    """
+    endpoint = view.__name__
+
+    def check(request):
+        """(ETag, Last-Modified, response 304 hoặc None) theo phiên bản dữ liệu hiện tại"""
+        version = get_data_version()
+        etag = etag_for(endpoint, request.GET, version)
+        last_modified = version // 10 ** 9
+        return etag, last_modified, get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+    def finish(response, etag, last_modified):
+        """Gắn các header kiểm tra phiên bản vào response thành công"""
+        if response.status_code == 200:
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            # Trình duyệt luôn hỏi lại server, nhưng chỉ tải lại khi dữ liệu đổi
+            patch_cache_control(response, no_cache=True)
+        return response
+
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            error = format_error(request)
+            if error is not None:
+                return error
+            if request.method not in ('GET', 'HEAD'):
+                return await view(request, *args, **kwargs)
+            etag, last_modified, not_modified = await sync_to_async(check, thread_sensitive=False)(request)
+            if not_modified is not None:
+                return not_modified
+            return finish(await view(request, *args, **kwargs), etag, last_modified)
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        error = format_error(request)
+        if error is not None:
+            return error
+        if request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+        etag, last_modified, not_modified = check(request)
+        if not_modified is not None:
+            return not_modified
+        return finish(view(request, *args, **kwargs), etag, last_modified)
+
+    return wrapper
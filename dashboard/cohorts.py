@@ -0,0 +1,110 @@
+# dashboard/cohorts.py
+
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Sum
+
+from .facts import insert_from_select, period_filter
+from .models import CohortRetention, CustomerCohort, OrderRollup
+from .queries import apply_filters
+from .rollups import MAX_INCREMENTAL_PERIODS
+
+# Chỉ số tháng của một dòng OrderRollup (năm * 12 + tháng - 1), so sánh/trừ được như số nguyên
+MONTH_INDEX = F('year') * 12 + F('month') - 1
+
+# Cột của CohortRetention -> biểu thức trên OrderRollup (join CustomerCohort qua khách hàng)
+COHORT_COLUMNS = {
+    'segment': F('segment_id'),
+    'cohort': F('customer__cohort__first_month'),
+    'period': MONTH_INDEX - F('customer__cohort__first_month'),
+}
+
+COHORT_MEASURES = {
+    'customers': Count('customer', distinct=True),
+    'orders': Sum('order_count'),
+    'sales': Sum('sales'),
+}
+
+# Tham số lọc của ma trận cohort -> field của CohortRetention
+COHORT_FILTER_FIELDS = {
+    'segment_id': 'segment_id',
+}
+
+
+def refresh_cohorts(periods=None):
+    """
+    Tính lại CustomerCohort và CohortRetention từ OrderRollup (sau refresh_rollups).
+    periods là tập (năm, tháng) bị ảnh hưởng bởi lần nhập; chỉ các cohort chứa khách hàng
+    có đơn trong các tháng đó (cohort cũ và mới của họ) được tính lại. None nghĩa là toàn bộ.
+    """
+    if periods is not None and not periods:
+        return
+    if periods is not None and len(periods) > MAX_INCREMENTAL_PERIODS:
+        periods = None
+
+    with transaction.atomic():
+        if periods is None:
+            CustomerCohort.objects.all().delete()
+            CohortRetention.objects.all().delete()
+            insert_from_select(
+                CustomerCohort, OrderRollup.objects.all(),
+                {'customer': F('customer_id')}, {'first_month': Min(MONTH_INDEX)}
+            )
+            insert_from_select(CohortRetention, OrderRollup.objects.all(), COHORT_COLUMNS, COHORT_MEASURES)
+            return
+
+        customers = OrderRollup.objects.filter(period_filter(periods)).values('customer_id')
+        changed = CustomerCohort.objects.filter(customer_id__in=customers)
+        touched = set(changed.values_list('first_month', flat=True))
+        changed.delete()
+        insert_from_select(
+            CustomerCohort, OrderRollup.objects.filter(customer_id__in=customers),
+            {'customer': F('customer_id')}, {'first_month': Min(MONTH_INDEX)}
+        )
+        touched.update(
+            CustomerCohort.objects.filter(customer_id__in=customers).values_list('first_month', flat=True)
+        )
+
+        CohortRetention.objects.filter(cohort__in=touched).delete()
+        insert_from_select(
+            CohortRetention, OrderRollup.objects.filter(customer__cohort__first_month__in=touched),
+            COHORT_COLUMNS, COHORT_MEASURES
+        )
+
+
+def _month_label(index):
+    """Chỉ số tháng -> 'YYYY-MM'"""
+    return f'{index // 12:04d}-{index % 12 + 1:02d}'
+
+
+def cohort_matrix(params):
+    """
+    Ma trận retention theo cohort (tháng mua đầu tiên) x số tháng kể từ tháng đầu, lọc theo segment_id.
+    Mỗi cohort có đủ các tháng tới tháng cuối cùng có dữ liệu (tháng không có khách quay lại là 0);
+    retention là tỷ lệ % khách của cohort còn mua hàng so với tháng 0.
+    """
+    rows = apply_filters(CohortRetention.objects.all(), params, COHORT_FILTER_FIELDS)
+    last_month = CohortRetention.objects.aggregate(last=Max(F('cohort') + F('period')))['last']
+    cells = {}
+    for row in rows.values('cohort', 'period').annotate(
+            customers=Sum('customers'), orders=Sum('orders'), sales=Sum('sales')).order_by():
+        cells[row['cohort'], row['period']] = row
+
+    cohorts = []
+    for cohort in sorted({cohort for cohort, _ in cells}):
+        periods = range(last_month - cohort + 1)
+        values = [cells.get((cohort, period), {}) for period in periods]
+        size = values[0].get('customers', 0)
+        cohorts.append({
+            'cohort': _month_label(cohort),
+            'size': size,
+            'customers': [value.get('customers', 0) for value in values],
+            'retention': [round(value.get('customers', 0) * 100 / size, 2) if size else 0 for value in values],
+            'orders': [value.get('orders', 0) for value in values],
+            'sales': [value.get('sales', Decimal(0)) for value in values],
+        })
+    return {
+        'last_month': _month_label(last_month) if last_month is not None else None,
+        'cohorts': cohorts,
+    }
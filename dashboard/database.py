@@ -0,0 +1,67 @@
+# dashboard/database.py
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, router
+
+# Pragma mặc định cho kết nối SQLite (ghi đè bằng DASHBOARD_SQLITE_PRAGMAS)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'memory',
+}
+
+
+def read_alias():
+    """Alias của kết nối chỉ đọc (DASHBOARD_READ_DATABASE), None nếu không cấu hình"""
+    alias = getattr(settings, 'DASHBOARD_READ_DATABASE', None)
+    return alias if alias in settings.DATABASES else None
+
+
+def read_connection(model=None):
+    """Kết nối mà các truy vấn đọc của model (mặc định SalesFact) đang được gửi tới"""
+    if model is None:
+        from .models import SalesFact
+        model = SalesFact
+    return connections[router.db_for_read(model)]
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """
+    Handler của connection_created: đặt các pragma SQLite cho mỗi kết nối mới.
+    journal_mode chỉ đặt trên kết nối ghi (WAL được lưu trong file DB nên kết nối chỉ đọc dùng chung).
+    Pragma chạy trực tiếp trên kết nối sqlite3, không qua execute_wrapper nên không bị tính là
+    truy vấn của request (đo hiệu năng, benchmark).
+    """
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'DASHBOARD_SQLITE_PRAGMAS', SQLITE_PRAGMAS)
+    for name, value in pragmas.items():
+        if name == 'journal_mode' and connection.alias == read_alias():
+            continue
+        connection.connection.execute(f'PRAGMA {name} = {value}').close()
+
+
+class ReadWriteRouter:
+    """
+    Gửi mọi truy vấn đọc tới kết nối chỉ đọc (DASHBOARD_READ_DATABASE, cùng file SQLite ở chế độ WAL)
+    để các API dashboard không phải chờ một lần nhập dữ liệu đang ghi; ghi và migrate luôn dùng 'default'.
+    Khi luồng hiện tại đang trong transaction ghi, việc đọc vẫn dùng 'default' để thấy dữ liệu vừa ghi.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = read_alias()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Cả hai alias trỏ tới cùng một DB
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != read_alias()
@@ -0,0 +1,95 @@
+# dashboard/engines/__init__.py
+"""
+Các backend tính dữ liệu cho API dashboard:
+- 'orm': truy vấn SQL trên các bảng tổng hợp (mặc định)
+- 'columnar': tính trên bảng fact nạp vào bộ nhớ dạng mảng NumPy theo cột
+Chọn bằng setting DASHBOARD_ENGINE; hai backend trả về cùng một JSON.
+
+Mỗi backend khai báo WIDGETS (id -> hàm tính một biểu đồ); các trang và API batch
+chỉ là tổ hợp widget (xem widgets.py).
+"""
+
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+
+from ..queries import FILTER_FIELDS
+from . import columnar, orm
+from .widgets import PAGES, arun_widgets, run_widgets
+
+ENGINES = {
+    'orm': orm,
+    'columnar': columnar,
+}
+
+# Số chữ số thập phân của mọi giá trị tiền tệ / tỷ lệ trong JSON
+DECIMAL_PLACES = 2
+_QUANTUM = Decimal(1).scaleb(-DECIMAL_PLACES)
+
+
+def get_engine(name=None):
+    """Module backend theo tên, mặc định theo setting DASHBOARD_ENGINE"""
+    name = name or getattr(settings, 'DASHBOARD_ENGINE', 'orm')
+    if name not in ENGINES:
+        raise ValueError(f"DASHBOARD_ENGINE không hợp lệ: {name} (chọn một trong {', '.join(ENGINES)})")
+    return ENGINES[name]
+
+
+def round_decimals(value):
+    """
+    Làm tròn mọi số thực / Decimal trong payload về DECIMAL_PLACES chữ số, để sai số
+    dấu phẩy động của từng backend (SQL hay NumPy) không làm JSON khác nhau.
+    """
+    if isinstance(value, dict):
+        return {key: round_decimals(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [round_decimals(item) for item in value]
+    if isinstance(value, Decimal):
+        return value.quantize(_QUANTUM, rounding=ROUND_HALF_UP)
+    if isinstance(value, float):
+        return round(value, DECIMAL_PLACES)
+    return value
+
+
+def _registry(widgets, engine=None):
+    """Registry widget của backend; ValueError nếu có id không tồn tại"""
+    registry = get_engine(engine).WIDGETS
+    unknown = [widget for widget in widgets if widget not in registry]
+    if unknown:
+        raise ValueError(f"Widget không tồn tại: {', '.join(unknown)}")
+    return registry
+
+
+def _page_params(spec, params):
+    """Chỉ giữ các tham số lọc mà trang nhận (các tham số khác như top_n, limit giữ nguyên)"""
+    return {
+        name: value for name, value in params.items()
+        if name not in FILTER_FIELDS or name in spec['filters']
+    }
+
+
+def build_widgets(widgets, params, engine=None, workers=None):
+    """Dữ liệu JSON của các widget theo id (cùng bộ lọc chung); ValueError nếu có id không tồn tại"""
+    return round_decimals(run_widgets(_registry(widgets, engine), widgets, params, workers))
+
+
+async def abuild_widgets(widgets, params, engine=None):
+    """Bản async của build_widgets (các widget chạy đồng thời, dùng trong view async)"""
+    return round_decimals(await arun_widgets(_registry(widgets, engine), widgets, params))
+
+
+def build_payload(page, params, engine=None, workers=None):
+    """
+    Dữ liệu JSON của một trang (overview, market, customer, product): chỉ giữ các tham số lọc
+    trang đó nhận rồi tính các widget của trang
+    """
+    spec = PAGES[page]
+    data = build_widgets(list(spec['widgets'].values()), _page_params(spec, params), engine, workers)
+    return {key: data[widget] for key, widget in spec['widgets'].items()}
+
+
+async def abuild_payload(page, params, engine=None):
+    """Bản async của build_payload"""
+    spec = PAGES[page]
+    data = await abuild_widgets(list(spec['widgets'].values()), _page_params(spec, params), engine)
+    return {key: data[widget] for key, widget in spec['widgets'].items()}
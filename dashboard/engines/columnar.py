@@ -0,0 +1,504 @@
+# dashboard/engines/columnar.py
+
+import threading
+from decimal import Decimal
+
+import numpy as np
+from django.db import connections
+
+from ..cache import get_data_version
+from ..models import (
+    Category, Customer, CustomerSegment, Market, Product, Region, SalesFact, Subcategory
+)
+from ..queries import (
+    CATEGORY_KEY, CUSTOMER_KEY, DEFAULT_TOP_N, MARKET_KEY, MAX_TOP_N, PRODUCT_KEY,
+    REGION_KEY, SEGMENT_KEY, SUBCATEGORY_KEY, bin_starts, histogram_rows, parse_bins, parse_int,
+    parse_limit, parse_product_page, product_page, to_cents
+)
+
+# Số dòng đọc mỗi lần từ cursor khi nạp bảng fact vào bộ nhớ
+FETCH_SIZE = 50000
+
+# Số ô tối đa của mảng đếm dày (np.bincount); vượt quá thì nhóm bằng np.unique
+MAX_DENSE_GROUPS = 1 << 24
+
+# Các cột chiều của SalesFact và bảng chứa nhãn (tên) tương ứng
+DIMENSION_LABELS = {
+    'market': (Market, 'name'),
+    'region': (Region, 'name'),
+    'segment': (CustomerSegment, 'name'),
+    'customer': (Customer, 'customer_id'),
+    'category': (Category, 'name'),
+    'subcategory': (Subcategory, 'name'),
+    'product': (Product, 'name'),
+}
+
+# Các cột thời gian và số lượng, nhóm trực tiếp theo giá trị
+VALUE_COLUMNS = ['year', 'quarter', 'month', 'weekday', 'quantity']
+
+# Các chỉ số dạng số thực
+MEASURE_COLUMNS = ['sales', 'profit', 'discount']
+
+# Tham số lọc -> cột trong bộ nhớ (lọc theo id gốc hoặc giá trị)
+FILTER_COLUMNS = {
+    'year': 'year',
+    'quarter': 'quarter',
+    'month': 'month',
+    'market_id': 'market',
+    'segment_id': 'segment',
+    'category_id': 'category',
+    'subcategory_id': 'subcategory',
+    'product_id': 'product',
+}
+
+# Tham số lọc của các widget trang sản phẩm
+PRODUCT_FILTERS = ['category_id', 'subcategory_id', 'product_id']
+
+_store = None
+_store_lock = threading.Lock()
+
+
+class Column:
+    """
+    Cột đã mã hoá từ điển: values là giá trị gốc của từng dòng (id hoặc số, dùng để lọc),
+    codes là mã số nguyên của nhãn và labels là từ điển nhãn đã sắp xếp tăng dần.
+    Với cột chiều, các id trùng tên được gộp chung một mã (giống GROUP BY theo tên).
+    """
+
+    def __init__(self, values, names=None):
+        self.values = values
+        unique_values, inverse = np.unique(values, return_inverse=True)
+        if names is None:
+            self.labels, self.codes = unique_values, inverse
+        else:
+            labels = np.array([names.get(int(value), '') for value in unique_values], dtype=object)
+            self.labels, label_codes = np.unique(labels.astype(str), return_inverse=True)
+            self.codes = label_codes[inverse]
+
+    @property
+    def size(self):
+        return len(self.labels)
+
+    def label(self, code):
+        return self.labels[code].item()
+
+
+class ColumnarStore:
+    """Bảng SalesFact nạp vào bộ nhớ dưới dạng các mảng NumPy theo cột"""
+
+    def __init__(self, version):
+        self.version = version
+        self.rows = 0
+        self.columns = {}
+        self.measures = {}
+
+    @classmethod
+    def load(cls, version):
+        """Đọc toàn bộ SalesFact (không join) và nhãn của các bảng chiều"""
+        store = cls(version)
+        dimensions = list(DIMENSION_LABELS)
+        fields = [f'{name}_id' for name in dimensions] + ['order_id'] + VALUE_COLUMNS + MEASURE_COLUMNS
+        queryset = SalesFact.objects.values_list(*fields).order_by()
+        sql, params = queryset.query.sql_with_params()
+
+        blocks = []
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(FETCH_SIZE)
+                if not rows:
+                    break
+                blocks.append(np.array(rows, dtype=np.float64))
+        data = np.concatenate(blocks) if blocks else np.empty((0, len(fields)))
+        column = {field: data[:, index] for index, field in enumerate(fields)}
+
+        for name in dimensions:
+            model, label_field = DIMENSION_LABELS[name]
+            names = dict(model.objects.values_list('id', label_field))
+            store.columns[name] = Column(column[f'{name}_id'].astype(np.int64), names)
+        store.columns['order'] = Column(column['order_id'].astype(np.int64))
+        for name in VALUE_COLUMNS:
+            store.columns[name] = Column(column[name].astype(np.int64))
+        for name in MEASURE_COLUMNS:
+            store.measures[name] = column[name]
+        store.measures['quantity'] = column['quantity']
+        store.rows = len(data)
+
+        # Các bảng chiều nhỏ dùng nguyên trạng
+        store.market_names = list(Market.objects.values_list('name', flat=True))
+        store.customer_segments = _customers_by_segment()
+        return store
+
+    def mask(self, params, filters):
+        """Mặt nạ các dòng thoả những tham số lọc được phép (filters) có trong params"""
+        mask = np.ones(self.rows, dtype=bool)
+        for param in filters:
+            value = (params.get(param) or '').strip()
+            if not value:
+                continue
+            number = parse_int(value)
+            if number is None:
+                return np.zeros(self.rows, dtype=bool)
+            mask &= self.columns[FILTER_COLUMNS[param]].values == number
+        return mask
+
+    def group(self, keys, mask, measures=()):
+        """
+        Cộng dồn các chỉ số theo tổ hợp cột (kernel np.bincount trên khoá phẳng).
+        Trả về (mảng mã của từng cột khoá, {chỉ số: tổng}, số dòng mỗi nhóm),
+        các nhóm theo thứ tự tăng dần của nhãn.
+        """
+        columns = [self.columns[key] for key in keys]
+        sizes = [max(column.size, 1) for column in columns]
+        flat = np.ravel_multi_index([column.codes[mask] for column in columns], sizes)
+        total = int(np.prod(sizes))
+        if total <= MAX_DENSE_GROUPS:
+            # Khoá phẳng nhỏ: đếm trực tiếp trên mảng dày rồi bỏ các ô rỗng
+            present = np.flatnonzero(np.bincount(flat, minlength=total))
+            inverse = np.searchsorted(present, flat)
+        else:
+            present, inverse = np.unique(flat, return_inverse=True)
+        counts = np.bincount(inverse, minlength=len(present))
+        sums = {
+            name: np.bincount(inverse, weights=self.measures[name][mask], minlength=len(present))
+            for name in measures
+        }
+        return np.unravel_index(present, sizes), sums, counts
+
+
+def _customers_by_segment():
+    """Số khách hàng theo phân khúc: [(segment_id, tên, số khách hàng)]"""
+    counts = {}
+    for segment_id in Customer.objects.values_list('segment_id', flat=True):
+        counts[segment_id] = counts.get(segment_id, 0) + 1
+    names = dict(CustomerSegment.objects.values_list('id', 'name'))
+    return [(segment_id, names[segment_id], count) for segment_id, count in counts.items()]
+
+
+def get_store():
+    """Bộ dữ liệu trong bộ nhớ của phiên bản dữ liệu hiện tại, nạp lại sau mỗi lần nhập"""
+    global _store
+    version = get_data_version()
+    store = _store
+    if store is None or store.version != version:
+        with _store_lock:
+            if _store is None or _store.version != version:
+                _store = ColumnarStore.load(version)
+            store = _store
+    return store
+
+
+def _decimal(value):
+    """Số thực -> Decimal (giống kiểu dữ liệu ORM trả về cho các cột DecimalField)"""
+    return Decimal(repr(float(value)))
+
+
+def _margin(profit, sales):
+    """Tỷ lệ lợi nhuận (%), None khi doanh số bằng 0 (giống phép chia cho 0 của SQL)"""
+    return _decimal(profit * 100 / sales) if sales else None
+
+
+def _order(values, descending=True):
+    """Thứ tự chỉ mục theo giá trị; các nhóm bằng nhau giữ thứ tự nhãn tăng dần"""
+    return np.argsort(-values if descending else values, kind='stable')
+
+
+def _bin_counts(values, bins):
+    """[(đầu bin, số phần tử)] của mảng giá trị nguyên, theo thứ tự tăng dần"""
+    starts, counts = np.unique(bin_starts(values, bins), return_counts=True)
+    return zip(starts.tolist(), counts.tolist())
+
+
+def _breakdown(store, mask, key, alias, measure, json_key=None, descending=True):
+    """Một biểu đồ nhóm theo một cột, sắp xếp theo tổng chỉ số"""
+    (codes,), sums, _ = store.group([key], mask, [measure])
+    column = store.columns[key]
+    values = sums[measure]
+    convert = int if measure == 'quantity' else _decimal
+    order = _order(values) if descending else range(len(codes))
+    return [
+        {json_key or key: column.label(codes[i]), alias: convert(values[i])}
+        for i in order
+    ]
+
+
+def _filtered(ctx, filters):
+    """
+    Kho dữ liệu và mặt nạ dòng theo các tham số lọc được phép, dùng chung giữa các widget
+    của cùng một lần tính (cùng một phiên bản dữ liệu)
+    """
+    store = ctx.shared('store', get_store)
+    return store, ctx.shared(('mask', tuple(filters)), lambda: store.mask(ctx.params, filters))
+
+
+def overview_kpi(ctx):
+    """KPIs của trang tổng quan (tuân theo bộ lọc đang chọn)"""
+    store, mask = _filtered(ctx, list(FILTER_COLUMNS))
+    return {
+        'total_sales': float(store.measures['sales'][mask].sum()),
+        'total_profit': float(store.measures['profit'][mask].sum()),
+        'total_quantity': int(store.measures['quantity'][mask].sum())
+    }
+
+
+def sales_by_market(ctx):
+    """Doanh số theo thị trường"""
+    store, mask = _filtered(ctx, list(FILTER_COLUMNS))
+    return _breakdown(store, mask, 'market', 'total_sales', 'sales', MARKET_KEY)
+
+
+def quantity_by_year(ctx):
+    """Số lượng theo năm"""
+    store, mask = _filtered(ctx, list(FILTER_COLUMNS))
+    return _breakdown(store, mask, 'year', 'total_quantity', 'quantity', descending=False)
+
+
+def profit_by_category(ctx):
+    """Lợi nhuận theo danh mục"""
+    store, mask = _filtered(ctx, list(FILTER_COLUMNS))
+    return _breakdown(store, mask, 'category', 'total_profit', 'profit', CATEGORY_KEY)
+
+
+def sales_by_segment(ctx):
+    """Doanh số theo phân khúc khách hàng"""
+    store, mask = _filtered(ctx, list(FILTER_COLUMNS))
+    return _breakdown(store, mask, 'segment', 'total_sales', 'sales', SEGMENT_KEY)
+
+
+def order_quantity_distribution(ctx):
+    """Phân phối số lượng đơn hàng (số dòng theo bin của quantity)"""
+    store, mask = _filtered(ctx, list(FILTER_COLUMNS))
+    bins = parse_bins(ctx.params)
+    return histogram_rows(
+        _bin_counts(store.columns['quantity'].values[mask], bins), bins, 'quantity', 'count'
+    )
+
+
+def top_products_by_market(ctx):
+    """Top N sản phẩm mỗi thị trường: sắp xếp theo (thị trường, doanh số giảm dần, tên sản phẩm)"""
+    store, mask = _filtered(ctx, ['market_id'])
+    markets = store.columns['market']
+    products = store.columns['product']
+    top_n = parse_limit(ctx.params.get('top_n'), DEFAULT_TOP_N, MAX_TOP_N)
+    (market_codes, product_codes), sums, _ = store.group(['market', 'product'], mask, ['sales'])
+    top_products = {}
+    for i in np.lexsort((product_codes, -sums['sales'], market_codes)):
+        items = top_products.setdefault(markets.label(market_codes[i]), [])
+        if len(items) < top_n:
+            items.append({PRODUCT_KEY: products.label(product_codes[i]), 'total_sales': _decimal(sums['sales'][i])})
+    return {name: top_products.get(name, []) for name in store.market_names}
+
+
+def profit_by_region_market(ctx):
+    """Lợi nhuận theo vùng và thị trường"""
+    store, mask = _filtered(ctx, ['market_id'])
+    (region_codes, market_codes), sums, _ = store.group(['region', 'market'], mask, ['profit'])
+    return [
+        {
+            REGION_KEY: store.columns['region'].label(region_codes[i]),
+            MARKET_KEY: store.columns['market'].label(market_codes[i]),
+            'total_profit': _decimal(sums['profit'][i])
+        }
+        for i in np.lexsort((-sums['profit'], region_codes))
+    ]
+
+
+def _orders_per_customer(ctx):
+    """Số đơn hàng khác nhau của mỗi khách hàng có mua (cặp khách hàng - đơn hàng duy nhất)"""
+    def count():
+        store, mask = _filtered(ctx, ['segment_id'])
+        (customer_codes, _), _, _ = store.group(['customer', 'order'], mask)
+        orders = np.bincount(customer_codes, minlength=store.columns['customer'].size)
+        return orders[orders > 0]
+    return ctx.shared('orders_per_customer', count)
+
+
+def customer_kpi(ctx):
+    """Tổng số khách hàng, giá trị đơn hàng trung bình và doanh thu trung bình mỗi khách hàng"""
+    store, mask = _filtered(ctx, ['segment_id'])
+    segment_id = (ctx.params.get('segment_id') or '').strip()
+    selected = parse_int(segment_id)
+    if segment_id and selected is None:
+        total_customers = 0
+    else:
+        total_customers = sum(
+            count for segment, _, count in store.customer_segments
+            if selected is None or segment == selected
+        )
+
+    orders_per_customer = _orders_per_customer(ctx)
+    total_sales = to_cents(float(store.measures['sales'][mask].sum()))
+    total_orders = int(orders_per_customer.sum())
+    aov = total_sales / total_orders if total_orders else 0
+    revenue_per_customer = total_sales / len(orders_per_customer) if len(orders_per_customer) else 0
+
+    return {
+        'total_customers': total_customers,
+        'aov': float(aov),
+        'revenue_per_customer': float(revenue_per_customer)
+    }
+
+
+def customers_by_segment(ctx):
+    """Khách hàng theo phân khúc"""
+    store = ctx.shared('store', get_store)
+    return [
+        {'segment__name': name, 'count': count}
+        for _, name, count in sorted(store.customer_segments, key=lambda item: (-item[2], item[1]))
+    ]
+
+
+def purchase_frequency(ctx):
+    """Histogram tần suất mua hàng"""
+    bins = parse_bins(ctx.params)
+    return histogram_rows(
+        _bin_counts(_orders_per_customer(ctx), bins), bins, 'order_count', 'customer_count'
+    )
+
+
+def top_customers(ctx):
+    """Top 10 khách hàng theo doanh số"""
+    store, mask = _filtered(ctx, ['segment_id'])
+    (codes,), sums, _ = store.group(['customer'], mask, ['sales', 'profit'])
+    return [
+        {
+            CUSTOMER_KEY: store.columns['customer'].label(codes[i]),
+            'total_sales': _decimal(sums['sales'][i]),
+            'total_profit': _decimal(sums['profit'][i]),
+            'profit_margin': _margin(sums['profit'][i], sums['sales'][i])
+        }
+        for i in _order(sums['sales'])[:10]
+    ]
+
+
+def product_metrics(params):
+    """
+    Một trang doanh số, lợi nhuận và % tỷ lệ lợi nhuận theo danh mục, danh mục con, sản phẩm:
+    sắp xếp theo chỉ số được chọn rồi theo tên, phân trang theo con trỏ.
+    """
+    page = parse_product_page(params)
+    store = get_store()
+    mask = store.mask(params, PRODUCT_FILTERS)
+    categories = store.columns['category']
+    subcategories = store.columns['subcategory']
+    products = store.columns['product']
+    if page['search']:
+        search = page['search'].lower()
+        matches = np.array([search in name.lower() for name in products.labels.tolist()], dtype=bool)
+        mask = mask & matches[products.codes]
+
+    (category_codes, subcategory_codes, product_codes), sums, _ = store.group(
+        ['category', 'subcategory', 'product'], mask, ['sales', 'profit']
+    )
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = {
+            'sales': sums['sales'],
+            'profit': sums['profit'],
+            # Doanh số bằng 0: xếp như tỷ lệ 0 (giống Coalesce của bản ORM)
+            'margin': np.where(sums['sales'] != 0, sums['profit'] * 100 / sums['sales'], 0.0),
+        }[page['sort']]
+    descending = page['order'] == 'desc'
+
+    # Các nhóm đứng sau con trỏ: giá trị nhỏ hơn (lớn hơn khi tăng dần), hoặc bằng và tên đứng sau
+    selected = np.ones(len(values), dtype=bool)
+    if page['cursor']:
+        value, *names = page['cursor']
+        selected = values < value if descending else values > value
+        for i in np.flatnonzero(values == value):
+            selected[i] = (categories.label(category_codes[i]), subcategories.label(subcategory_codes[i]),
+                           products.label(product_codes[i])) > tuple(names)
+    indexes = np.flatnonzero(selected)
+    indexes = indexes[_order(values[indexes], descending)][:page['limit'] + 1]
+
+    rows = [
+        {
+            CATEGORY_KEY: categories.label(category_codes[i]),
+            SUBCATEGORY_KEY: subcategories.label(subcategory_codes[i]),
+            PRODUCT_KEY: products.label(product_codes[i]),
+            'total_sales': _decimal(sums['sales'][i]),
+            'total_profit': _decimal(sums['profit'][i]),
+            'profit_margin': _margin(sums['profit'][i], sums['sales'][i]),
+            'sort_value': float(values[i])
+        }
+        for i in indexes
+    ]
+    return product_page(rows, page)
+
+
+def product_metrics_page(ctx):
+    """Trang chỉ số sản phẩm theo tham số phân trang (dùng chung cho product_metrics và product_metrics_next)"""
+    return ctx.shared('product_metrics_page', lambda: product_metrics(ctx.params))
+
+
+def product_metrics_results(ctx):
+    """Các dòng của trang đầu danh sách chỉ số sản phẩm (các trang sau qua /api/product-metrics/)"""
+    return product_metrics_page(ctx)['results']
+
+
+def product_metrics_next(ctx):
+    """Con trỏ trang sau của danh sách chỉ số sản phẩm"""
+    return product_metrics_page(ctx)['next_cursor']
+
+
+def category_metrics(ctx):
+    """Giảm giá trung bình và tỷ lệ lợi nhuận theo danh mục sản phẩm"""
+    store, mask = _filtered(ctx, PRODUCT_FILTERS)
+    (codes,), sums, counts = store.group(['category'], mask, ['discount', 'sales', 'profit'])
+    return [
+        {
+            CATEGORY_KEY: store.columns['category'].label(codes[i]),
+            'avg_discount': to_cents(float(sums['discount'][i])) * 100 / int(counts[i]),
+            'avg_profit_margin': _margin(sums['profit'][i], sums['sales'][i])
+        }
+        for i in range(len(codes))
+    ]
+
+
+def peak_sales_by_month(ctx):
+    """Doanh số cao điểm theo tháng"""
+    store, mask = _filtered(ctx, PRODUCT_FILTERS)
+    return _breakdown(store, mask, 'month', 'total_sales', 'sales')
+
+
+def peak_sales_by_day(ctx):
+    """Doanh số cao điểm theo ngày trong tuần"""
+    store, mask = _filtered(ctx, PRODUCT_FILTERS)
+    return _breakdown(store, mask, 'weekday', 'total_sales', 'sales', 'day')
+
+
+def sales_by_month_day(ctx):
+    """Doanh số theo tháng và ngày trong tuần (cho heatmap)"""
+    store, mask = _filtered(ctx, PRODUCT_FILTERS)
+    (month_codes, day_codes), sums, _ = store.group(['month', 'weekday'], mask, ['sales'])
+    return [
+        {
+            'month': store.columns['month'].label(month_codes[i]),
+            'day': store.columns['weekday'].label(day_codes[i]),
+            'total_sales': _decimal(sums['sales'][i])
+        }
+        for i in range(len(month_codes))
+    ]
+
+
+# Các widget của backend: id -> hàm nhận WidgetContext (xem engines/widgets.py)
+WIDGETS = {
+    'overview_kpi': overview_kpi,
+    'sales_by_market': sales_by_market,
+    'quantity_by_year': quantity_by_year,
+    'profit_by_category': profit_by_category,
+    'sales_by_segment': sales_by_segment,
+    'order_quantity_distribution': order_quantity_distribution,
+    'top_products_by_market': top_products_by_market,
+    'profit_by_region_market': profit_by_region_market,
+    'customer_kpi': customer_kpi,
+    'customers_by_segment': customers_by_segment,
+    'purchase_frequency': purchase_frequency,
+    'top_customers': top_customers,
+    'product_metrics_page': product_metrics_page,
+    'product_metrics': product_metrics_results,
+    'product_metrics_next': product_metrics_next,
+    'category_metrics': category_metrics,
+    'peak_sales_by_month': peak_sales_by_month,
+    'peak_sales_by_day': peak_sales_by_day,
+    'sales_by_month_day': sales_by_month_day,
+}
@@ -0,0 +1,287 @@
+# dashboard/engines/orm.py
+
+from django.db.models import Count, F, FloatField, Sum
+from django.db.models.functions import Cast, Coalesce
+
+from ..models import Customer, Market, OrderRollup, SalesFact, SalesRollup
+from ..planner import aggregate_breakdowns
+from ..queries import (
+    CATEGORY_KEY, CUSTOMER_KEY, DEFAULT_TOP_N, FILTER_FIELDS, MARKET_KEY, MAX_TOP_N, PRODUCT_KEY,
+    REGION_KEY, SEGMENT_KEY, SUBCATEGORY_KEY, apply_filters, histogram, histogram_rows, keyset_filter,
+    parse_bins, parse_limit, parse_product_page, product_page, to_cents, top_n_per_group
+)
+
+# Tham số lọc của các widget trang thị trường, khách hàng, sản phẩm (qua apply_filters như các trang
+# khác: id không phải số nguyên cho kết quả rỗng thay vì lỗi)
+MARKET_FILTERS = {param: FILTER_FIELDS[param] for param in ['market_id']}
+CUSTOMER_FILTERS = {param: FILTER_FIELDS[param] for param in ['segment_id']}
+PRODUCT_FILTERS = {param: FILTER_FIELDS[param] for param in ['category_id', 'subcategory_id', 'product_id']}
+
+# Các biểu đồ nhóm của trang tổng quan, tính chung một lần quét bảng tổng hợp
+OVERVIEW_BREAKDOWNS = {
+    # Doanh số theo thị trường
+    'sales_by_market': {
+        'group': {MARKET_KEY: 'market__name'}, 'measure': 'sales', 'alias': 'total_sales', 'order': '-total_sales'
+    },
+    # Số lượng theo năm
+    'quantity_by_year': {
+        'group': {'year': 'year'}, 'measure': 'quantity', 'alias': 'total_quantity', 'order': 'year'
+    },
+    # Lợi nhuận theo danh mục
+    'profit_by_category': {
+        'group': {CATEGORY_KEY: 'category__name'}, 'measure': 'profit', 'alias': 'total_profit', 'order': '-total_profit'
+    },
+    # Doanh số theo phân khúc khách hàng
+    'sales_by_segment': {
+        'group': {SEGMENT_KEY: 'segment__name'}, 'measure': 'sales', 'alias': 'total_sales', 'order': '-total_sales'
+    },
+}
+
+
+def _overview_scan(ctx):
+    """
+    KPIs và các biểu đồ nhóm được yêu cầu (thị trường, năm, danh mục, phân khúc) trong một lần quét
+    bảng tổng hợp; áp dụng mọi bộ lọc year/quarter/month/market/segment/category/product.
+    """
+    def scan():
+        queryset = apply_filters(SalesRollup.objects.all(), ctx.params)
+        breakdowns = {name: spec for name, spec in OVERVIEW_BREAKDOWNS.items() if name in ctx.widgets}
+        if not breakdowns:
+            totals = queryset.aggregate(sales=Sum('sales'), profit=Sum('profit'), quantity=Sum('quantity'))
+            return {}, {measure: value or 0 for measure, value in totals.items()}
+        return aggregate_breakdowns(queryset, breakdowns, totals=('sales', 'profit', 'quantity'))
+    return ctx.shared('overview_scan', scan)
+
+
+def overview_kpi(ctx):
+    """KPIs của trang tổng quan (tuân theo bộ lọc đang chọn)"""
+    _, kpi = _overview_scan(ctx)
+    return {
+        'total_sales': float(kpi['sales']),
+        'total_profit': float(kpi['profit']),
+        'total_quantity': kpi['quantity']
+    }
+
+
+def _overview_breakdown(name):
+    """Widget lấy một biểu đồ nhóm từ lần quét chung của trang tổng quan"""
+    def widget(ctx):
+        breakdowns, _ = _overview_scan(ctx)
+        return breakdowns[name]
+    widget.__name__ = name
+    return widget
+
+
+def order_quantity_distribution(ctx):
+    """Phân phối số lượng đơn hàng (theo từng dòng nên đọc từ bảng fact), chia bin trong DB"""
+    facts = apply_filters(SalesFact.objects.all(), ctx.params)
+    bins = parse_bins(ctx.params)
+    return histogram_rows(
+        histogram(facts.values('quantity').order_by(), 'quantity', bins), bins, 'quantity', 'count'
+    )
+
+
+def _market_queryset(params):
+    """Bảng tổng hợp đã lọc theo thị trường"""
+    return apply_filters(SalesRollup.objects.all(), params, MARKET_FILTERS)
+
+
+def top_products_by_market(ctx):
+    """Top N (mặc định 5) sản phẩm bán chạy nhất ở mỗi thị trường, trong một truy vấn"""
+    top_n = parse_limit(ctx.params.get('top_n'), DEFAULT_TOP_N, MAX_TOP_N)
+    top_products = top_n_per_group(_market_queryset(ctx.params), 'market__name', 'product__name', top_n,
+                                   item_key=PRODUCT_KEY)
+    return {
+        name: top_products.get(name, [])
+        for name in Market.objects.values_list('name', flat=True)
+    }
+
+
+def profit_by_region_market(ctx):
+    """Lợi nhuận theo vùng và thị trường"""
+    return list(_market_queryset(ctx.params).values(**{
+                    REGION_KEY: F('region__name'),
+                    MARKET_KEY: F('market__name')
+                })
+                .annotate(total_profit=Sum('profit'))
+                .order_by(REGION_KEY, '-total_profit'))
+
+
+def _customer_queryset(params):
+    """Bảng tổng hợp theo đơn hàng đã lọc theo phân khúc"""
+    return apply_filters(OrderRollup.objects.all(), params, CUSTOMER_FILTERS)
+
+
+def customer_kpi(ctx):
+    """Tổng số khách hàng, giá trị đơn hàng trung bình và doanh thu trung bình mỗi khách hàng"""
+    # Tổng số khách hàng
+    total_customers = apply_filters(Customer.objects.all(), ctx.params, CUSTOMER_FILTERS).count()
+
+    totals = _customer_queryset(ctx.params).aggregate(
+        sales=Sum('sales'),
+        orders=Sum('order_count'),
+        customers=Count('customer', distinct=True)
+    )
+
+    # Giá trị đơn hàng trung bình (AOV) = tổng doanh số / số đơn hàng
+    sales = to_cents(totals['sales'])
+    aov = sales / totals['orders'] if totals['orders'] else 0
+
+    # Doanh thu trung bình mỗi khách hàng
+    revenue_per_customer = sales / totals['customers'] if totals['customers'] else 0
+
+    return {
+        'total_customers': total_customers,
+        'aov': float(aov),
+        'revenue_per_customer': float(revenue_per_customer)
+    }
+
+
+def customers_by_segment(ctx):
+    """Khách hàng theo phân khúc"""
+    return list(Customer.objects.values('segment__name')
+                .annotate(count=Count('id'))
+                .order_by('-count', 'segment__name'))
+
+
+def purchase_frequency(ctx):
+    """
+    Phân phối tần suất mua hàng: số đơn hàng của mỗi khách hàng (truy vấn con),
+    rồi đếm số khách hàng theo bin ngay trong DB
+    """
+    bins = parse_bins(ctx.params)
+    orders_per_customer = _customer_queryset(ctx.params).values('customer') \
+        .annotate(customer_orders=Sum('order_count')) \
+        .values('customer_orders') \
+        .order_by()
+    return histogram_rows(
+        histogram(orders_per_customer, 'customer_orders', bins), bins, 'order_count', 'customer_count'
+    )
+
+
+def top_customers(ctx):
+    """Top 10 khách hàng theo doanh số"""
+    return list(_customer_queryset(ctx.params).values(**{CUSTOMER_KEY: F('customer__customer_id')})
+                .annotate(
+                    total_sales=Sum('sales'),
+                    total_profit=Sum('profit'),
+                    profit_margin=Sum('profit') * 100 / Sum('sales')
+                )
+                .order_by('-total_sales')[:10])
+
+
+def _product_queryset(params):
+    """Bảng tổng hợp đã lọc theo danh mục, danh mục con, sản phẩm"""
+    return apply_filters(SalesRollup.objects.all(), params, PRODUCT_FILTERS)
+
+
+def product_metrics(params):
+    """
+    Một trang doanh số, lợi nhuận và % tỷ lệ lợi nhuận theo danh mục, danh mục con, sản phẩm:
+    sắp xếp theo chỉ số được chọn rồi theo tên, phân trang theo con trỏ (LIMIT trong SQL).
+    """
+    page = parse_product_page(params)
+    queryset = _product_queryset(params)
+    if page['search']:
+        queryset = queryset.filter(product__name__icontains=page['search'])
+
+    metrics = {
+        'sales': Sum('sales'),
+        'profit': Sum('profit'),
+        'margin': Sum('profit') * 100 / Sum('sales'),
+    }
+    rows = queryset.values(**{
+            CATEGORY_KEY: F('category__name'),
+            SUBCATEGORY_KEY: F('subcategory__name'),
+            PRODUCT_KEY: F('product__name')
+        }) \
+        .annotate(
+            total_sales=metrics['sales'],
+            total_profit=metrics['profit'],
+            profit_margin=metrics['margin'],
+            # Giá trị số thực gốc (không làm tròn như Decimal) để con trỏ so sánh chính xác;
+            # tỷ lệ lợi nhuận NULL (doanh số bằng 0) được xếp như 0 để luôn so sánh được
+            sort_value=Coalesce(Cast(metrics[page['sort']], FloatField()), 0.0)
+        )
+    ordering = ['sort_value', CATEGORY_KEY, SUBCATEGORY_KEY, PRODUCT_KEY]
+    if page['cursor']:
+        rows = rows.filter(keyset_filter(page['cursor'], ordering, page['order'] == 'desc'))
+    if page['order'] == 'desc':
+        ordering[0] = '-sort_value'
+    return product_page(list(rows.order_by(*ordering)[:page['limit'] + 1]), page)
+
+
+def product_metrics_page(ctx):
+    """Trang chỉ số sản phẩm theo tham số phân trang (dùng chung cho product_metrics và product_metrics_next)"""
+    return ctx.shared('product_metrics_page', lambda: product_metrics(ctx.params))
+
+
+def product_metrics_results(ctx):
+    """Các dòng của trang đầu danh sách chỉ số sản phẩm (các trang sau qua /api/product-metrics/)"""
+    return product_metrics_page(ctx)['results']
+
+
+def product_metrics_next(ctx):
+    """Con trỏ trang sau của danh sách chỉ số sản phẩm"""
+    return product_metrics_page(ctx)['next_cursor']
+
+
+def category_metrics(ctx):
+    """Giảm giá trung bình và tỷ lệ lợi nhuận theo danh mục sản phẩm"""
+    rows = []
+    for row in (_product_queryset(ctx.params).values(**{CATEGORY_KEY: F('category__name')})
+                .annotate(
+                    discount_total=Sum('discount'),
+                    line_count=Sum('line_count'),
+                    avg_profit_margin=Sum('profit') * 100 / Sum('sales')
+                )
+                .order_by(CATEGORY_KEY)):
+        # Giảm giá trung bình = tổng discount / số dòng chi tiết
+        rows.append({
+            CATEGORY_KEY: row[CATEGORY_KEY],
+            'avg_discount': to_cents(row['discount_total']) * 100 / row['line_count'],
+            'avg_profit_margin': row['avg_profit_margin']
+        })
+    return rows
+
+
+def peak_sales_by_month(ctx):
+    """Doanh số cao điểm theo tháng"""
+    return list(_product_queryset(ctx.params).values('month')
+                .annotate(total_sales=Sum('sales'))
+                .order_by('-total_sales'))
+
+
+def peak_sales_by_day(ctx):
+    """Doanh số cao điểm theo ngày trong tuần"""
+    return list(_product_queryset(ctx.params).values(day=F('weekday'))
+                .annotate(total_sales=Sum('sales'))
+                .order_by('-total_sales'))
+
+
+def sales_by_month_day(ctx):
+    """Doanh số theo tháng và ngày trong tuần (cho heatmap)"""
+    return list(_product_queryset(ctx.params).values('month', day=F('weekday'))
+                .annotate(total_sales=Sum('sales'))
+                .order_by('month', 'day'))
+
+
+# Các widget của backend: id -> hàm nhận WidgetContext (xem engines/widgets.py)
+WIDGETS = {
+    'overview_kpi': overview_kpi,
+    **{name: _overview_breakdown(name) for name in OVERVIEW_BREAKDOWNS},
+    'order_quantity_distribution': order_quantity_distribution,
+    'top_products_by_market': top_products_by_market,
+    'profit_by_region_market': profit_by_region_market,
+    'customer_kpi': customer_kpi,
+    'customers_by_segment': customers_by_segment,
+    'purchase_frequency': purchase_frequency,
+    'top_customers': top_customers,
+    'product_metrics_page': product_metrics_page,
+    'product_metrics': product_metrics_results,
+    'product_metrics_next': product_metrics_next,
+    'category_metrics': category_metrics,
+    'peak_sales_by_month': peak_sales_by_month,
+    'peak_sales_by_day': peak_sales_by_day,
+    'sales_by_month_day': sales_by_month_day,
+}
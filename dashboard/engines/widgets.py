@@ -0,0 +1,169 @@
+# dashboard/engines/widgets.py
+
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import ExitStack
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from ..queries import FILTER_FIELDS
+
+# Các trang dashboard: tham số lọc trang nhận và widget tạo ra từng khoá của JSON
+PAGES = {
+    'overview': {
+        'filters': list(FILTER_FIELDS),
+        'widgets': {
+            'kpi': 'overview_kpi',
+            'sales_by_market': 'sales_by_market',
+            'quantity_by_year': 'quantity_by_year',
+            'profit_by_category': 'profit_by_category',
+            'sales_by_segment': 'sales_by_segment',
+            'order_quantity_distribution': 'order_quantity_distribution',
+        },
+    },
+    'market': {
+        'filters': ['market_id'],
+        'widgets': {
+            'sales_by_market': 'sales_by_market',
+            'top_products_by_market': 'top_products_by_market',
+            'profit_by_region_market': 'profit_by_region_market',
+        },
+    },
+    'customer': {
+        'filters': ['segment_id'],
+        'widgets': {
+            'kpi': 'customer_kpi',
+            'customers_by_segment': 'customers_by_segment',
+            'purchase_frequency': 'purchase_frequency',
+            'top_customers': 'top_customers',
+        },
+    },
+    'product': {
+        'filters': ['category_id', 'subcategory_id', 'product_id'],
+        'widgets': {
+            'product_metrics': 'product_metrics',
+            'product_metrics_next': 'product_metrics_next',
+            'category_metrics': 'category_metrics',
+            'peak_sales_by_month': 'peak_sales_by_month',
+            'peak_sales_by_day': 'peak_sales_by_day',
+            'sales_by_month_day': 'sales_by_month_day',
+        },
+    },
+}
+
+
+class WidgetContext:
+    """
+    Trạng thái dùng chung khi tính một nhóm widget: tham số lọc, danh sách widget được yêu cầu
+    và các kết quả trung gian (mỗi truy vấn con chung chỉ chạy một lần, kể cả khi các widget
+    chạy song song trên nhiều luồng).
+    """
+
+    def __init__(self, params, widgets):
+        self.params = params
+        self.widgets = set(widgets)
+        self._shared = {}
+        self._lock = threading.Lock()
+
+    def shared(self, key, compute):
+        """Kết quả của compute() theo key; luồng gọi đầu tiên tính, các luồng khác chờ kết quả"""
+        with self._lock:
+            future = self._shared.get(key)
+            owner = future is None
+            if owner:
+                future = self._shared[key] = Future()
+        if owner:
+            try:
+                future.set_result(compute())
+            except BaseException as e:
+                future.set_exception(e)
+        return future.result()
+
+
+def _caller_wrappers():
+    """Các execute_wrapper đang bật trên kết nối DB của luồng hiện tại, theo alias"""
+    return {alias: list(connections[alias].execute_wrappers) for alias in connections}
+
+
+def _workers():
+    """Số widget tối đa được tính đồng thời trong một request đồng bộ (1: tính lần lượt)"""
+    return max(getattr(settings, 'DASHBOARD_WIDGET_WORKERS', 1), 1)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _executor():
+    """
+    Thread pool dùng chung, sống suốt tiến trình (DASHBOARD_WIDGET_POOL_SIZE luồng): mỗi luồng giữ
+    kết nối DB của nó giữa các request nên không phải mở kết nối và đặt pragma lại cho từng widget.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=max(getattr(settings, 'DASHBOARD_WIDGET_POOL_SIZE', 4), 1),
+                thread_name_prefix='widget'
+            )
+        return _pool
+
+
+def _in_worker(function, wrappers):
+    """
+    Chạy function trên một luồng của pool với cùng các execute_wrapper của luồng gọi
+    (đo hiệu năng, đếm truy vấn). Kết nối của luồng được giữ lại cho lần sau, chỉ đóng khi
+    lỗi hoặc quá CONN_MAX_AGE (như close_old_connections sau mỗi request).
+    """
+    for connection in connections.all(initialized_only=True):
+        connection.close_if_unusable_or_obsolete()
+    with ExitStack() as stack:
+        for alias, alias_wrappers in wrappers.items():
+            for wrapper in alias_wrappers:
+                if wrapper in connections[alias].execute_wrappers:
+                    continue
+                stack.enter_context(connections[alias].execute_wrapper(wrapper))
+        return function()
+
+
+def run_widgets(registry, widgets, params, workers=None):
+    """
+    Tính các widget (theo thứ tự, không trùng lặp) bằng các hàm trong registry của một backend.
+    Mặc định các widget chạy lần lượt trên luồng của request; với workers (mặc định
+    DASHBOARD_WIDGET_WORKERS) > 1, các widget độc lập chạy song song trên pool dùng chung.
+    Truy vấn con chung được tính một lần qua WidgetContext.shared.
+    """
+    widgets = list(dict.fromkeys(widgets))
+    context = WidgetContext(params, widgets)
+    workers = min(workers or _workers(), len(widgets))
+    if workers <= 1:
+        return {widget: registry[widget](context) for widget in widgets}
+
+    wrappers = _caller_wrappers()
+    executor = _executor()
+    futures = {
+        widget: executor.submit(_in_worker, lambda widget=widget: registry[widget](context), wrappers)
+        for widget in widgets
+    }
+    return {widget: future.result() for widget, future in futures.items()}
+
+
+async def arun_widgets(registry, widgets, params):
+    """
+    Bản async của run_widgets cho view ASGI: các widget chạy đồng thời trên pool dùng chung
+    (mỗi luồng giữ kết nối DB riêng) rồi được gom bằng asyncio.gather, nên độ trễ gần với
+    widget chậm nhất thay vì tổng các widget.
+    """
+    widgets = list(dict.fromkeys(widgets))
+    context = WidgetContext(params, widgets)
+    # execute_wrapper (đo hiệu năng, đếm truy vấn) được gắn trên luồng đồng bộ của request
+    wrappers = await sync_to_async(_caller_wrappers)()
+    loop = asyncio.get_running_loop()
+    executor = _executor()
+    return dict(zip(widgets, await asyncio.gather(*(
+        loop.run_in_executor(executor, _in_worker, lambda widget=widget: registry[widget](context), wrappers)
+        for widget in widgets
+    ))))
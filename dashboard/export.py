@@ -0,0 +1,168 @@
+# dashboard/export.py
+
+import csv
+import io
+import tempfile
+from decimal import Decimal
+
+from django.http import StreamingHttpResponse
+
+from .models import OrderDetail
+from .queries import apply_filters
+
+# Số dòng đọc từ DB mỗi lần (QuerySet.iterator)
+EXPORT_CHUNK_SIZE = 2000
+
+# Kích thước tối thiểu của một khối trong response (byte)
+BLOCK_SIZE = 64 * 1024
+
+# Số dòng dữ liệu tối đa của một sheet Excel (không tính dòng tiêu đề)
+XLSX_MAX_ROWS = 1048575
+
+# Các cột xuất: (tiêu đề giống file nhập nên file xuất nhập lại được, lookup trên OrderDetail, kiểu Parquet)
+EXPORT_COLUMNS = [
+    ('Row ID', 'row_id', 'int64'),
+    ('Order ID', 'order__order_id', 'string'),
+    ('Order Date', 'order__order_date', 'date32'),
+    ('Customer ID', 'order__customer__customer_id', 'string'),
+    ('Segment', 'order__customer__segment__name', 'string'),
+    ('City', 'order__city__name', 'string'),
+    ('State', 'order__city__state__name', 'string'),
+    ('Country', 'order__city__state__country__name', 'string'),
+    ('Country latitude', 'order__city__state__country__latitude', 'float64'),
+    ('Country longitude', 'order__city__state__country__longitude', 'float64'),
+    ('Market', 'order__city__state__country__market__name', 'string'),
+    ('Region', 'order__city__state__country__market__region__name', 'string'),
+    ('Category', 'product__subcategory__category__name', 'string'),
+    ('Subcategory', 'product__subcategory__name', 'string'),
+    ('Product', 'product__name', 'string'),
+    ('Sales', 'sales', 'float64'),
+    ('Quantity', 'quantity', 'int64'),
+    ('Discount', 'discount', 'float64'),
+    ('Profit', 'profit', 'float64'),
+]
+
+# Tham số lọc chung của dashboard -> field của OrderDetail
+EXPORT_FILTER_FIELDS = {
+    'year': 'order__year',
+    'quarter': 'order__quarter',
+    'month': 'order__month',
+    'market_id': 'order__city__state__country__market_id',
+    'segment_id': 'order__customer__segment_id',
+    'category_id': 'product__subcategory__category_id',
+    'subcategory_id': 'product__subcategory_id',
+    'product_id': 'product_id',
+}
+
+
+def export_rows(params):
+    """Các dòng OrderDetail khớp bộ lọc, dạng tuple theo EXPORT_COLUMNS, sắp theo Row ID"""
+    queryset = apply_filters(OrderDetail.objects.all(), params, EXPORT_FILTER_FIELDS)
+    return queryset.order_by('row_id').values_list(*(lookup for _, lookup, _ in EXPORT_COLUMNS))
+
+
+def _chunks(rows, size=EXPORT_CHUNK_SIZE):
+    """Đọc queryset bằng iterator (bộ nhớ không phụ thuộc số dòng), mỗi lần một danh sách size dòng"""
+    chunk = []
+    for row in rows.iterator(chunk_size=size):
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _read_blocks(file):
+    """Đọc lại file tạm từ đầu theo từng khối BLOCK_SIZE byte"""
+    file.seek(0)
+    yield from iter(lambda: file.read(BLOCK_SIZE), b'')
+
+
+def iter_csv(rows):
+    """CSV (UTF-8) được ghi dần theo từng khối"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([header for header, _, _ in EXPORT_COLUMNS])
+    for chunk in _chunks(rows):
+        writer.writerows(chunk)
+        if buffer.tell() >= BLOCK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def iter_xlsx(rows):
+    """
+    XLSX bằng workbook write-only của openpyxl (các dòng được ghi ra file tạm, không giữ trong bộ nhớ).
+    Định dạng zip chỉ hoàn chỉnh khi lưu xong nên file được gửi sau khi ghi hết dữ liệu.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Orders')
+    sheet.append([header for header, _, _ in EXPORT_COLUMNS])
+    for chunk in _chunks(rows):
+        for row in chunk:
+            sheet.append(row)
+    with tempfile.TemporaryFile() as file:
+        workbook.save(file)
+        yield from _read_blocks(file)
+
+
+def _pyarrow():
+    """Module pyarrow và pyarrow.parquet (kiểm tra trước khi bắt đầu gửi response)"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ValueError("Cần cài đặt pyarrow để xuất file Parquet")
+    return pyarrow, pyarrow.parquet
+
+
+def iter_parquet(rows):
+    """Parquet: mỗi phần EXPORT_CHUNK_SIZE dòng là một row group, ghi ra file tạm rồi gửi đi"""
+    pa, pq = _pyarrow()
+    schema = pa.schema([(header, getattr(pa, type_name)()) for header, _, type_name in EXPORT_COLUMNS])
+    with tempfile.TemporaryFile() as file:
+        with pq.ParquetWriter(file, schema) as writer:
+            for chunk in _chunks(rows):
+                columns = [
+                    [float(value) if isinstance(value, Decimal) else value for value in column]
+                    for column in zip(*chunk)
+                ]
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                    schema=schema
+                ))
+        yield from _read_blocks(file)
+
+
+# Định dạng xuất (tham số format=): hàm tạo nội dung và content type
+EXPORT_FORMATS = {
+    'csv': (iter_csv, 'text/csv; charset=utf-8'),
+    'xlsx': (iter_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'parquet': (iter_parquet, 'application/vnd.apache.parquet'),
+}
+
+
+def export_response(params):
+    """
+    StreamingHttpResponse xuất các dòng đơn hàng khớp bộ lọc theo format= (csv mặc định, xlsx, parquet).
+    ValueError nếu định dạng không hợp lệ, thiếu thư viện hoặc quá số dòng của một sheet Excel.
+    """
+    file_format = params.get('format') or 'csv'
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"format không hợp lệ: {file_format} (chọn một trong {', '.join(EXPORT_FORMATS)})")
+    if file_format == 'parquet':
+        _pyarrow()
+
+    rows = export_rows(params)
+    if file_format == 'xlsx' and rows.count() > XLSX_MAX_ROWS:
+        raise ValueError(f"Quá {XLSX_MAX_ROWS} dòng cho một sheet Excel, hãy lọc thêm hoặc dùng csv/parquet")
+
+    generate, content_type = EXPORT_FORMATS[file_format]
+    response = StreamingHttpResponse(generate(rows), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="orders.{file_format}"'
+    return response
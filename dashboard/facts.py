@@ -0,0 +1,84 @@
+# dashboard/facts.py
+
+from functools import reduce
+from operator import or_
+
+from django.db import connections, router, transaction
+from django.db.models import F, Q
+
+from .models import OrderDetail, SalesFact
+
+# Các cột của SalesFact -> biểu thức tương ứng trên OrderDetail
+FACT_COLUMNS = {
+    'row_id': F('row_id'),
+    'order': F('order_id'),
+    'order_date': F('order__order_date'),
+    'year': F('order__year'),
+    'month': F('order__month'),
+    'quarter': F('order__quarter'),
+    'weekday': F('order__weekday'),
+    'market': F('order__city__state__country__market_id'),
+    'region': F('order__city__state__country__market__region_id'),
+    'country': F('order__city__state__country_id'),
+    'segment': F('order__customer__segment_id'),
+    'customer': F('order__customer_id'),
+    'category': F('product__subcategory__category_id'),
+    'subcategory': F('product__subcategory_id'),
+    'product': F('product_id'),
+    'quantity': F('quantity'),
+    'sales': F('sales'),
+    'discount': F('discount'),
+    'profit': F('profit'),
+}
+
+
+def period_filter(periods, prefix=''):
+    """Điều kiện Q chọn các dòng có cột year/month thuộc các (năm, tháng) trong periods"""
+    return reduce(or_, (
+        Q(**{f'{prefix}year': year, f'{prefix}month': month}) for year, month in sorted(periods)
+    ))
+
+
+def insert_from_select(model, queryset, columns, aggregates=None):
+    """
+    Chèn kết quả của queryset vào bảng của model bằng một câu lệnh INSERT ... SELECT,
+    để dữ liệu không phải đi qua Python. columns và aggregates là dict
+    {tên field của model: biểu thức}; nếu có aggregates thì nhóm theo columns.
+    """
+    # Câu SELECT chạy cùng kết nối ghi với INSERT (không qua kết nối chỉ đọc)
+    queryset = queryset.using(router.db_for_write(model))
+    # Alias có tiền tố để không trùng với tên field của model nguồn
+    queryset = queryset.values(**{f'v_{name}': expression for name, expression in columns.items()})
+    if aggregates:
+        queryset = queryset.annotate(**{f'v_{name}': expression for name, expression in aggregates.items()})
+    queryset = queryset.order_by()
+
+    connection = connections[queryset.db]
+    quote = connection.ops.quote_name
+    names = list(columns) + list(aggregates or {})
+    target = ', '.join(quote(model._meta.get_field(name).column) for name in names)
+    source = ', '.join(quote(f'v_{name}') for name in names)
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {quote(model._meta.db_table)} ({target}) SELECT {source} FROM ({sql}) source",
+            params
+        )
+        return cursor.rowcount
+
+
+def refresh_facts(periods=None):
+    """
+    Tính lại SalesFact từ OrderDetail cho các (năm, tháng) trong periods; None nghĩa là toàn bộ.
+    """
+    source = OrderDetail.objects.all()
+    facts = SalesFact.objects.all()
+    if periods is not None:
+        if not periods:
+            return
+        source = source.filter(period_filter(periods, 'order__'))
+        facts = facts.filter(period_filter(periods))
+
+    with transaction.atomic():
+        facts.delete()
+        insert_from_select(SalesFact, source, FACT_COLUMNS)
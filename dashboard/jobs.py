@@ -0,0 +1,122 @@
+# dashboard/jobs.py
+
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import ImportJob
+from .utils import IMPORT_MODE_APPEND, check_file_format, count_data_rows, import_data_streaming
+
+# Một worker duy nhất: SQLite chỉ cho phép một tiến trình ghi tại một thời điểm
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'IMPORT_WORKERS', 1),
+    thread_name_prefix='import-job'
+)
+
+
+def _upload_dir():
+    """Thư mục lưu các file upload chờ nhập"""
+    path = getattr(settings, 'IMPORT_UPLOAD_DIR', os.path.join(settings.BASE_DIR, 'media', 'imports'))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def save_upload(uploaded_file):
+    """Lưu file upload xuống đĩa theo từng khối, trả về đường dẫn"""
+    extension = os.path.splitext(uploaded_file.name)[1].lower()
+    path = os.path.join(_upload_dir(), f"{uuid.uuid4().hex}{extension}")
+    with open(path, 'wb') as destination:
+        for chunk in uploaded_file.chunks():
+            destination.write(chunk)
+    return path
+
+
+def submit_import(uploaded_file, mode=IMPORT_MODE_APPEND):
+    """Lưu file, tạo ImportJob và đưa vào hàng đợi xử lý nền (ValueError nếu định dạng file không hỗ trợ)"""
+    check_file_format(uploaded_file)
+    path = save_upload(uploaded_file)
+    job = ImportJob.objects.create(file_path=path, file_name=uploaded_file.name, mode=mode)
+    if getattr(settings, 'IMPORT_JOBS_IN_PROCESS', True):
+        transaction.on_commit(lambda: _executor.submit(_run_in_thread, job.id))
+    return job
+
+
+def _run_in_thread(job_id):
+    """Chạy job trong thread của executor và giải phóng kết nối DB của thread"""
+    close_old_connections()
+    try:
+        run_import_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def run_import_job(job_id):
+    """Thực thi một ImportJob đang chờ, cập nhật tiến độ sau mỗi phần dữ liệu"""
+    # Chỉ một worker được nhận job (tránh chạy trùng với lệnh process_import_jobs)
+    claimed = ImportJob.objects.filter(id=job_id, status=ImportJob.STATUS_PENDING).update(
+        status=ImportJob.STATUS_RUNNING, started_at=timezone.now()
+    )
+    if not claimed:
+        return None
+    job = ImportJob.objects.get(id=job_id)
+
+    try:
+        total_rows = count_data_rows(job.file_path)
+    except Exception:
+        total_rows = None
+    ImportJob.objects.filter(id=job.id).update(total_rows=total_rows)
+
+    def progress(report):
+        ImportJob.objects.filter(id=job.id).update(rows_processed=report['rows'], report=report)
+
+    try:
+        success, message, report = import_data_streaming(job.file_path, progress=progress, mode=job.mode)
+    except Exception as e:
+        success, message, report = False, f"Lỗi khi nhập dữ liệu: {str(e)}", {}
+
+    ImportJob.objects.filter(id=job.id).update(
+        status=ImportJob.STATUS_SUCCEEDED if success else ImportJob.STATUS_FAILED,
+        rows_processed=report.get('rows', 0),
+        message=message,
+        report=report,
+        finished_at=timezone.now()
+    )
+    # File upload chỉ dùng cho một lần nhập: xoá cả khi job lỗi (người dùng tải lên lại để thử lại)
+    if os.path.exists(job.file_path):
+        os.remove(job.file_path)
+    return success
+
+
+def job_status(job):
+    """Trạng thái job dạng dict: số dòng đã xử lý, tốc độ (dòng/giây) và thời gian còn lại ước tính"""
+    end = job.finished_at or timezone.now()
+    elapsed = (end - job.started_at).total_seconds() if job.started_at else 0
+    throughput = job.rows_processed / elapsed if elapsed > 0 else 0
+
+    percent = None
+    eta_seconds = None
+    if job.status == ImportJob.STATUS_SUCCEEDED:
+        percent = 100.0
+        eta_seconds = 0
+    elif job.total_rows:
+        percent = round(min(job.rows_processed / job.total_rows, 1) * 100, 1)
+        if throughput:
+            eta_seconds = round(max(job.total_rows - job.rows_processed, 0) / throughput, 1)
+
+    return {
+        'id': job.id,
+        'file_name': job.file_name,
+        'status': job.status,
+        'rows_processed': job.rows_processed,
+        'total_rows': job.total_rows,
+        'percent': percent,
+        'rows_per_second': round(throughput, 1),
+        'elapsed_seconds': round(elapsed, 1),
+        'eta_seconds': eta_seconds,
+        'message': job.message,
+        'report': job.report,
+    }
@@ -0,0 +1,144 @@
+import json
+import time
+
+from django.db import reset_queries
+from django.db.models import Count, F, Sum
+from django.db.models.functions import ExtractYear
+from django.http import QueryDict
+from django.test.utils import CaptureQueriesContext
+from django.core.management.base import BaseCommand
+
+from dashboard.database import read_connection
+from dashboard.models import OrderDetail, SalesFact, SalesRollup
+from dashboard.planner import aggregate_breakdowns
+from dashboard.engines.orm import OVERVIEW_BREAKDOWNS
+from dashboard.queries import CATEGORY_KEY, MARKET_KEY, SEGMENT_KEY, apply_filters
+
+# Các tổ hợp bộ lọc được đo
+FILTER_COMBINATIONS = ['', 'year=2013', 'year=2013&quarter=2', 'month=5']
+
+# Chiến lược dùng làm mốc so sánh (cách tính trước khi có bảng tổng hợp)
+BASELINE = 'orderdetail_joins'
+
+
+def orderdetail_joins(params):
+    """
+    Cách ban đầu của overview_data: mỗi KPI một aggregate() (không theo bộ lọc) và mỗi biểu đồ
+    một truy vấn nhóm trên OrderDetail join qua Order/City/State/Country/Market, Product...
+    """
+    queryset = OrderDetail.objects.all()
+    if params.get('year'):
+        queryset = queryset.filter(order__order_date__year=params['year'])
+    if params.get('month'):
+        queryset = queryset.filter(order__order_date__month=params['month'])
+    if params.get('quarter'):
+        queryset = queryset.filter(order__order_date__quarter=params['quarter'])
+    return {
+        'total_sales': OrderDetail.objects.aggregate(total=Sum('sales'))['total'],
+        'total_profit': OrderDetail.objects.aggregate(total=Sum('profit'))['total'],
+        'total_quantity': OrderDetail.objects.aggregate(total=Sum('quantity'))['total'],
+        'sales_by_market': list(queryset.values(MARKET_KEY)
+                                .annotate(total_sales=Sum('sales')).order_by('-total_sales')),
+        'quantity_by_year': list(queryset.annotate(year=ExtractYear('order__order_date')).values('year')
+                                 .annotate(total_quantity=Sum('quantity')).order_by('year')),
+        'profit_by_category': list(queryset.values(CATEGORY_KEY)
+                                   .annotate(total_profit=Sum('profit')).order_by('-total_profit')),
+        'sales_by_segment': list(queryset.values(SEGMENT_KEY)
+                                 .annotate(total_sales=Sum('sales')).order_by('-total_sales')),
+        'order_quantity_distribution': list(queryset.values('quantity')
+                                            .annotate(count=Count('id')).order_by('quantity')),
+    }
+
+
+def separate_queries(params):
+    """Bảng tổng hợp, nhưng mỗi KPI một aggregate() và mỗi biểu đồ một truy vấn nhóm riêng"""
+    queryset = apply_filters(SalesRollup.objects.all(), params)
+    facts = apply_filters(SalesFact.objects.all(), params)
+    return {
+        'total_sales': queryset.aggregate(total=Sum('sales'))['total'],
+        'total_profit': queryset.aggregate(total=Sum('profit'))['total'],
+        'total_quantity': queryset.aggregate(total=Sum('quantity'))['total'],
+        'sales_by_market': list(queryset.values(**{MARKET_KEY: F('market__name')})
+                                .annotate(total_sales=Sum('sales')).order_by('-total_sales')),
+        'quantity_by_year': list(queryset.values('year')
+                                 .annotate(total_quantity=Sum('quantity')).order_by('year')),
+        'profit_by_category': list(queryset.values(**{CATEGORY_KEY: F('category__name')})
+                                   .annotate(total_profit=Sum('profit')).order_by('-total_profit')),
+        'sales_by_segment': list(queryset.values(**{SEGMENT_KEY: F('segment__name')})
+                                 .annotate(total_sales=Sum('sales')).order_by('-total_sales')),
+        'order_quantity_distribution': list(facts.values('quantity')
+                                            .annotate(count=Count('id')).order_by('quantity')),
+    }
+
+
+def single_pass(params):
+    """Cách mới: KPI và các biểu đồ nhóm trong một lần quét, cộng dồn trong Python"""
+    queryset = apply_filters(SalesRollup.objects.all(), params)
+    facts = apply_filters(SalesFact.objects.all(), params)
+    breakdowns, kpi = aggregate_breakdowns(queryset, OVERVIEW_BREAKDOWNS, totals=('sales', 'profit', 'quantity'))
+    breakdowns['order_quantity_distribution'] = list(facts.values('quantity')
+                                                     .annotate(count=Count('id')).order_by('quantity'))
+    return {**kpi, **breakdowns}
+
+
+STRATEGIES = {
+    BASELINE: orderdetail_joins,
+    'separate_queries': separate_queries,
+    'single_pass': single_pass,
+}
+
+
+class Command(BaseCommand):
+    help = ("So sánh số truy vấn và thời gian của overview_data: join trên OrderDetail (cách ban đầu), "
+            "truy vấn riêng lẻ trên bảng tổng hợp và một lần quét")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help="Số lần lặp cho mỗi tổ hợp bộ lọc")
+        parser.add_argument('--json', action='store_true', help="In kết quả dạng JSON")
+
+    def handle(self, *args, **options):
+        results = []
+        regressions = []
+        for query_string in FILTER_COMBINATIONS:
+            params = QueryDict(query_string)
+            timings = {}
+            for name, strategy in STRATEGIES.items():
+                with CaptureQueriesContext(read_connection()) as queries:
+                    strategy(params)
+                query_count = len(queries.captured_queries)
+                started = time.perf_counter()
+                for _ in range(options['iterations']):
+                    strategy(params)
+                    reset_queries()
+                elapsed = (time.perf_counter() - started) / options['iterations']
+                timings[name] = elapsed
+                results.append({
+                    'filters': query_string or '(none)',
+                    'strategy': name,
+                    'queries': query_count,
+                    'ms': round(elapsed * 1000, 2),
+                    # Số lần nhanh hơn cách ban đầu (< 1 nghĩa là chậm hơn)
+                    'speedup': round(timings[BASELINE] / elapsed, 2) if elapsed else None,
+                })
+            # single_pass chậm hơn một cách khác với cùng bộ lọc là hồi quy cần báo
+            for name, elapsed in timings.items():
+                if name != 'single_pass' and timings['single_pass'] > elapsed:
+                    regressions.append({
+                        'filters': query_string or '(none)',
+                        'slower_than': name,
+                        'ms': round(timings['single_pass'] * 1000, 2),
+                        'other_ms': round(elapsed * 1000, 2),
+                    })
+
+        if options['json']:
+            self.stdout.write(json.dumps({'results': results, 'regressions': regressions}, indent=2))
+            return
+        self.stdout.write(f"{'filters':<22}{'strategy':<20}{'queries':>8}{'ms':>10}{'speedup':>9}")
+        for row in results:
+            self.stdout.write(f"{row['filters']:<22}{row['strategy']:<20}{row['queries']:>8}{row['ms']:>10}"
+                              f"{row['speedup']:>8}x")
+        for row in regressions:
+            self.stdout.write(self.style.WARNING(
+                f"single_pass chậm hơn {row['slower_than']} với bộ lọc {row['filters']}: "
+                f"{row['ms']} ms so với {row['other_ms']} ms"
+            ))
@@ -0,0 +1,94 @@
+import re
+
+from asgiref.sync import iscoroutinefunction
+from django.core.management.base import BaseCommand, CommandError
+from django.http import QueryDict
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+from dashboard.benchmark.scenarios import ENDPOINTS, scenarios
+from dashboard.database import read_connection
+from dashboard.queries import FILTER_FIELDS
+
+# Các bảng lớn: quét toàn bộ bảng khi đang có bộ lọc được coi là lỗi hồi quy
+LARGE_TABLES = [
+    'dashboard_order', 'dashboard_orderdetail', 'dashboard_salesfact',
+    'dashboard_salesrollup', 'dashboard_orderrollup',
+]
+
+# Một dòng "SCAN <bảng>" không kèm chỉ mục trong EXPLAIN QUERY PLAN của SQLite
+FULL_SCAN = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+
+
+def explain(sql):
+    """Kế hoạch thực thi của một câu SQL dưới dạng danh sách dòng"""
+    connection = read_connection()
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+        cursor.execute(f'EXPLAIN {sql}')
+        return [' '.join(str(value) for value in row) for row in cursor.fetchall()]
+
+
+def full_scans(plan):
+    """Các bảng lớn bị quét toàn bộ (không dùng chỉ mục) trong kế hoạch"""
+    tables = []
+    for line in plan:
+        match = FULL_SCAN.match(line.strip())
+        if match and match.group(1) in LARGE_TABLES:
+            tables.append(match.group(1))
+    return tables
+
+
+class Command(BaseCommand):
+    help = "In EXPLAIN QUERY PLAN của mọi truy vấn mà các API dashboard thực thi, đánh dấu các lần quét toàn bảng"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoint', action='append', choices=list(ENDPOINTS),
+                            help="Chỉ kiểm tra endpoint này (có thể lặp lại)")
+        parser.add_argument('--sql', action='store_true', help="In đầy đủ câu SQL")
+        parser.add_argument('--fail-on-scan', action='store_true',
+                            help="Báo lỗi nếu truy vấn có bộ lọc phải quét toàn bộ một bảng lớn")
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        regressions = []
+
+        for path, query_string in scenarios(options['endpoint']):
+            view = resolve(path).func
+            if iscoroutinefunction(view):
+                # View async chạy đúng các truy vấn của view đồng bộ tương ứng, trên luồng của pool
+                continue
+            # Chỉ các tham số lọc của apply_filters (không phải sort, q, limit, format...) cần chỉ mục
+            filtered = any(name in FILTER_FIELDS for name in QueryDict(query_string))
+            # Tắt cache để các truy vấn thực sự được chạy
+            with override_settings(DASHBOARD_CACHE_ENABLED=False), \
+                    CaptureQueriesContext(read_connection()) as queries:
+                view(factory.get(f'{path}?{query_string}'))
+            statements = [query['sql'] for query in queries.captured_queries
+                          if query['sql'].lstrip().upper().startswith(('SELECT', 'WITH'))]
+
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{path}?{query_string} ({len(statements)} truy vấn)"
+            ))
+            for sql in statements:
+                plan = explain(sql)
+                scans = full_scans(plan)
+                self.stdout.write(f"  {sql if options['sql'] else sql[:120]}")
+                for line in plan:
+                    self.stdout.write(f"      {line}")
+                if scans and filtered:
+                    regressions.append((path, query_string, scans))
+                    self.stdout.write(self.style.WARNING(
+                        f"      ! quét toàn bảng: {', '.join(scans)}"
+                    ))
+
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS("Không có truy vấn có bộ lọc nào phải quét toàn bảng"))
+            return
+        message = f"{len(regressions)} truy vấn có bộ lọc phải quét toàn bảng"
+        if options['fail_on_scan']:
+            raise CommandError(message)
+        self.stdout.write(self.style.WARNING(message))
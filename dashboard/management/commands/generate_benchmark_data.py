@@ -0,0 +1,42 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.benchmark import SIZES, default_path, parse_size, write_dataset
+
+
+class Command(BaseCommand):
+    help = "Sinh file dữ liệu bán hàng dạng Superstore (xác định theo seed) để đo hiệu năng nhập và API"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', action='append',
+                            help=f"Số dòng: {', '.join(SIZES)} hoặc một số nguyên (có thể lặp lại, mặc định 10k)")
+        parser.add_argument('--format', choices=['csv', 'xlsx', 'parquet'], default='csv')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help="Đường dẫn file (chỉ dùng khi sinh một kích thước)")
+        parser.add_argument('--force', action='store_true', help="Ghi đè file đã tồn tại")
+
+    def handle(self, *args, **options):
+        sizes = options['size'] or ['10k']
+        if options['output'] and len(sizes) > 1:
+            raise CommandError("--output chỉ dùng được với một --size")
+
+        for size in sizes:
+            try:
+                rows = parse_size(size)
+            except ValueError as e:
+                raise CommandError(str(e))
+            path = options['output'] or default_path(size.lower(), options['format'], options['seed'])
+            if os.path.exists(path) and not options['force']:
+                self.stdout.write(f"Đã có {path} (dùng --force để sinh lại)")
+                continue
+
+            started = time.perf_counter()
+            try:
+                write_dataset(path, rows, seed=options['seed'])
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(
+                f"Đã sinh {rows} dòng vào {path} trong {time.perf_counter() - started:.1f} giây"
+            ))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from dashboard.jobs import run_import_job
+from dashboard.models import ImportJob
+
+
+class Command(BaseCommand):
+    help = "Chạy các tác vụ nhập dữ liệu đang chờ (dùng khi IMPORT_JOBS_IN_PROCESS = False hoặc sau khi khởi động lại)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--watch', action='store_true', help="Chạy liên tục và kiểm tra job mới định kỳ")
+        parser.add_argument('--interval', type=float, default=2.0, help="Số giây giữa hai lần kiểm tra khi dùng --watch")
+
+    def handle(self, *args, **options):
+        while True:
+            job_ids = list(ImportJob.objects.filter(status=ImportJob.STATUS_PENDING)
+                           .order_by('created_at')
+                           .values_list('id', flat=True))
+            for job_id in job_ids:
+                self.stdout.write(f"Đang chạy job {job_id}...")
+                success = run_import_job(job_id)
+                if success is not None:
+                    job = ImportJob.objects.get(id=job_id)
+                    style = self.style.SUCCESS if success else self.style.ERROR
+                    self.stdout.write(style(job.message))
+            if not options['watch']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.cohorts import refresh_cohorts
+from dashboard.facts import refresh_facts
+from dashboard.models import CohortRetention, CustomerRFM, OrderRollup, SalesFact, SalesRollup
+from dashboard.rfm import refresh_rfm
+from dashboard.rollups import refresh_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Tính lại toàn bộ bảng fact (SalesFact), các bảng tổng hợp (SalesRollup, OrderRollup), "
+        "ma trận cohort (CustomerCohort, CohortRetention) và điểm RFM (CustomerRFM) từ OrderDetail"
+    )
+
+    def handle(self, *args, **options):
+        refresh_facts()
+        refresh_rollups()
+        refresh_cohorts()
+        refresh_rfm()
+        self.stdout.write(self.style.SUCCESS(
+            f"Đã tạo {SalesFact.objects.count()} dòng SalesFact, {SalesRollup.objects.count()} dòng SalesRollup, "
+            f"{OrderRollup.objects.count()} dòng OrderRollup, {CohortRetention.objects.count()} dòng CohortRetention "
+            f"và {CustomerRFM.objects.count()} dòng CustomerRFM"
+        ))
@@ -0,0 +1,133 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from dashboard.benchmark import SIZES, default_path, parse_size, write_dataset
+from dashboard.benchmark.runner import compare_results, run_benchmark
+from dashboard.benchmark.scenarios import ENDPOINTS
+from dashboard.engines import ENGINES
+from dashboard.utils import CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        "Đo tốc độ nhập dữ liệu và thời gian, số truy vấn, bộ nhớ của các API dashboard "
+        "trên một DB riêng (test database), xuất kết quả JSON để so sánh giữa các commit"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', default='10k', help=f"Kích thước dữ liệu: {', '.join(SIZES)} hoặc số dòng")
+        parser.add_argument('--format', choices=['csv', 'xlsx', 'parquet'], default='csv')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--dataset', help="Dùng file dữ liệu có sẵn thay vì file sinh tự động")
+        parser.add_argument('--iterations', type=int, default=5, help="Số lần gọi mỗi endpoint")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--endpoint', action='append', choices=list(ENDPOINTS),
+                            help="Chỉ đo endpoint này (có thể lặp lại)")
+        parser.add_argument('--engine', action='append', choices=list(ENGINES),
+                            help="Backend cần đo (có thể lặp lại, mặc định theo DASHBOARD_ENGINE)")
+        parser.add_argument('--clients', type=int, action='append',
+                            help="Số client đồng thời để so sánh view đồng bộ và async (có thể lặp lại)")
+        parser.add_argument('--with-cache', action='store_true', help="Đo khi bật cache response")
+        parser.add_argument('--existing-db', action='store_true',
+                            help="Không nhập dữ liệu, chỉ đo các API trên DB hiện tại")
+        parser.add_argument('--database-file',
+                            help="File SQLite cho DB benchmark (mặc định SQLite dùng DB trong bộ nhớ)")
+        parser.add_argument('--output', help="Ghi kết quả JSON ra file (mặc định in ra màn hình)")
+        parser.add_argument('--compare', help="File JSON kết quả trước đó để so sánh")
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError("--iterations phải lớn hơn 0")
+        if any(count < 1 for count in options['clients'] or []):
+            raise CommandError("--clients phải lớn hơn 0")
+        previous = None
+        if options['compare']:
+            with open(options['compare']) as f:
+                previous = json.load(f)
+
+        dataset = None
+        if not options['existing_db']:
+            dataset = options['dataset'] or self._dataset(options)
+        log = lambda message: self.stderr.write(message)
+
+        if options['existing_db']:
+            results = self._run(None, options, log)
+        else:
+            # Nhập vào test database để không đụng tới dữ liệu thật
+            if options['database_file']:
+                connection.settings_dict['TEST']['NAME'] = options['database_file']
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            mirrors = self._mirror_test_db()
+            try:
+                results = self._run(dataset, options, log)
+            finally:
+                for alias, name in mirrors.items():
+                    connections[alias].close()
+                    connections[alias].settings_dict['NAME'] = name
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        if previous is not None:
+            results['comparison'] = compare_results(previous, results)
+            self._print_comparison(results['comparison'])
+
+        output = json.dumps(results, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+            self.stderr.write(self.style.SUCCESS(f"Đã ghi kết quả vào {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+    def _mirror_test_db(self):
+        """Trỏ các alias mirror của 'default' (vd. kết nối chỉ đọc) vào test database, trả về tên cũ"""
+        mirrors = {}
+        for alias in connections:
+            if connections[alias].settings_dict.get('TEST', {}).get('MIRROR') == connection.alias:
+                mirrors[alias] = connections[alias].settings_dict['NAME']
+                connections[alias].close()
+                connections[alias].creation.set_as_test_mirror(connection.settings_dict)
+        return mirrors
+
+    def _dataset(self, options):
+        """File dữ liệu benchmark theo kích thước/định dạng/seed, sinh nếu chưa có"""
+        try:
+            rows = parse_size(options['size'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        path = default_path(options['size'].lower(), options['format'], options['seed'])
+        if not os.path.exists(path):
+            self.stderr.write(f"Sinh {rows} dòng vào {path}...")
+            try:
+                write_dataset(path, rows, seed=options['seed'])
+            except ValueError as e:
+                raise CommandError(str(e))
+        return path
+
+    def _run(self, dataset, options, log):
+        try:
+            return run_benchmark(
+                dataset=dataset,
+                iterations=options['iterations'],
+                chunk_size=options['chunk_size'],
+                endpoints=options['endpoint'],
+                engines=options['engine'],
+                use_cache=options['with_cache'],
+                clients=options['clients'],
+                log=log,
+            )
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+    def _print_comparison(self, comparison):
+        if comparison['import_ratio'] is not None:
+            self.stderr.write(f"Nhập dữ liệu: thời gian x{comparison['import_ratio']} so với trước")
+        for row in comparison['endpoints']:
+            style = self.style.ERROR if (row['ratio'] or 0) > 1.2 else self.style.SUCCESS
+            self.stderr.write(style(
+                f"[{row['engine']}] {row['endpoint']}?{row['query']}: "
+                f"{row['p50_before']} -> {row['p50_after']} ms (x{row['ratio']}), "
+                f"{row['queries_before']} -> {row['queries_after']} truy vấn"
+            ))
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.warmup import PAGE_ENDPOINTS, warm_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Tính trước JSON của mọi tổ hợp bộ lọc (năm x quý x tháng, thị trường, phân khúc, "
+        "danh mục/danh mục con) và lưu vào cache của dashboard, dùng khi triển khai"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page', action='append', choices=list(PAGE_ENDPOINTS),
+                            help="Chỉ làm nóng trang này (có thể lặp lại, mặc định mọi trang)")
+        parser.add_argument('--workers', type=int, help="Số luồng tính song song (mặc định DASHBOARD_WARM_WORKERS)")
+        parser.add_argument('--force', action='store_true', help="Tính lại cả các tổ hợp đã có trong cache")
+
+    def handle(self, *args, **options):
+        if not getattr(settings, 'DASHBOARD_CACHE_ENABLED', True):
+            raise CommandError("DASHBOARD_CACHE_ENABLED đang tắt, không có gì để làm nóng")
+        if options['workers'] is not None and options['workers'] < 1:
+            raise CommandError("--workers phải lớn hơn 0")
+
+        result = warm_cache(
+            pages=options['page'],
+            workers=options['workers'],
+            force=options['force'],
+            log=lambda message: self.stdout.write(message),
+        )
+        if result['stale']:
+            raise CommandError("Dữ liệu vừa được nhập lại trong lúc làm nóng, hãy chạy lại lệnh")
+        self.stdout.write(self.style.SUCCESS(
+            f"Đã làm nóng {result['warmed']} tổ hợp ({result['skipped']} tổ hợp đã có sẵn) "
+            f"trên {result['combinations']} tổ hợp trong {result['seconds']} giây"
+        ))
@@ -0,0 +1,137 @@
+# dashboard/middleware.py
+
+import random
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+
+from .perf import QueryTimer, record
+from .serialization import accepted_encoding, compress
+
+
+class PerformanceMiddleware:
+    """
+    Đo từng request được lấy mẫu: số truy vấn SQL, thời gian DB, truy vấn chậm nhất,
+    thời gian Python và kích thước response; lưu theo view để tính phân vị (xem /api/perf/)
+    và gắn header Server-Timing. Tỷ lệ lấy mẫu đặt bằng DASHBOARD_PERF_SAMPLE_RATE (0..1).
+    Chạy được cả đồng bộ lẫn async: view async (ASGI) không bị chuyển qua luồng đồng bộ.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._sampled():
+            return self.get_response(request)
+
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with self._timing(timer):
+            response = self.get_response(request)
+        return self._finish(request, response, timer, started)
+
+    async def __acall__(self, request):
+        if not self._sampled():
+            return await self.get_response(request)
+
+        timer = QueryTimer()
+        started = time.perf_counter()
+        # Kết nối DB thuộc luồng đồng bộ của request (nơi sync_to_async chạy truy vấn) chứ không
+        # thuộc event loop, nên timer được gắn và gỡ trên luồng đó
+        timing = await sync_to_async(self._timing)(timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(timing.close)()
+        return self._finish(request, response, timer, started)
+
+    @staticmethod
+    def _sampled():
+        """Request hiện tại có được đo không"""
+        return getattr(settings, 'DASHBOARD_PERF_ENABLED', True) and \
+            random.random() < getattr(settings, 'DASHBOARD_PERF_SAMPLE_RATE', 1.0)
+
+    @staticmethod
+    def _timing(timer):
+        """Gắn timer vào kết nối của mọi alias trong thời gian xử lý request"""
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(timer))
+        return stack
+
+    @staticmethod
+    def _finish(request, response, timer, started):
+        """Lưu mẫu đo theo view và gắn header Server-Timing"""
+        total = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name or match._func_path) if match else None
+        if view:
+            size = 0 if response.streaming else len(response.content)
+            record(view, total, timer, size, cache_hit=response.get('X-Cache') == 'HIT')
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={timer.seconds * 1000:.2f};desc="{timer.count} queries"',
+            f'app;dur={max(total - timer.seconds, 0) * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ])
+        return response
+
+
+class CompressionMiddleware:
+    """
+    Nén các response JSON lớn (từ DASHBOARD_COMPRESSION_MIN_BYTES byte) bằng brotli nếu đã cài
+    và client chấp nhận, nếu không thì gzip. Đặt trước các middleware đọc/ghi nội dung response.
+    Chạy được cả đồng bộ lẫn async như PerformanceMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self._compress(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self._compress(request, await self.get_response(request))
+
+    @staticmethod
+    def _compress(request, response):
+        """Nén nội dung response nếu đủ lớn và client chấp nhận"""
+        if not getattr(settings, 'DASHBOARD_COMPRESSION_ENABLED', True) or response.streaming \
+                or response.has_header('Content-Encoding') \
+                or not response.get('Content-Type', '').startswith('application/json') \
+                or len(response.content) < getattr(settings, 'DASHBOARD_COMPRESSION_MIN_BYTES', 1024):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = accepted_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+        content = compress(response.content, encoding)
+        if len(content) >= len(response.content):
+            return response
+
+        response.content = content
+        response['Content-Length'] = str(len(content))
+        response['Content-Encoding'] = encoding
+        # Nội dung đã nén khác từng byte với bản gốc nên ETag chỉ còn tương đương yếu
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
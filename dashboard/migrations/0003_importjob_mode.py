@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_importjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='mode',
+            field=models.CharField(choices=[('append', 'Append'), ('incremental', 'Incremental (skip existing Row IDs)'), ('upsert', 'Upsert (update changed measures)')], default='append', max_length=20),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_importjob_mode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.SmallIntegerField()),
+                ('month', models.SmallIntegerField()),
+                ('weekday', models.SmallIntegerField()),
+                ('sales', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('profit', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('quantity', models.IntegerField()),
+                ('line_count', models.IntegerField()),
+                ('order_count', models.IntegerField()),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.customer')),
+                ('market', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.market')),
+                ('region', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.region')),
+                ('segment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.customersegment')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['year', 'month'], name='orderrollup_period_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.SmallIntegerField()),
+                ('month', models.SmallIntegerField()),
+                ('weekday', models.SmallIntegerField()),
+                ('sales', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('profit', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('quantity', models.IntegerField()),
+                ('discount', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('line_count', models.IntegerField()),
+                ('order_count', models.IntegerField()),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.category')),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.customer')),
+                ('market', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.market')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.product')),
+                ('region', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.region')),
+                ('segment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.customersegment')),
+                ('subcategory', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.subcategory')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['year', 'month'], name='salesrollup_period_idx')],
+            },
+        ),
+    ]
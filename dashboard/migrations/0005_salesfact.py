@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0004_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('row_id', models.IntegerField(unique=True)),
+                ('order_date', models.DateField()),
+                ('year', models.SmallIntegerField()),
+                ('month', models.SmallIntegerField()),
+                ('weekday', models.SmallIntegerField()),
+                ('quantity', models.IntegerField()),
+                ('sales', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('discount', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('profit', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('category', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.category')),
+                ('country', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.country')),
+                ('customer', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.customer')),
+                ('market', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.market')),
+                ('order', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.order')),
+                ('product', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.product')),
+                ('region', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.region')),
+                ('segment', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.customersegment')),
+                ('subcategory', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.subcategory')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['year', 'month'], name='salesfact_period_idx'), models.Index(fields=['order_date'], name='salesfact_date_idx'), models.Index(fields=['market', 'year', 'month'], name='salesfact_market_idx'), models.Index(fields=['segment', 'year', 'month'], name='salesfact_segment_idx'), models.Index(fields=['category', 'subcategory', 'product'], name='salesfact_category_idx'), models.Index(fields=['product', 'year'], name='salesfact_product_idx'), models.Index(fields=['customer', 'order_date'], name='salesfact_customer_idx'), models.Index(fields=['order'], name='salesfact_order_idx')],
+            },
+        ),
+    ]
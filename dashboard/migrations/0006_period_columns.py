@@ -0,0 +1,104 @@
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import ExtractMonth, ExtractQuarter, ExtractWeekDay, ExtractYear
+
+
+def fill_period_columns(apps, schema_editor):
+    """Tính các cột thời gian cho dữ liệu đã có"""
+    apps.get_model('dashboard', 'Order').objects.update(
+        year=ExtractYear('order_date'),
+        month=ExtractMonth('order_date'),
+        quarter=ExtractQuarter('order_date'),
+        weekday=ExtractWeekDay('order_date'),
+    )
+    for model in ('SalesFact', 'SalesRollup', 'OrderRollup'):
+        apps.get_model('dashboard', model).objects.update(quarter=(F('month') + 2) / 3)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0005_salesfact'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='year',
+            field=models.SmallIntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='month',
+            field=models.SmallIntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='quarter',
+            field=models.SmallIntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='weekday',
+            field=models.SmallIntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='salesfact',
+            name='quarter',
+            field=models.SmallIntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='salesrollup',
+            name='quarter',
+            field=models.SmallIntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='orderrollup',
+            name='quarter',
+            field=models.SmallIntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_period_columns, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['year', 'month'], name='order_period_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['year', 'quarter'], name='order_quarter_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesfact',
+            index=models.Index(fields=['year', 'quarter', 'month'], name='salesfact_quarter_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesfact',
+            index=models.Index(fields=['month', 'year'], name='salesfact_month_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesrollup',
+            index=models.Index(fields=['year', 'quarter', 'month'], name='salesrollup_quarter_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesrollup',
+            index=models.Index(fields=['month', 'year'], name='salesrollup_month_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesrollup',
+            index=models.Index(fields=['market', 'product', 'sales', 'region', 'profit'], name='salesrollup_market_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesrollup',
+            index=models.Index(fields=['category', 'subcategory', 'product'], name='salesrollup_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderrollup',
+            index=models.Index(fields=['segment', 'customer', 'sales', 'profit', 'order_count'], name='orderrollup_segment_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0006_period_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerCohort',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_month', models.IntegerField(db_index=True)),
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='cohort', to='dashboard.customer')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CohortRetention',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cohort', models.IntegerField()),
+                ('period', models.SmallIntegerField()),
+                ('customers', models.IntegerField()),
+                ('orders', models.IntegerField()),
+                ('sales', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('segment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.customersegment')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['segment', 'cohort', 'period'], name='cohort_segment_idx'), models.Index(fields=['cohort', 'period'], name='cohort_period_idx')],
+            },
+        ),
+    ]
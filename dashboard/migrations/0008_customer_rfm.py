@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0007_cohorts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerRFM',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_order_date', models.DateField()),
+                ('recency_days', models.IntegerField()),
+                ('frequency', models.IntegerField()),
+                ('monetary', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('recency_score', models.SmallIntegerField()),
+                ('frequency_score', models.SmallIntegerField()),
+                ('monetary_score', models.SmallIntegerField()),
+                ('rfm_score', models.SmallIntegerField()),
+                ('rfm_segment', models.CharField(max_length=30)),
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='rfm', to='dashboard.customer')),
+                ('segment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.customersegment')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['monetary'], name='rfm_monetary_idx'), models.Index(fields=['segment', 'monetary'], name='rfm_segment_idx'), models.Index(fields=['rfm_segment', 'monetary'], name='rfm_group_idx'), models.Index(fields=['rfm_score'], name='rfm_score_idx'), models.Index(fields=['recency_score', 'frequency_score', 'monetary_score'], name='rfm_scores_idx')],
+            },
+        ),
+    ]
@@ -97,8 +97,34 @@ class Order(models.Model):
     """Mô hình cho đơn hàng (Order)"""
     order_id = models.CharField(max_length=100, unique=True)
     order_date = models.DateField()
+    # Các thành phần của order_date, lưu sẵn để lọc/nhóm theo chỉ mục thay vì ExtractYear/ExtractMonth
+    year = models.SmallIntegerField()
+    month = models.SmallIntegerField()
+    quarter = models.SmallIntegerField()
+    weekday = models.SmallIntegerField()  # 1 = Chủ nhật ... 7 = Thứ bảy (giống ExtractWeekDay)
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='orders')
     city = models.ForeignKey(City, on_delete=models.CASCADE)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['year', 'month'], name='order_period_idx'),
+            models.Index(fields=['year', 'quarter'], name='order_quarter_idx'),
+        ]
+
+    @staticmethod
+    def date_parts(order_date):
+        """Các cột year/month/quarter/weekday tương ứng với một ngày đặt hàng"""
+        return {
+            'year': order_date.year,
+            'month': order_date.month,
+            'quarter': (order_date.month - 1) // 3 + 1,
+            'weekday': order_date.isoweekday() % 7 + 1,
+        }
+
+    def save(self, *args, **kwargs):
+        for field, value in self.date_parts(self.order_date).items():
+            setattr(self, field, value)
+        super().save(*args, **kwargs)
     
     def __str__(self):
         return self.order_id
@@ -114,4 +140,198 @@ class OrderDetail(models.Model):
     profit = models.DecimalField(max_digits=15, decimal_places=2)
     
     def __str__(self):
-        return f"Row {self.row_id} - Order {self.order.order_id}"
\ No newline at end of file
+        return f"Row {self.row_id} - Order {self.order.order_id}"
+
+
+class ImportJob(models.Model):
+    """Mô hình cho tác vụ nhập dữ liệu chạy nền (Import Job)"""
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    MODE_CHOICES = [
+        ('append', 'Append'),
+        ('incremental', 'Incremental (skip existing Row IDs)'),
+        ('upsert', 'Upsert (update changed measures)'),
+    ]
+
+    file_path = models.CharField(max_length=500)  # Đường dẫn file đã lưu trên đĩa
+    file_name = models.CharField(max_length=255)  # Tên file gốc khi upload
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    mode = models.CharField(max_length=20, choices=MODE_CHOICES, default='append')  # Chế độ nhập
+    total_rows = models.IntegerField(null=True, blank=True)  # Ước lượng tổng số dòng
+    rows_processed = models.IntegerField(default=0)
+    message = models.TextField(blank=True)
+    report = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Import {self.id} - {self.file_name} ({self.status})"
+
+
+class SalesRollup(models.Model):
+    """
+    Bảng tổng hợp doanh số theo (năm, tháng, thứ, thị trường, vùng, phân khúc,
+    danh mục, danh mục con, sản phẩm, khách hàng), được cập nhật sau mỗi lần nhập dữ liệu.
+    """
+    year = models.SmallIntegerField()
+    month = models.SmallIntegerField()
+    quarter = models.SmallIntegerField()
+    weekday = models.SmallIntegerField()  # 1 = Chủ nhật ... 7 = Thứ bảy (giống ExtractWeekDay)
+    market = models.ForeignKey(Market, on_delete=models.CASCADE, related_name='+')
+    region = models.ForeignKey(Region, on_delete=models.CASCADE, related_name='+')
+    segment = models.ForeignKey(CustomerSegment, on_delete=models.CASCADE, related_name='+')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+')
+    subcategory = models.ForeignKey(Subcategory, on_delete=models.CASCADE, related_name='+')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='+')
+    sales = models.DecimalField(max_digits=18, decimal_places=2)
+    profit = models.DecimalField(max_digits=18, decimal_places=2)
+    quantity = models.IntegerField()
+    discount = models.DecimalField(max_digits=15, decimal_places=2)  # Tổng discount, chia line_count để lấy trung bình
+    line_count = models.IntegerField()  # Số dòng OrderDetail
+    order_count = models.IntegerField()  # Số đơn hàng khác nhau trong ô (không cộng dồn được qua sản phẩm)
+
+    class Meta:
+        # Chỉ mục ghép theo các bộ lọc của từng trang; các cột chỉ số đi kèm để
+        # truy vấn tổng hợp đọc thẳng từ chỉ mục (covering index) mà không cần đọc bảng
+        indexes = [
+            models.Index(fields=['year', 'month'], name='salesrollup_period_idx'),
+            models.Index(fields=['year', 'quarter', 'month'], name='salesrollup_quarter_idx'),
+            models.Index(fields=['month', 'year'], name='salesrollup_month_idx'),
+            models.Index(fields=['market', 'product', 'sales', 'region', 'profit'], name='salesrollup_market_idx'),
+            models.Index(fields=['category', 'subcategory', 'product'], name='salesrollup_category_idx'),
+        ]
+
+
+class OrderRollup(models.Model):
+    """
+    Bảng tổng hợp theo đơn hàng tại grain (năm, tháng, thứ, thị trường, vùng, phân khúc, khách hàng).
+    Mọi chiều đều ở cấp đơn hàng nên order_count cộng dồn được (dùng cho AOV, tần suất mua hàng).
+    """
+    year = models.SmallIntegerField()
+    month = models.SmallIntegerField()
+    quarter = models.SmallIntegerField()
+    weekday = models.SmallIntegerField()
+    market = models.ForeignKey(Market, on_delete=models.CASCADE, related_name='+')
+    region = models.ForeignKey(Region, on_delete=models.CASCADE, related_name='+')
+    segment = models.ForeignKey(CustomerSegment, on_delete=models.CASCADE, related_name='+')
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='+')
+    sales = models.DecimalField(max_digits=18, decimal_places=2)
+    profit = models.DecimalField(max_digits=18, decimal_places=2)
+    quantity = models.IntegerField()
+    line_count = models.IntegerField()
+    order_count = models.IntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['year', 'month'], name='orderrollup_period_idx'),
+            models.Index(fields=['segment', 'customer', 'sales', 'profit', 'order_count'],
+                         name='orderrollup_segment_idx'),
+        ]
+
+
+class SalesFact(models.Model):
+    """
+    Bảng fact phi chuẩn hoá: mỗi dòng OrderDetail kèm khoá của mọi dimension và các cột thời gian,
+    để các truy vấn phân tích không cần join qua Order -> City -> State -> Country -> Market -> Region.
+    """
+    row_id = models.IntegerField(unique=True)  # Row ID của OrderDetail tương ứng
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='+', db_index=False)
+    order_date = models.DateField()
+    year = models.SmallIntegerField()
+    month = models.SmallIntegerField()
+    quarter = models.SmallIntegerField()
+    weekday = models.SmallIntegerField()  # 1 = Chủ nhật ... 7 = Thứ bảy (giống ExtractWeekDay)
+    market = models.ForeignKey(Market, on_delete=models.CASCADE, related_name='+', db_index=False)
+    region = models.ForeignKey(Region, on_delete=models.CASCADE, related_name='+', db_index=False)
+    country = models.ForeignKey(Country, on_delete=models.CASCADE, related_name='+', db_index=False)
+    segment = models.ForeignKey(CustomerSegment, on_delete=models.CASCADE, related_name='+', db_index=False)
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='+', db_index=False)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+', db_index=False)
+    subcategory = models.ForeignKey(Subcategory, on_delete=models.CASCADE, related_name='+', db_index=False)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+', db_index=False)
+    quantity = models.IntegerField()
+    sales = models.DecimalField(max_digits=15, decimal_places=2)
+    discount = models.DecimalField(max_digits=5, decimal_places=2)
+    profit = models.DecimalField(max_digits=15, decimal_places=2)
+
+    class Meta:
+        # Chỉ mục ghép cho các cột lọc thường dùng (thay cho chỉ mục đơn trên từng khoá ngoại)
+        indexes = [
+            models.Index(fields=['year', 'month'], name='salesfact_period_idx'),
+            models.Index(fields=['year', 'quarter', 'month'], name='salesfact_quarter_idx'),
+            models.Index(fields=['month', 'year'], name='salesfact_month_idx'),
+            models.Index(fields=['order_date'], name='salesfact_date_idx'),
+            models.Index(fields=['market', 'year', 'month'], name='salesfact_market_idx'),
+            models.Index(fields=['segment', 'year', 'month'], name='salesfact_segment_idx'),
+            models.Index(fields=['category', 'subcategory', 'product'], name='salesfact_category_idx'),
+            models.Index(fields=['product', 'year'], name='salesfact_product_idx'),
+            models.Index(fields=['customer', 'order_date'], name='salesfact_customer_idx'),
+            models.Index(fields=['order'], name='salesfact_order_idx'),
+        ]
+
+
+class CustomerCohort(models.Model):
+    """
+    Cohort của từng khách hàng: tháng mua hàng đầu tiên, lưu dạng chỉ số tháng (năm * 12 + tháng - 1)
+    để biết cohort cũ của khách khi một lần nhập làm thay đổi tháng đầu tiên.
+    """
+    customer = models.OneToOneField(Customer, on_delete=models.CASCADE, related_name='cohort')
+    first_month = models.IntegerField(db_index=True)
+
+
+class CohortRetention(models.Model):
+    """
+    Ma trận retention tính sẵn tại grain (phân khúc, cohort, số tháng kể từ tháng đầu tiên):
+    số khách của cohort còn mua hàng trong tháng đó, số đơn và doanh số.
+    Mỗi khách chỉ thuộc một phân khúc nên customers cộng dồn được giữa các phân khúc.
+    """
+    segment = models.ForeignKey(CustomerSegment, on_delete=models.CASCADE, related_name='+')
+    cohort = models.IntegerField()  # Chỉ số tháng của tháng mua đầu tiên (năm * 12 + tháng - 1)
+    period = models.SmallIntegerField()  # 0 = tháng mua đầu tiên
+    customers = models.IntegerField()
+    orders = models.IntegerField()
+    sales = models.DecimalField(max_digits=18, decimal_places=2)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['segment', 'cohort', 'period'], name='cohort_segment_idx'),
+            models.Index(fields=['cohort', 'period'], name='cohort_period_idx'),
+        ]
+
+
+class CustomerRFM(models.Model):
+    """
+    Điểm RFM của từng khách hàng, tính lại sau mỗi lần nhập: recency (số ngày từ đơn cuối tới ngày
+    cuối cùng có dữ liệu), frequency (số đơn), monetary (tổng doanh số), điểm 1-5 theo ngũ phân vị
+    và nhóm RFM suy ra từ điểm R và F.
+    """
+    customer = models.OneToOneField(Customer, on_delete=models.CASCADE, related_name='rfm')
+    segment = models.ForeignKey(CustomerSegment, on_delete=models.CASCADE, related_name='+')
+    last_order_date = models.DateField()
+    recency_days = models.IntegerField()
+    frequency = models.IntegerField()
+    monetary = models.DecimalField(max_digits=18, decimal_places=2)
+    recency_score = models.SmallIntegerField()
+    frequency_score = models.SmallIntegerField()
+    monetary_score = models.SmallIntegerField()
+    rfm_score = models.SmallIntegerField()  # R * 100 + F * 10 + M, vd. 545
+    rfm_segment = models.CharField(max_length=30)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['monetary'], name='rfm_monetary_idx'),
+            models.Index(fields=['segment', 'monetary'], name='rfm_segment_idx'),
+            models.Index(fields=['rfm_segment', 'monetary'], name='rfm_group_idx'),
+            models.Index(fields=['rfm_score'], name='rfm_score_idx'),
+            models.Index(fields=['recency_score', 'frequency_score', 'monetary_score'], name='rfm_scores_idx'),
+        ]
@@ -0,0 +1,118 @@
+# dashboard/perf.py
+
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+# Độ dài tối đa của câu SQL chậm nhất được lưu lại
+MAX_SQL_LENGTH = 500
+
+# Các mẫu gần nhất theo view (trong bộ nhớ của tiến trình hiện tại)
+_samples = {}
+_slowest = {}
+_lock = threading.Lock()
+
+
+class QueryTimer:
+    """
+    execute_wrapper đo số truy vấn, tổng thời gian DB và truy vấn chậm nhất của một request
+    (có thể được gọi đồng thời từ các luồng tính widget song song)
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_sql = None
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.count += 1
+                self.seconds += elapsed
+                if elapsed > self.slowest_seconds:
+                    self.slowest_seconds = elapsed
+                    self.slowest_sql = sql
+
+
+def _window():
+    """Số mẫu gần nhất được giữ cho mỗi view"""
+    return getattr(settings, 'DASHBOARD_PERF_WINDOW', 1000)
+
+
+def record(view, total_seconds, timer, response_bytes, cache_hit=False):
+    """Lưu một mẫu đo của view"""
+    sample = (
+        total_seconds * 1000,
+        timer.seconds * 1000,
+        # Các truy vấn chạy song song có thể có tổng thời gian DB lớn hơn thời gian thực
+        max(total_seconds - timer.seconds, 0) * 1000,
+        timer.count,
+        response_bytes,
+        cache_hit,
+    )
+    with _lock:
+        samples = _samples.get(view)
+        if samples is None:
+            samples = _samples[view] = deque(maxlen=_window())
+        samples.append(sample)
+        slowest = _slowest.get(view)
+        if timer.slowest_sql and (slowest is None or timer.slowest_seconds * 1000 > slowest['ms']):
+            _slowest[view] = {
+                'ms': round(timer.slowest_seconds * 1000, 2),
+                'sql': timer.slowest_sql[:MAX_SQL_LENGTH],
+            }
+
+
+def percentile(values, percent):
+    """Phân vị nearest-rank (phần tử thứ ceil(percent% * n)) của danh sách đã sắp xếp"""
+    index = max(0, min(len(values) - 1, -(-percent * len(values) // 100) - 1))
+    return values[index]
+
+
+def _percentiles(values):
+    """p50/p95/p99 (nearest-rank) và giá trị lớn nhất"""
+    values = sorted(values)
+    result = {f'p{percent}': round(percentile(values, percent), 2) for percent in (50, 95, 99)}
+    result['max'] = round(values[-1], 2)
+    return result
+
+
+def perf_summary(view=None):
+    """Tổng hợp các mẫu theo view: phân vị thời gian tổng/DB/Python, số truy vấn và kích thước response"""
+    with _lock:
+        snapshot = {name: list(samples) for name, samples in _samples.items() if view in (None, name)}
+        slowest = {name: dict(query) for name, query in _slowest.items()}
+
+    views = {}
+    for name, samples in sorted(snapshot.items()):
+        total, db, python, queries, sizes, hits = zip(*samples)
+        views[name] = {
+            'samples': len(samples),
+            'total_ms': _percentiles(total),
+            'db_ms': _percentiles(db),
+            'python_ms': _percentiles(python),
+            'queries': _percentiles(queries),
+            'avg_bytes': round(sum(sizes) / len(sizes)),
+            'cache_hits': sum(hits),
+            'slowest_query': slowest.get(name),
+        }
+    return {
+        'sample_rate': getattr(settings, 'DASHBOARD_PERF_SAMPLE_RATE', 1.0),
+        'window': _window(),
+        'views': views,
+    }
+
+
+def reset_perf():
+    """Xoá toàn bộ mẫu đã lưu"""
+    with _lock:
+        _samples.clear()
+        _slowest.clear()
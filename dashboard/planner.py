@@ -0,0 +1,46 @@
+# dashboard/planner.py
+
+from django.db.models import Sum
+
+
+def _sort_rows(rows, order):
+    """Sắp xếp danh sách dict theo một khoá, tiền tố '-' nghĩa là giảm dần"""
+    reverse = order.startswith('-')
+    key = order.lstrip('-')
+    return sorted(rows, key=lambda row: row[key], reverse=reverse)
+
+
+def aggregate_breakdowns(queryset, breakdowns, totals=()):
+    """
+    Tính nhiều biểu đồ nhóm (breakdown) và các KPI tổng trong một lần quét duy nhất:
+    truy vấn nhóm theo hợp của mọi chiều cần dùng (grain mịn nhất), sau đó cộng dồn
+    lên từng breakdown trong Python (mô phỏng GROUPING SETS).
+
+    breakdowns: {tên: {'group': {khoá JSON: field}, 'measure': field, 'alias': khoá JSON, 'order': khoá sắp xếp}}
+    totals: các field cần tính tổng toàn bộ (KPI).
+    Trả về (dict {tên: danh sách dict}, dict {field: tổng}).
+    """
+    fields = sorted({field for spec in breakdowns.values() for field in spec['group'].values()})
+    measures = sorted({spec['measure'] for spec in breakdowns.values()} | set(totals))
+    rows = queryset.values(*fields) \
+        .annotate(**{f'sum_{measure}': Sum(measure) for measure in measures}) \
+        .order_by()
+
+    kpi = {measure: 0 for measure in totals}
+    groups = {name: {} for name in breakdowns}
+    for row in rows:
+        for measure in totals:
+            kpi[measure] += row[f'sum_{measure}'] or 0
+        for name, spec in breakdowns.items():
+            key = tuple(row[field] for field in spec['group'].values())
+            value = row[f"sum_{spec['measure']}"] or 0
+            groups[name][key] = groups[name].get(key, 0) + value
+
+    results = {}
+    for name, spec in breakdowns.items():
+        keys = list(spec['group'])
+        results[name] = _sort_rows([
+            {**dict(zip(keys, key)), spec['alias']: value}
+            for key, value in groups[name].items()
+        ], spec['order'])
+    return results, kpi
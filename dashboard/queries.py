@@ -0,0 +1,312 @@
+# dashboard/queries.py
+
+import base64
+import json
+from decimal import Decimal
+
+import numpy as np
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import F, Q, Sum, Window
+from django.db.models.functions import RowNumber
+
+# Các chiều có thể dùng để nhóm trên bảng tổng hợp / bảng fact: tên -> field hiển thị
+DIMENSIONS = {
+    'market': 'market__name',
+    'region': 'region__name',
+    'segment': 'segment__name',
+    'category': 'category__name',
+    'subcategory': 'subcategory__name',
+    'product': 'product__name',
+    'customer': 'customer__customer_id',
+}
+
+# Tên khoá trong JSON giữ nguyên như khi truy vấn trực tiếp OrderDetail (JS đang sử dụng)
+MARKET_KEY = 'order__city__state__country__market__name'
+REGION_KEY = 'order__city__state__country__market__region__name'
+SEGMENT_KEY = 'order__customer__segment__name'
+CUSTOMER_KEY = 'order__customer__customer_id'
+CATEGORY_KEY = 'product__subcategory__category__name'
+SUBCATEGORY_KEY = 'product__subcategory__name'
+PRODUCT_KEY = 'product__name'
+
+# Số phần tử mặc định và tối đa trong các bảng top N
+DEFAULT_TOP_N = 5
+MAX_TOP_N = 50
+
+# Số sản phẩm mặc định và tối đa trong một trang chỉ số sản phẩm
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 200
+
+# Các trường của một dòng chỉ số sản phẩm: tên trong tham số fields= -> khoá trong JSON
+PRODUCT_METRIC_FIELDS = {
+    'category': CATEGORY_KEY,
+    'subcategory': SUBCATEGORY_KEY,
+    'product': PRODUCT_KEY,
+    'sales': 'total_sales',
+    'profit': 'total_profit',
+    'margin': 'profit_margin',
+}
+
+# Các chỉ số có thể dùng để sắp xếp danh sách sản phẩm (tham số sort=)
+PRODUCT_SORTS = ['sales', 'profit', 'margin']
+
+# Giá trị lớn nhất của các tham số chia bin histogram
+MAX_BIN_VALUE = 1 << 30
+
+# Các chỉ số có thể dùng để xếp hạng
+METRICS = ['sales', 'profit', 'quantity']
+
+# Tham số lọc -> field của bảng tổng hợp / bảng fact
+FILTER_FIELDS = {
+    'year': 'year',
+    'quarter': 'quarter',
+    'month': 'month',
+    'market_id': 'market_id',
+    'segment_id': 'segment_id',
+    'category_id': 'category_id',
+    'subcategory_id': 'subcategory_id',
+    'product_id': 'product_id',
+}
+
+
+def parse_int(value):
+    """
+    Số nguyên từ tham số truy vấn, None nếu không hợp lệ. Chỉ nhận chữ số ASCII
+    (str.isdigit() chấp nhận cả '²', '٣'... mà int() không đọc được).
+    """
+    value = (value or '').strip()
+    digits = value[1:] if value.startswith('-') else value
+    if not digits.isascii() or not digits.isdigit():
+        return None
+    return int(value)
+
+
+def apply_filters(queryset, params, fields=FILTER_FIELDS):
+    """
+    Áp dụng các tham số lọc chung của dashboard (year, quarter, month, market_id, segment_id,
+    category_id, subcategory_id, product_id) lên queryset của SalesRollup hoặc SalesFact
+    (model khác truyền fields: tham số -> field tương ứng).
+    Mọi bộ lọc là phép so sánh bằng trên cột lưu sẵn nên dùng được các chỉ mục ghép.
+    Giá trị không phải số nguyên cho kết quả rỗng.
+    """
+    for param, field in fields.items():
+        value = (params.get(param) or '').strip()
+        if not value:
+            continue
+        number = parse_int(value)
+        if number is None:
+            return queryset.none()
+        queryset = queryset.filter(**{field: number})
+    return queryset
+
+
+def top_n_per_group(queryset, group_field, item_field, n, metric='sales',
+                    item_key=None, value_key=None):
+    """
+    Top n phần tử theo metric trong mỗi nhóm, tính bằng một truy vấn duy nhất với
+    ROW_NUMBER() OVER (PARTITION BY nhóm ORDER BY metric DESC).
+    Trả về dict {giá trị nhóm: [{item_key: ..., value_key: ...}, ...]} theo thứ tự xếp hạng.
+    """
+    item_key = item_key or item_field
+    value_key = value_key or f'total_{metric}'
+    # Alias nội bộ để không trùng với tên field của model; đổi tên khi trả về
+    ranked = (queryset.values(rank_group=F(group_field), rank_item=F(item_field))
+              .annotate(rank_value=Sum(metric))
+              .annotate(rank=Window(
+                  RowNumber(),
+                  partition_by=F(group_field),
+                  order_by=[F('rank_value').desc(), F(item_field).asc()]
+              ))
+              .filter(rank__lte=n)
+              .order_by('rank_group', 'rank'))
+
+    result = {}
+    for row in ranked:
+        result.setdefault(row['rank_group'], []).append({item_key: row['rank_item'], value_key: row['rank_value']})
+    return result
+
+
+def parse_bins(params):
+    """
+    Tham số chia bin của histogram: bin_width (độ rộng, mặc định 1), max_bin (mọi giá trị
+    >= max_bin gộp vào một bin cuối) và log_bins (bin theo luỹ thừa 2: 1, 2-3, 4-7, ...).
+    """
+    return {
+        'width': parse_limit(params.get('bin_width'), 1, MAX_BIN_VALUE),
+        'max': parse_limit(params.get('max_bin'), None, MAX_BIN_VALUE),
+        'log': params.get('log_bins', '').lower() in ('1', 'true', 'yes'),
+    }
+
+
+def _log_edges(bins):
+    """Các đầu bin khi chia theo luỹ thừa 2 (0 là bin của các giá trị nhỏ hơn 1)"""
+    edges = [0, 1]
+    while edges[-1] * 2 <= MAX_BIN_VALUE and (bins['max'] is None or edges[-1] * 2 < bins['max']):
+        edges.append(edges[-1] * 2)
+    return edges
+
+
+def bin_sql(column, bins):
+    """Biểu thức SQL tính đầu bin của cột (chỉ chứa số nguyên đã kiểm tra)"""
+    if bins['log']:
+        cases = ' '.join(f'WHEN {column} >= {edge} THEN {edge}' for edge in reversed(_log_edges(bins)[1:]))
+        expression = f'CASE {cases} ELSE 0 END'
+    elif bins['width'] > 1:
+        expression = f"(({column} / {bins['width']}) * {bins['width']})"
+    else:
+        expression = column
+    if bins['max'] is not None:
+        expression = f"CASE WHEN {column} >= {bins['max']} THEN {bins['max']} ELSE {expression} END"
+    return expression
+
+
+def bin_starts(values, bins):
+    """Đầu bin của từng giá trị trong mảng NumPy (cùng quy tắc với bin_sql)"""
+    if bins['log']:
+        edges = np.array(_log_edges(bins))
+        starts = edges[np.maximum(np.searchsorted(edges, values, side='right') - 1, 0)]
+    else:
+        starts = values // bins['width'] * bins['width']
+    if bins['max'] is not None:
+        starts = np.where(values >= bins['max'], bins['max'], starts)
+    return starts
+
+
+def _bin_end(start, bins):
+    """Giá trị lớn nhất của bin bắt đầu tại start (None với bin cuối không giới hạn)"""
+    if bins['max'] is not None and start >= bins['max']:
+        return None
+    if bins['log']:
+        edges = _log_edges(bins)
+        index = edges.index(start)
+        if index + 1 == len(edges):
+            return None if bins['max'] is None else bins['max'] - 1
+        end = edges[index + 1] - 1
+    else:
+        end = start + bins['width'] - 1
+    return min(end, bins['max'] - 1) if bins['max'] is not None else end
+
+
+def histogram(queryset, field, bins):
+    """
+    Đếm số dòng của queryset theo bin của cột field, tính hoàn toàn trong DB bằng truy vấn lồng
+    SELECT bin, COUNT(*) FROM (queryset) GROUP BY bin. queryset có thể đã được nhóm
+    (vd. số đơn hàng mỗi khách hàng). Trả về danh sách (đầu bin, số dòng) tăng dần.
+    """
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return []
+    connection = connections[queryset.db]
+    expression = bin_sql(connection.ops.quote_name(field), bins)
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT {expression}, COUNT(*) FROM ({sql}) source GROUP BY 1 ORDER BY 1", params)
+        return cursor.fetchall()
+
+
+def histogram_rows(counts, bins, value_key, count_key):
+    """
+    [(đầu bin, số lượng)] -> danh sách dict của API. Khi có chia bin, mỗi dict có thêm
+    khoá '<value_key>_to' là giá trị lớn nhất của bin (None với bin cuối không giới hạn).
+    """
+    bucketed = bins['width'] > 1 or bins['max'] is not None or bins['log']
+    rows = []
+    for start, count in counts:
+        row = {value_key: int(start), count_key: int(count)}
+        if bucketed:
+            row[f'{value_key}_to'] = _bin_end(int(start), bins)
+        rows.append(row)
+    return rows
+
+
+def encode_cursor(values):
+    """Con trỏ trang (chuỗi base64 an toàn cho URL) từ khoá sắp xếp của dòng cuối trang"""
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """[giá trị sắp xếp, danh mục, danh mục con, sản phẩm] từ con trỏ trang; ValueError nếu không hợp lệ"""
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except ValueError:
+        values = None
+    if not isinstance(values, list) or len(values) != 4 \
+            or isinstance(values[0], bool) or not isinstance(values[0], (int, float)) \
+            or not all(isinstance(name, str) for name in values[1:]):
+        raise ValueError(f"cursor không hợp lệ: {cursor}")
+    return values
+
+
+def parse_product_page(params):
+    """
+    Tham số của một trang chỉ số sản phẩm: sort (sales/profit/margin), order (desc/asc),
+    limit, cursor, q (tìm theo tên sản phẩm) và fields (danh sách trường cách nhau bởi dấu phẩy).
+    ValueError nếu tham số không hợp lệ.
+    """
+    sort = params.get('sort') or 'sales'
+    if sort not in PRODUCT_SORTS:
+        raise ValueError(f"sort không hợp lệ: {sort} (chọn một trong {', '.join(PRODUCT_SORTS)})")
+    order = params.get('order') or 'desc'
+    if order not in ('desc', 'asc'):
+        raise ValueError(f"order không hợp lệ: {order} (desc hoặc asc)")
+    fields = [field.strip() for field in (params.get('fields') or '').split(',') if field.strip()]
+    unknown = [field for field in fields if field not in PRODUCT_METRIC_FIELDS]
+    if unknown:
+        raise ValueError(f"fields không hợp lệ: {', '.join(unknown)} (chọn trong {', '.join(PRODUCT_METRIC_FIELDS)})")
+    return {
+        'sort': sort,
+        'order': order,
+        'limit': parse_limit(params.get('limit'), DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE),
+        'cursor': decode_cursor(params.get('cursor')),
+        'search': (params.get('q') or '').strip(),
+        'fields': [PRODUCT_METRIC_FIELDS[field] for field in fields or PRODUCT_METRIC_FIELDS],
+    }
+
+
+def keyset_filter(cursor, fields, descending):
+    """
+    Điều kiện "đứng sau con trỏ" cho thứ tự fields[0] (giảm hoặc tăng dần) rồi các trường
+    còn lại tăng dần; phân trang theo khoá thay vì OFFSET nên mọi trang có cùng chi phí.
+    """
+    value, *names = cursor
+    condition = Q(**{f"{fields[0]}__{'lt' if descending else 'gt'}": value})
+    equal = {fields[0]: value}
+    for field, name in zip(fields[1:], names):
+        condition |= Q(**equal, **{f'{field}__gt': name})
+        equal[field] = name
+    return condition
+
+
+def product_page(rows, page):
+    """
+    Kết quả một trang từ các dòng đã sắp xếp (lấy dư một dòng để biết còn trang sau):
+    chỉ giữ các trường được chọn, con trỏ trang sau lấy từ khoá sắp xếp của dòng cuối.
+    """
+    next_cursor = None
+    if len(rows) > page['limit']:
+        rows = rows[:page['limit']]
+        last = rows[-1]
+        next_cursor = encode_cursor([last['sort_value'], last[CATEGORY_KEY], last[SUBCATEGORY_KEY], last[PRODUCT_KEY]])
+    return {
+        'sort': page['sort'],
+        'order': page['order'],
+        'limit': page['limit'],
+        'results': [{field: row[field] for field in page['fields']} for row in rows],
+        'next_cursor': next_cursor,
+    }
+
+
+def to_cents(value):
+    """Làm tròn một tổng tiền về 2 chữ số thập phân (bỏ sai số cộng dồn dấu phẩy động)"""
+    return Decimal(repr(value) if isinstance(value, float) else value or 0).quantize(Decimal('0.01'))
+
+
+def parse_limit(value, default, maximum):
+    """Đọc tham số số lượng (n, limit...) từ query string, giới hạn trong [1, maximum]"""
+    try:
+        return max(1, min(int(value), maximum))
+    except (TypeError, ValueError):
+        return default
@@ -0,0 +1,172 @@
+# dashboard/rfm.py
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.db.models import Avg, Count, Sum
+
+from .models import CustomerRFM, Order
+from .queries import DEFAULT_TOP_N, MAX_TOP_N, apply_filters, parse_limit, to_cents
+
+# Số mức điểm của mỗi chỉ số (ngũ phân vị: 1 thấp nhất, 5 tốt nhất)
+RFM_BINS = 5
+
+# Nhóm RFM theo điểm recency và frequency, xét theo thứ tự (nhóm đầu tiên khớp được chọn):
+# (tên, khoảng điểm R, khoảng điểm F); các khoảng phủ mọi cặp điểm R, F
+RFM_SEGMENTS = [
+    ('champions', (4, 5), (4, 5)),
+    ('loyal', (3, 5), (3, 5)),
+    ('potential_loyalist', (4, 5), (1, 2)),
+    ('needs_attention', (3, 3), (1, 2)),
+    ('at_risk', (1, 2), (3, 5)),
+    ('hibernating', (1, 2), (1, 2)),
+]
+
+# Tham số lọc (số nguyên) của các API RFM -> field của CustomerRFM; nhóm RFM lọc bằng ?rfm_segment=
+RFM_FILTER_FIELDS = {
+    'segment_id': 'segment_id',
+}
+
+RFM_SCORES = {
+    'recency': 'recency_score',
+    'frequency': 'frequency_score',
+    'monetary': 'monetary_score',
+}
+
+RFM_BATCH_SIZE = 2000
+
+
+def _scores(values, ascending=True):
+    """Điểm 1..RFM_BINS theo thứ hạng phần trăm (giá trị bằng nhau cùng điểm); ascending=False đảo chiều"""
+    ranks = values.rank(method='average', pct=True, ascending=ascending)
+    return np.ceil(ranks * RFM_BINS).clip(1, RFM_BINS).astype(int)
+
+
+def compute_rfm():
+    """
+    DataFrame chỉ số RFM của mọi khách hàng có đơn: một truy vấn lấy doanh số từng đơn
+    (Order join OrderDetail), sau đó gom theo khách hàng và chấm điểm bằng pandas/NumPy.
+    Recency tính theo ngày đặt hàng cuối cùng có trong dữ liệu để kết quả không đổi theo ngày chạy.
+    """
+    rows = Order.objects.values_list('id', 'customer_id', 'customer__segment_id', 'order_date').annotate(
+        sales=Sum('details__sales')).order_by()
+    orders = pd.DataFrame.from_records(
+        list(rows), columns=['order_id', 'customer_id', 'segment_id', 'order_date', 'sales']
+    )
+    if orders.empty:
+        return orders
+    orders['order_date'] = pd.to_datetime(orders['order_date'])
+    orders['sales'] = orders['sales'].astype(float).fillna(0)
+
+    rfm = orders.groupby('customer_id').agg(
+        segment_id=('segment_id', 'first'),
+        last_order_date=('order_date', 'max'),
+        frequency=('order_id', 'size'),
+        monetary=('sales', 'sum'),
+    )
+    rfm['recency_days'] = (orders['order_date'].max() - rfm['last_order_date']).dt.days
+    rfm['recency_score'] = _scores(rfm['recency_days'], ascending=False)
+    rfm['frequency_score'] = _scores(rfm['frequency'])
+    rfm['monetary_score'] = _scores(rfm['monetary'])
+    rfm['rfm_score'] = rfm['recency_score'] * 100 + rfm['frequency_score'] * 10 + rfm['monetary_score']
+
+    r, f = rfm['recency_score'], rfm['frequency_score']
+    rfm['rfm_segment'] = np.select(
+        [r.between(*recency) & f.between(*frequency) for _, recency, frequency in RFM_SEGMENTS],
+        [name for name, _, _ in RFM_SEGMENTS],
+        default=RFM_SEGMENTS[-1][0],
+    )
+    return rfm.reset_index()
+
+
+def refresh_rfm(periods=None):
+    """
+    Tính lại toàn bộ CustomerRFM sau một lần nhập. Điểm là phân vị trên toàn bộ khách hàng
+    nên mọi dòng đều có thể đổi; periods (các tháng bị ảnh hưởng) chỉ dùng để bỏ qua khi không có thay đổi.
+    """
+    if periods is not None and not periods:
+        return
+    with transaction.atomic():
+        rfm = compute_rfm()
+        CustomerRFM.objects.all().delete()
+        CustomerRFM.objects.bulk_create(
+            (
+                CustomerRFM(
+                    customer_id=row.customer_id,
+                    segment_id=row.segment_id,
+                    last_order_date=row.last_order_date.date(),
+                    recency_days=row.recency_days,
+                    frequency=row.frequency,
+                    monetary=to_cents(row.monetary),
+                    recency_score=row.recency_score,
+                    frequency_score=row.frequency_score,
+                    monetary_score=row.monetary_score,
+                    rfm_score=row.rfm_score,
+                    rfm_segment=row.rfm_segment,
+                )
+                for row in rfm.itertuples(index=False)
+            ),
+            batch_size=RFM_BATCH_SIZE
+        )
+
+
+def _customers(params):
+    """CustomerRFM theo bộ lọc segment_id và rfm_segment (ValueError nếu nhóm RFM không hợp lệ)"""
+    rows = apply_filters(CustomerRFM.objects.all(), params, RFM_FILTER_FIELDS)
+    rfm_segment = params.get('rfm_segment')
+    if rfm_segment:
+        names = [name for name, _, _ in RFM_SEGMENTS]
+        if rfm_segment not in names:
+            raise ValueError(f"rfm_segment không hợp lệ: {rfm_segment} (chọn một trong {', '.join(names)})")
+        rows = rows.filter(rfm_segment=rfm_segment)
+    return rows
+
+
+def rfm_top_customers(params):
+    """
+    Top N khách hàng theo tổng doanh số (hoặc theo điểm RFM với ?order=score),
+    lọc theo segment_id và rfm_segment; đọc thẳng từ CustomerRFM theo chỉ mục.
+    """
+    order = params.get('order') or 'monetary'
+    orderings = {'monetary': ['-monetary'], 'score': ['-rfm_score', '-monetary']}
+    if order not in orderings:
+        raise ValueError(f"order không hợp lệ: {order} (chọn một trong {', '.join(orderings)})")
+    n = parse_limit(params.get('n'), DEFAULT_TOP_N, MAX_TOP_N)
+
+    rows = _customers(params)
+    return {
+        'order': order,
+        'n': n,
+        'customers': list(rows.order_by(*orderings[order], 'customer_id').values(
+            'customer__customer_id', 'segment__name', 'rfm_segment', 'rfm_score', 'recency_score',
+            'frequency_score', 'monetary_score', 'last_order_date', 'recency_days', 'frequency', 'monetary',
+        )[:n]),
+    }
+
+
+def rfm_distribution(params):
+    """Số khách hàng ở mỗi mức điểm 1..RFM_BINS của từng chỉ số R, F, M (mức không có khách là 0)"""
+    rows = _customers(params)
+    distribution = {}
+    for name, field in RFM_SCORES.items():
+        counts = dict(rows.values_list(field).annotate(customers=Count('id')).order_by())
+        distribution[name] = [counts.get(score, 0) for score in range(1, RFM_BINS + 1)]
+    return {
+        'scores': list(range(1, RFM_BINS + 1)),
+        'customers': rows.count(),
+        **distribution,
+    }
+
+
+def rfm_breakdown(params):
+    """Phân khúc khách hàng x nhóm RFM: số khách, tổng doanh số, số đơn và recency trung bình"""
+    rows = _customers(params)
+    return {
+        'rfm_segments': [name for name, _, _ in RFM_SEGMENTS],
+        'results': list(rows.values('segment__name', 'rfm_segment').annotate(
+            customers=Count('id'),
+            total_sales=Sum('monetary'),
+            total_orders=Sum('frequency'),
+            avg_recency_days=Avg('recency_days'),
+        ).order_by('segment__name', 'rfm_segment')),
+    }
@@ -0,0 +1,67 @@
+# dashboard/rollups.py
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from .facts import insert_from_select, period_filter
+from .models import OrderRollup, SalesFact, SalesRollup
+
+# Nếu số tháng cần tính lại vượt quá ngưỡng này thì tính lại toàn bộ
+MAX_INCREMENTAL_PERIODS = 120
+
+# Các chiều cấp đơn hàng: tên field trong bảng tổng hợp -> cột của SalesFact
+ORDER_DIMENSIONS = {
+    'year': F('year'),
+    'month': F('month'),
+    'quarter': F('quarter'),
+    'weekday': F('weekday'),
+    'market': F('market_id'),
+    'region': F('region_id'),
+    'segment': F('segment_id'),
+    'customer': F('customer_id'),
+}
+
+# Các chiều sản phẩm, chỉ có trong SalesRollup
+PRODUCT_DIMENSIONS = {
+    'category': F('category_id'),
+    'subcategory': F('subcategory_id'),
+    'product': F('product_id'),
+}
+
+# Các chỉ số: tên field trong bảng tổng hợp -> aggregate trên SalesFact
+MEASURES = {
+    'sales': Sum('sales'),
+    'profit': Sum('profit'),
+    'quantity': Sum('quantity'),
+    'line_count': Count('id'),
+    'order_count': Count('order', distinct=True),
+}
+
+
+def refresh_rollups(periods=None):
+    """
+    Tính lại SalesRollup và OrderRollup từ SalesFact (không cần join).
+    periods là tập (năm, tháng) bị ảnh hưởng bởi lần nhập; None nghĩa là tính lại toàn bộ.
+    """
+    if periods is not None and not periods:
+        return
+    if periods is not None and len(periods) > MAX_INCREMENTAL_PERIODS:
+        periods = None
+
+    source = SalesFact.objects.all()
+    sales_rollups = SalesRollup.objects.all()
+    order_rollups = OrderRollup.objects.all()
+    if periods is not None:
+        source = source.filter(period_filter(periods))
+        sales_rollups = sales_rollups.filter(period_filter(periods))
+        order_rollups = order_rollups.filter(period_filter(periods))
+
+    with transaction.atomic():
+        sales_rollups.delete()
+        order_rollups.delete()
+        insert_from_select(
+            SalesRollup, source,
+            {**ORDER_DIMENSIONS, **PRODUCT_DIMENSIONS},
+            {**MEASURES, 'discount': Sum('discount')}
+        )
+        insert_from_select(OrderRollup, source, ORDER_DIMENSIONS, MEASURES)
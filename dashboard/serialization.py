@@ -0,0 +1,140 @@
+# dashboard/serialization.py
+
+import datetime
+import gzip
+import json
+from decimal import Decimal
+
+from django.http import HttpResponse, JsonResponse
+
+from .queries import (
+    CATEGORY_KEY, CUSTOMER_KEY, DIMENSIONS, MARKET_KEY, PRODUCT_KEY, REGION_KEY, SEGMENT_KEY,
+    SUBCATEGORY_KEY,
+)
+
+try:
+    import orjson
+except ImportError:  # orjson là tuỳ chọn, dùng json của thư viện chuẩn
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # brotli là tuỳ chọn, chỉ nén gzip
+    brotli = None
+
+# Các định dạng response của API dữ liệu (tham số format=), 'json' là mặc định
+FORMATS = ['json', 'compact']
+
+# Tên ngắn của các khoá trong định dạng compact
+FIELD_ALIASES = {
+    MARKET_KEY: 'market',
+    REGION_KEY: 'region',
+    SEGMENT_KEY: 'segment',
+    CUSTOMER_KEY: 'customer',
+    CATEGORY_KEY: 'category',
+    SUBCATEGORY_KEY: 'subcategory',
+    PRODUCT_KEY: 'product',
+    **{field: name for name, field in DIMENSIONS.items()},
+    'total_sales': 'sales',
+    'total_profit': 'profit',
+    'total_quantity': 'quantity',
+    'profit_margin': 'margin',
+}
+
+# Mức nén: ưu tiên tốc độ vì response được nén lại ở mỗi request
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 5
+
+
+def _alias_keys(row):
+    """Đổi các khoá sang tên ngắn (giữ nguyên khoá nếu tên ngắn đã có trong cùng dict)"""
+    return {
+        (FIELD_ALIASES[key] if key in FIELD_ALIASES and FIELD_ALIASES[key] not in row else key): value
+        for key, value in row.items()
+    }
+
+
+def compact(value):
+    """
+    Chuyển dữ liệu JSON sang định dạng compact:
+    - danh sách các dict cùng khoá -> dict theo cột {khoá: [giá trị, ...]} (khoá chỉ xuất hiện một lần)
+    - khoá lookup của ORM và tên chỉ số -> tên ngắn (FIELD_ALIASES)
+    - Decimal -> số thực thay vì chuỗi
+    """
+    if isinstance(value, dict):
+        return {key: compact(item) for key, item in _alias_keys(value).items()}
+    if isinstance(value, (list, tuple)):
+        if value and all(isinstance(row, dict) for row in value):
+            keys = list(value[0])
+            if all(list(row) == keys for row in value):
+                return {
+                    alias: [compact(row[key]) for row in value]
+                    for key, alias in zip(keys, _alias_keys(dict.fromkeys(keys)))
+                }
+        return [compact(item) for item in value]
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _default(value):
+    """Kiểu không có sẵn trong JSON"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f"Không chuyển được {type(value).__name__} sang JSON")
+
+
+def dumps(data):
+    """JSON gọn (không khoảng trắng) dạng bytes, bằng orjson nếu đã cài"""
+    if orjson is not None:
+        return orjson.dumps(data, default=_default)
+    return json.dumps(data, default=_default, separators=(',', ':'), ensure_ascii=False).encode()
+
+
+def format_error(request):
+    """Response 400 nếu tham số format= không hợp lệ, None nếu hợp lệ (kiểm tra trước khi tính dữ liệu)"""
+    response_format = request.GET.get('format') or 'json'
+    if response_format not in FORMATS:
+        return JsonResponse({'error': f"format không hợp lệ: {response_format}", 'formats': FORMATS}, status=400)
+    return None
+
+
+def api_response(request, data):
+    """
+    Response JSON của API dữ liệu theo tham số format=: 'json' (mặc định, giữ nguyên định dạng cũ)
+    hoặc 'compact' (compact() + dumps())
+    """
+    error = format_error(request)
+    if error is not None:
+        return error
+    if request.GET.get('format') == 'compact':
+        return HttpResponse(dumps(compact(data)), content_type='application/json')
+    return JsonResponse(data)
+
+
+def accepted_encoding(header):
+    """Cách nén tốt nhất client chấp nhận theo Accept-Encoding: 'br', 'gzip' hoặc None"""
+    accepted = set()
+    for item in header.split(','):
+        name, _, params = item.strip().partition(';')
+        quality = params.strip().removeprefix('q=')
+        try:
+            if params and float(quality) <= 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(name.strip().lower())
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress(content, encoding):
+    """Nén nội dung response bằng 'br' hoặc 'gzip'"""
+    if encoding == 'br':
+        return brotli.compress(content, quality=BROTLI_QUALITY)
+    return gzip.compress(content, compresslevel=GZIP_LEVEL, mtime=0)
@@ -1,3 +1,839 @@
-from django.test import TestCase
+# dashboard/tests.py
 
-# Create your tests here.
+import datetime
+import gzip
+import importlib.util
+import json
+import os
+import tempfile
+from collections import Counter
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock, skipIf, skipUnless
+from urllib.parse import urlencode
+
+import pandas as pd
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.http import QueryDict
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from .benchmark.generator import COLUMNS, generate_frame, parse_size
+from .benchmark.runner import compare_results, run_benchmark
+from .cache import bump_data_version, get_data_version
+from .cohorts import refresh_cohorts
+from .database import ReadWriteRouter
+from .engines import build_payload
+from .engines.widgets import PAGES
+from .facts import refresh_facts
+from .jobs import run_import_job
+from .middleware import CompressionMiddleware, PerformanceMiddleware
+from .models import (
+    Category, CohortRetention, CustomerCohort, CustomerRFM, CustomerSegment, ImportJob, Market, Order, OrderDetail,
+    OrderRollup, Product, SalesFact, SalesRollup,
+)
+from .perf import percentile, reset_perf
+from .queries import CATEGORY_KEY, MAX_TOP_N, PRODUCT_KEY, SUBCATEGORY_KEY
+from .rfm import refresh_rfm
+from .rollups import refresh_rollups
+from .timeseries import bucket_range, compute_buckets
+from .utils import import_data_streaming
+from .warmup import _warm_in_background, warm_cache
+
+# Đọc qua kết nối 'default' (kết nối chỉ đọc không thấy dữ liệu trong transaction của test),
+# cache trong bộ nhớ, không làm nóng cache trên luồng nền
+TEST_SETTINGS = {
+    'DASHBOARD_READ_DATABASE': None,
+    'DASHBOARD_CACHE_ALIAS': 'default',
+    'DASHBOARD_CACHE_ENABLED': True,
+    'DASHBOARD_WARM_ON_IMPORT': False,
+    'DASHBOARD_ENGINE': 'orm',
+}
+
+
+# Các bảng dẫn xuất được tính lại sau mỗi lần nhập
+DERIVED_MODELS = [SalesFact, SalesRollup, OrderRollup, CustomerCohort, CohortRetention, CustomerRFM]
+
+
+def snapshot(model):
+    """Mọi dòng của một bảng (bỏ id tự tăng), sắp xếp để so sánh không phụ thuộc thứ tự chèn"""
+    fields = [field.attname for field in model._meta.concrete_fields if not field.primary_key]
+    return sorted(model.objects.values_list(*fields), key=repr)
+
+
+@override_settings(**TEST_SETTINGS)
+class DashboardTestCase(TestCase):
+    """Dữ liệu sinh ngẫu nhiên (cố định theo seed) được nhập qua import_data_streaming như người dùng"""
+    ROWS = 400
+    CHUNK_SIZE = 150
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.frame = generate_frame(cls.ROWS, seed=7)
+        success, message, _ = cls.import_frame(cls.frame)
+        assert success, message
+
+    @classmethod
+    def import_frame(cls, frame, mode='append'):
+        """Ghi frame ra file CSV tạm rồi nhập theo từng phần; trả về (thành công, thông báo, báo cáo)"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'data.csv')
+            frame.to_csv(path, index=False)
+            return import_data_streaming(path, cls.CHUNK_SIZE, mode=mode)
+
+    def setUp(self):
+        # Mỗi test bắt đầu với cache rỗng và một phiên bản dữ liệu mới (bộ dữ liệu cột được nạp lại)
+        caches['default'].clear()
+
+    def new_rows(self, rows, seed):
+        """Các dòng mới: Row ID nối tiếp và mã đơn hàng riêng (không trùng đơn đã có)"""
+        frame = generate_frame(rows, seed=seed, start_row=self.ROWS + 1)
+        frame['Order ID'] = 'NEW-' + frame['Order ID']
+        return frame
+
+
+@override_settings(**TEST_SETTINGS)
+class CommittedDataTestCase(TransactionTestCase):
+    """
+    Cùng bộ dữ liệu với DashboardTestCase nhưng được commit thật (nhập lại cho từng test), cho các test
+    đọc dữ liệu từ luồng khác có kết nối DB riêng (pool widget của view async, pool làm nóng cache)
+    """
+
+    def setUp(self):
+        caches['default'].clear()
+        success, message, _ = DashboardTestCase.import_frame(generate_frame(DashboardTestCase.ROWS, seed=7))
+        self.assertTrue(success, message)
+
+
+class StreamingImportTests(DashboardTestCase):
+
+    def test_append_imports_every_row_in_chunks(self):
+        self.assertEqual(OrderDetail.objects.count(), self.ROWS)
+        self.assertEqual(Order.objects.count(), self.frame['Order ID'].nunique())
+        self.assertEqual(SalesFact.objects.count(), self.ROWS)
+        total = sum(SalesRollup.objects.values_list('sales', flat=True))
+        self.assertAlmostEqual(float(total), self.frame['Sales'].sum(), places=2)
+
+        success, _, report = self.import_frame(self.new_rows(310, seed=8))
+        self.assertTrue(success)
+        self.assertEqual((report['rows'], report['inserted'], report['chunks']), (310, 310, 3))
+
+    def test_failed_chunk_keeps_committed_chunks(self):
+        # Phần thứ hai trùng Row ID đã có nên lỗi; phần đầu đã được commit và đưa vào bảng dẫn xuất
+        frame = pd.concat([self.new_rows(self.CHUNK_SIZE, seed=8), self.frame[:self.CHUNK_SIZE]])
+        success, message, report = self.import_frame(frame)
+        self.assertFalse(success)
+        self.assertIn('phần 2', message)
+        self.assertEqual(report['inserted'], self.CHUNK_SIZE)
+        self.assertEqual(SalesFact.objects.count(), self.ROWS + self.CHUNK_SIZE)
+
+    def test_refresh_failure_after_failed_chunk_is_reported(self):
+        frame = pd.concat([self.new_rows(self.CHUNK_SIZE, seed=8), self.frame[:self.CHUNK_SIZE]])
+        with mock.patch('dashboard.utils.refresh_rollups', side_effect=RuntimeError('rollup lỗi')), \
+                self.assertLogs('dashboard.utils', 'ERROR'):
+            success, message, report = self.import_frame(frame)
+        self.assertFalse(success)
+        self.assertEqual(report['refresh_error'], 'rollup lỗi')
+        self.assertIn('rollup lỗi', message)
+
+
+class ImportModeTests(DashboardTestCase):
+
+    def test_incremental_skips_existing_rows(self):
+        frame = pd.concat([self.frame, self.new_rows(50, seed=8)])
+        success, _, report = self.import_frame(frame, mode='incremental')
+        self.assertTrue(success)
+        self.assertEqual((report['inserted'], report['updated'], report['skipped']), (50, 0, self.ROWS))
+        self.assertEqual(OrderDetail.objects.count(), self.ROWS + 50)
+
+    def test_noop_import_keeps_cache_version(self):
+        version = get_data_version()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            success, _, report = self.import_frame(self.frame, mode='incremental')
+        self.assertTrue(success)
+        self.assertEqual(report['skipped'], self.ROWS)
+        self.assertEqual(callbacks, [])
+        self.assertEqual(get_data_version(), version)
+
+    def test_upsert_updates_changed_measures(self):
+        frame = self.frame.copy()
+        frame.loc[:9, 'Sales'] += 10
+        frame.loc[10:14, 'Quantity'] += 1
+        version = get_data_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            success, _, report = self.import_frame(frame, mode='upsert')
+        self.assertTrue(success)
+        self.assertEqual((report['inserted'], report['updated'], report['skipped']), (0, 15, self.ROWS - 15))
+        detail = OrderDetail.objects.get(row_id=self.frame.loc[0, 'Row ID'])
+        self.assertEqual(detail.sales, Decimal(str(round(self.frame.loc[0, 'Sales'] + 10, 2))))
+        self.assertNotEqual(get_data_version(), version)
+
+    def test_invalid_mode_is_rejected(self):
+        success, message, _ = self.import_frame(self.frame, mode='bogus')
+        self.assertFalse(success)
+        self.assertIn('bogus', message)
+
+
+class DerivedTableTests(DashboardTestCase):
+
+    def rebuild(self):
+        """Tính lại toàn bộ các bảng dẫn xuất từ OrderDetail"""
+        refresh_facts()
+        refresh_rollups()
+        refresh_cohorts()
+        refresh_rfm()
+
+    def test_incremental_refresh_matches_full_rebuild(self):
+        changed = pd.concat([self.frame, self.new_rows(80, seed=9)], ignore_index=True)
+        changed.loc[:19, 'Profit'] -= 5
+        self.assertTrue(self.import_frame(changed, mode='upsert')[0])
+        incremental = {model.__name__: snapshot(model) for model in DERIVED_MODELS}
+
+        self.rebuild()
+        for model in DERIVED_MODELS:
+            with self.subTest(model=model.__name__):
+                self.assertEqual(incremental[model.__name__], snapshot(model))
+
+
+class CacheTests(DashboardTestCase):
+
+    def test_cached_api_miss_then_hit(self):
+        first = self.client.get('/api/market-data/')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/market-data/')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.content, second.content)
+
+        # Tham số khác (cùng nghĩa sau khi chuẩn hoá thì dùng chung khoá)
+        self.assertEqual(self.client.get('/api/market-data/?market_id=1')['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/api/market-data/?market_id=01')['X-Cache'], 'HIT')
+
+    def test_new_data_version_invalidates_cache(self):
+        self.client.get('/api/overview-data/')
+        bump_data_version()
+        self.assertEqual(self.client.get('/api/overview-data/')['X-Cache'], 'MISS')
+
+    def test_non_ascii_digits_are_empty_filters(self):
+        # '²'.isdigit() là True nhưng int('²') lỗi: phải cho kết quả rỗng, không phải lỗi 500
+        for engine in ('orm', 'columnar'):
+            for url in ('/api/overview-data/?year=%C2%B2', '/api/product-data/?category_id=%C2%B2',
+                        '/api/customer-data/?segment_id=%D9%A3', '/api/top-n/?market_id=--1'):
+                with self.subTest(engine=engine, url=url), override_settings(DASHBOARD_ENGINE=engine):
+                    self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class ConditionalRequestTests(DashboardTestCase):
+
+    def test_conditional_api_returns_304(self):
+        response = self.client.get('/api/customer-data/')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+        with self.assertNumQueries(0):
+            not_modified = self.client.get('/api/customer-data/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+
+        bump_data_version()
+        response = self.client.get('/api/customer-data/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_depends_on_params(self):
+        etag = self.client.get('/api/market-data/')['ETag']
+        self.assertNotEqual(self.client.get('/api/market-data/?market_id=1')['ETag'], etag)
+        self.assertEqual(self.client.get('/api/market-data/?market_id=1', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ResponseFormatTests(DashboardTestCase):
+
+    def test_invalid_format_rejected_before_queries(self):
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/overview-data/?format=xml')
+        self.assertEqual(response.status_code, 400)
+
+    def test_compact_format_is_cached_separately(self):
+        compact_response = self.client.get('/api/market-data/?format=compact')
+        self.assertEqual(compact_response.status_code, 200)
+        response = self.client.get('/api/market-data/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertLess(len(compact_response.content), len(response.content))
+        self.assertEqual(list(json.loads(compact_response.content)), list(json.loads(response.content)))
+
+    def test_large_json_is_gzipped(self):
+        plain = self.client.get('/api/overview-data/')
+        response = self.client.get('/api/overview-data/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertLess(len(response.content), len(plain.content))
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertTrue(response['ETag'].startswith('W/'))
+
+
+class TopNTests(DashboardTestCase):
+
+    def test_top_products_per_market(self):
+        response = self.client.get('/api/top-n/?group=market&item=product&n=3&metric=profit')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEqual((data['group'], data['item'], data['metric'], data['n']), ('market', 'product', 'profit', 3))
+
+        totals = self.frame.groupby(['Market', 'Product'])['Profit'].sum().reset_index()
+        totals = totals.sort_values(['Market', 'Profit', 'Product'], ascending=[True, False, True])
+        expected = {
+            market: rows[['Product', 'Profit']].head(3).values.tolist()
+            for market, rows in totals.groupby('Market')
+        }
+        actual = {
+            market: [[row['name'], float(row['total_profit'])] for row in rows]
+            for market, rows in data['results'].items()
+        }
+        self.assertEqual(actual.keys(), expected.keys())
+        for market in expected:
+            with self.subTest(market=market):
+                self.assertEqual([row[0] for row in actual[market]], [row[0] for row in expected[market]])
+                for (_, value), (_, total) in zip(actual[market], expected[market]):
+                    self.assertEqual(value, round(value, 2))
+                    self.assertAlmostEqual(value, total, places=2)
+
+    def test_filters_and_limits(self):
+        data = json.loads(self.client.get('/api/top-n/?group=segment&item=customer&n=100000').content)
+        self.assertEqual(data['n'], MAX_TOP_N)
+        market = json.loads(self.client.get('/api/top-n/?market_id=1').content)
+        self.assertLessEqual(len(market['results']), 1)
+
+    def test_invalid_params_are_rejected(self):
+        for query in ('group=market&item=market', 'group=planet', 'metric=volume'):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f'/api/top-n/?{query}').status_code, 400)
+
+
+class EngineParityTests(DashboardTestCase):
+
+    def filter_sets(self):
+        """Các tổ hợp bộ lọc đại diện cho từng trang (kể cả giá trị không hợp lệ)"""
+        year = SalesRollup.objects.order_by('year').values_list('year', flat=True).first()
+        return [
+            {},
+            {'year': year},
+            {'year': year, 'quarter': 2},
+            {'month': 5},
+            {'market_id': Market.objects.order_by('id').values_list('id', flat=True).first()},
+            {'segment_id': CustomerSegment.objects.order_by('id').values_list('id', flat=True).first()},
+            {'category_id': Category.objects.order_by('id').values_list('id', flat=True).first()},
+            {'product_id': Product.objects.order_by('id').values_list('id', flat=True).first()},
+            {'market_id': 'abc', 'segment_id': 'x', 'category_id': '1.5'},
+        ]
+
+    def test_pages_match_between_engines(self):
+        for page in PAGES:
+            for filters in self.filter_sets():
+                params = QueryDict(urlencode(filters))
+                with self.subTest(page=page, filters=filters):
+                    orm = build_payload(page, params, engine='orm')
+                    columnar = build_payload(page, params, engine='columnar')
+                    # Con trỏ trang là giá trị nội bộ của từng backend (số thực cộng theo thứ tự khác nhau)
+                    for payload in (orm, columnar):
+                        payload.pop('product_metrics_next', None)
+                    self.assertEqual(orm, columnar)
+
+
+class ExplainQueriesTests(DashboardTestCase):
+
+    def test_filtered_queries_use_indexes(self):
+        output = StringIO()
+        call_command('explain_queries', fail_on_scan=True, stdout=output)
+        self.assertIn('Không có truy vấn có bộ lọc nào phải quét toàn bảng', output.getvalue())
+
+
+class PerfTests(DashboardTestCase):
+
+    def setUp(self):
+        super().setUp()
+        reset_perf()
+        self.addCleanup(reset_perf)
+
+    def test_percentile_is_nearest_rank(self):
+        values = list(range(1, 11))
+        self.assertEqual([percentile(values, p) for p in (0, 10, 50, 55, 95, 100)], [1, 1, 5, 6, 10, 10])
+        self.assertEqual(percentile([7], 99), 7)
+
+    def test_server_timing_and_perf_summary(self):
+        response = self.client.get('/api/market-data/')
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", app;dur=[\d.]+, total;dur=')
+        self.client.get('/api/market-data/')
+
+        data = json.loads(self.client.get('/api/perf/?view=market_data').content)
+        self.assertEqual(list(data['views']), ['market_data'])
+        summary = data['views']['market_data']
+        self.assertEqual((summary['samples'], summary['cache_hits']), (2, 1))
+        self.assertGreater(summary['queries']['max'], 0)
+        self.assertEqual(summary['queries']['p50'], 0)
+        self.assertTrue(summary['slowest_query']['sql'].upper().startswith(('SELECT', 'WITH')))
+
+    @override_settings(DASHBOARD_PERF_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_recorded(self):
+        response = self.client.get('/api/market-data/')
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual(json.loads(self.client.get('/api/perf/').content)['views'], {})
+
+
+@override_settings(DASHBOARD_CACHE_ENABLED=False)
+class ProductMetricsPaginationTests(DashboardTestCase):
+
+    def walk(self, engine, sort, order, limit=7):
+        """Đi qua mọi trang theo next_cursor, trả về danh sách các dòng"""
+        rows = []
+        cursor = ''
+        with override_settings(DASHBOARD_ENGINE=engine):
+            for _ in range(1000):
+                query = urlencode({'sort': sort, 'order': order, 'limit': limit, 'cursor': cursor})
+                response = self.client.get(f'/api/product-metrics/?{query}')
+                self.assertEqual(response.status_code, 200, response.content)
+                data = json.loads(response.content)
+                self.assertLessEqual(len(data['results']), limit)
+                rows += data['results']
+                cursor = data['next_cursor']
+                if not cursor:
+                    return rows
+        self.fail('next_cursor không kết thúc')
+
+    def product_count(self):
+        return OrderDetail.objects.values('product_id').distinct().count()
+
+    def assert_complete_and_ordered(self, rows, field, order):
+        names = [(row[CATEGORY_KEY], row[SUBCATEGORY_KEY], row[PRODUCT_KEY]) for row in rows]
+        self.assertEqual(len(names), len(set(names)))
+        self.assertEqual(len(names), self.product_count())
+        values = [Decimal(row[field]) if row[field] is not None else Decimal(0) for row in rows]
+        self.assertEqual(values, sorted(values, reverse=order == 'desc'))
+
+    def test_cursor_pages_cover_every_product_once(self):
+        for sort, field in [('sales', 'total_sales'), ('profit', 'total_profit'), ('margin', 'profit_margin')]:
+            for order in ('desc', 'asc'):
+                with self.subTest(sort=sort, order=order):
+                    orm = self.walk('orm', sort, order)
+                    self.assert_complete_and_ordered(orm, field, order)
+                    self.assertEqual(orm, self.walk('columnar', sort, order))
+
+    def test_zero_sales_product_is_paginated_by_margin(self):
+        product = OrderDetail.objects.order_by('id').values_list('product_id', flat=True).first()
+        OrderDetail.objects.filter(product_id=product).update(sales=0)
+        refresh_facts()
+        refresh_rollups()
+        bump_data_version()
+        for engine in ('orm', 'columnar'):
+            for order in ('desc', 'asc'):
+                with self.subTest(engine=engine, order=order):
+                    rows = self.walk(engine, 'margin', order, limit=3)
+                    self.assert_complete_and_ordered(rows, 'profit_margin', order)
+                    self.assertIn(None, [row['profit_margin'] for row in rows])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get('/api/product-metrics/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+
+
+class WidgetsApiTests(DashboardTestCase):
+
+    def post(self, body):
+        """POST /api/widgets/ với body JSON (chuỗi được gửi nguyên trạng)"""
+        data = body if isinstance(body, str) else json.dumps(body)
+        return self.client.post('/api/widgets/', data, content_type='application/json')
+
+    def test_get_returns_selected_widgets(self):
+        year = SalesRollup.objects.values_list('year', flat=True).first()
+        response = self.client.get(f'/api/widgets/?widgets=sales_by_market,top_customers&year={year}')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEqual(set(data), {'sales_by_market', 'top_customers'})
+        self.assertEqual(data['sales_by_market'],
+                         json.loads(self.client.get(f'/api/overview-data/?year={year}').content)['sales_by_market'])
+
+    def test_post_matches_get(self):
+        year = SalesRollup.objects.values_list('year', flat=True).first()
+        response = self.post({'widgets': ['overview_kpi', 'profit_by_category'], 'filters': {'year': year}})
+        self.assertEqual(response.status_code, 200)
+        expected = self.client.get(f'/api/widgets/?widgets=overview_kpi,profit_by_category&year={year}')
+        self.assertEqual(json.loads(response.content), json.loads(expected.content))
+
+    def test_invalid_requests_are_rejected(self):
+        for body in ('{not json', [1, 2], {'widgets': 'sales_by_market'}, {'widgets': [1]},
+                     {'widgets': []}, {'widgets': ['no_such_widget']}, {'widgets': ['overview_kpi'], 'filters': 5}):
+            with self.subTest(body=body):
+                response = self.post(body)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', json.loads(response.content))
+        self.assertEqual(self.client.get('/api/widgets/').status_code, 400)
+        self.assertEqual(self.client.get('/api/widgets/?widgets=no_such_widget').status_code, 400)
+
+
+class AsyncViewTests(CommittedDataTestCase):
+
+    def test_async_views_match_sync_views(self):
+        for page in PAGES:
+            with self.subTest(page=page):
+                expected = self.client.get(f'/api/{page}-data/?format=compact')
+                response = async_to_sync(self.async_client.get)(f'/api/async/{page}-data/?format=compact')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(json.loads(response.content), json.loads(expected.content))
+                # Truy vấn trên luồng của pool vẫn được PerformanceMiddleware đếm
+                self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="[1-9]\d* queries"')
+
+    def test_middlewares_do_not_force_sync(self):
+        async def get_response(request):
+            return None
+
+        for middleware in (PerformanceMiddleware, CompressionMiddleware):
+            with self.subTest(middleware=middleware.__name__):
+                self.assertTrue(iscoroutinefunction(middleware(get_response)))
+                self.assertFalse(iscoroutinefunction(middleware(lambda request: None)))
+
+
+class WarmupTests(CommittedDataTestCase):
+
+    def new_rows(self, rows, seed, start_row):
+        """Các dòng mới với mã đơn hàng riêng theo seed"""
+        frame = generate_frame(rows, seed=seed, start_row=start_row)
+        frame['Order ID'] = f'NEW{seed}-' + frame['Order ID']
+        return frame
+
+    def test_warmed_combinations_are_cache_hits(self):
+        result = warm_cache(pages=['market', 'customer'])
+        combinations = Market.objects.count() + CustomerSegment.objects.count() + 2
+        self.assertEqual((result['combinations'], result['warmed'], result['skipped']), (combinations, combinations, 0))
+        self.assertFalse(result['stale'])
+
+        market_id = Market.objects.values_list('id', flat=True).first()
+        for url in ('/api/market-data/', f'/api/market-data/?market_id={market_id}', '/api/customer-data/'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+        self.assertEqual(self.client.get('/api/overview-data/')['X-Cache'], 'MISS')
+        # Lượt sau bỏ qua các khoá đã có
+        self.assertEqual(warm_cache(pages=['market'])['skipped'], Market.objects.count() + 1)
+
+    @override_settings(DASHBOARD_WARM_ON_IMPORT=True)
+    def test_import_schedules_warmup_after_commit(self):
+        frame = self.new_rows(30, seed=8, start_row=DashboardTestCase.ROWS + 1)
+        with mock.patch('dashboard.warmup._scheduler') as scheduler:
+            self.assertTrue(DashboardTestCase.import_frame(frame)[0])
+            scheduler.submit.assert_called_with(_warm_in_background)
+
+            scheduler.reset_mock()
+            # Không có dòng mới thì không làm nóng lại
+            self.assertTrue(DashboardTestCase.import_frame(frame, mode='incremental')[0])
+            with self.settings(DASHBOARD_CACHE_ENABLED=False):
+                self.assertTrue(DashboardTestCase.import_frame(self.new_rows(30, seed=9, start_row=1000))[0])
+            scheduler.submit.assert_not_called()
+
+
+@override_settings(DASHBOARD_READ_DATABASE='readonly')
+class ReadWriteRouterTests(CommittedDataTestCase):
+    databases = {'default', 'readonly'}
+
+    def test_reads_use_readonly_connection_outside_transactions(self):
+        router = ReadWriteRouter()
+        self.assertEqual(router.db_for_read(SalesFact), 'readonly')
+        self.assertEqual(router.db_for_write(SalesFact), 'default')
+        with transaction.atomic():
+            # Trong transaction ghi phải đọc được dữ liệu vừa ghi
+            self.assertEqual(router.db_for_read(SalesFact), 'default')
+        with self.settings(DASHBOARD_READ_DATABASE=None):
+            self.assertEqual(router.db_for_read(SalesFact), 'default')
+        self.assertTrue(router.allow_migrate('default', 'dashboard'))
+        self.assertFalse(router.allow_migrate('readonly', 'dashboard'))
+
+    def test_api_reads_through_readonly_connection(self):
+        with CaptureQueriesContext(connections['readonly']) as queries:
+            response = self.client.get('/api/market-data/?format=compact')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(queries.captured_queries)
+        with self.settings(DASHBOARD_READ_DATABASE=None, DASHBOARD_CACHE_ENABLED=False):
+            expected = self.client.get('/api/market-data/?format=compact')
+        self.assertEqual(json.loads(response.content), json.loads(expected.content))
+
+
+class ExportTests(DashboardTestCase):
+
+    def export(self, query):
+        response = self.client.get(f'/api/export/?{query}')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv_can_be_imported_again(self):
+        response, content = self.export('')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="orders.csv"')
+        frame = pd.read_csv(BytesIO(content))
+        self.assertEqual(list(frame.columns), COLUMNS)
+        self.assertEqual(frame['Row ID'].tolist(), sorted(self.frame['Row ID']))
+        self.assertAlmostEqual(frame['Sales'].sum(), self.frame['Sales'].sum(), places=2)
+
+    def test_filters_match_dashboard_filters(self):
+        year = SalesRollup.objects.values_list('year', flat=True).first()
+        market = Market.objects.first()
+        _, content = self.export(f'year={year}&market_id={market.id}')
+        frame = pd.read_csv(BytesIO(content))
+        expected = OrderDetail.objects.filter(order__year=year, order__city__state__country__market=market)
+        self.assertEqual(sorted(frame['Row ID']), sorted(expected.values_list('row_id', flat=True)))
+        self.assertEqual(set(frame['Market']), {market.name})
+
+    def test_xlsx(self):
+        category = Category.objects.first()
+        _, content = self.export(f'format=xlsx&category_id={category.id}')
+        frame = pd.read_excel(BytesIO(content))
+        self.assertEqual(list(frame.columns), COLUMNS)
+        self.assertEqual(len(frame), OrderDetail.objects.filter(product__subcategory__category=category).count())
+
+    @skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrow chưa được cài')
+    def test_parquet(self):
+        _, content = self.export('format=parquet')
+        frame = pd.read_parquet(BytesIO(content))
+        self.assertEqual(list(frame.columns), COLUMNS)
+        self.assertEqual(len(frame), self.ROWS)
+
+    @skipIf(importlib.util.find_spec('pyarrow'), 'pyarrow đã được cài')
+    def test_parquet_without_pyarrow_is_rejected(self):
+        response = self.client.get('/api/export/?format=parquet')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('pyarrow', json.loads(response.content)['error'])
+
+    def test_invalid_format_is_rejected(self):
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/export/?format=json')
+        self.assertEqual(response.status_code, 400)
+
+
+class TimeseriesTests(DashboardTestCase):
+
+    def series(self, query):
+        response = self.client.get(f'/api/timeseries/?{query}')
+        self.assertEqual(response.status_code, 200, response.content)
+        return json.loads(response.content)
+
+    def test_series_is_dense_and_matches_facts(self):
+        first = SalesFact.objects.order_by('order_date').values_list('order_date', flat=True).first()
+        last = first + datetime.timedelta(days=59)
+        for granularity in ('day', 'week', 'month'):
+            with self.subTest(granularity=granularity):
+                data = self.series(f'start={first}&end={last}&granularity={granularity}&measures=sales,orders')
+                dates = [datetime.date.fromisoformat(row['date']) for row in data['series']]
+                self.assertEqual(dates, bucket_range(first, last, granularity))
+                self.assertLessEqual(data['start'], first.isoformat())
+                self.assertGreaterEqual(data['end'], last.isoformat())
+                # Mở rộng ra biên bucket nên tổng phải tính trên cùng khoảng ngày
+                expected = SalesFact.objects.filter(order_date__range=(data['start'], data['end']))
+                self.assertAlmostEqual(sum(float(row['sales']) for row in data['series']),
+                                       float(sum(expected.values_list('sales', flat=True))), places=2)
+                self.assertEqual(sum(row['orders'] for row in data['series']),
+                                 expected.values('order').distinct().count())
+        self.assertEqual(len(self.series(f'start={first}&end={last}')['series']), 60)
+
+    def test_filters(self):
+        market = Market.objects.first()
+        data = self.series(f'granularity=month&measures=lines&market_id={market.id}')
+        self.assertEqual(sum(row['lines'] for row in data['series']), SalesFact.objects.filter(market=market).count())
+
+    def test_shifted_window_only_computes_new_buckets(self):
+        first = SalesFact.objects.order_by('order_date').values_list('order_date', flat=True).first()
+        with mock.patch('dashboard.timeseries.compute_buckets', wraps=compute_buckets) as compute:
+            self.series(f'start={first}&end={first + datetime.timedelta(days=9)}')
+            self.series(f'start={first + datetime.timedelta(days=5)}&end={first + datetime.timedelta(days=14)}')
+        self.assertEqual(compute.call_args_list[1].args[1],
+                         [first + datetime.timedelta(days=day) for day in range(10, 15)])
+        # Phiên bản dữ liệu mới: mọi bucket được tính lại
+        bump_data_version()
+        with mock.patch('dashboard.timeseries.compute_buckets', wraps=compute_buckets) as compute:
+            self.series(f'start={first}&end={first + datetime.timedelta(days=9)}')
+        self.assertEqual(len(compute.call_args.args[1]), 10)
+
+    def test_invalid_params_are_rejected(self):
+        for query in ('granularity=year', 'measures=sales,foo', 'start=2014-02-30',
+                      'start=2014-02-01&end=2014-01-01', 'start=2000-01-01&end=2100-01-01',
+                      'start=9999-12-31&end=9999-12-31', 'start=9999-12-27&end=9999-12-31&granularity=week',
+                      'start=9999-12-01&end=9999-12-31&granularity=month'):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/timeseries/?{query}')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', json.loads(response.content))
+
+
+class CohortTests(DashboardTestCase):
+
+    def matrix(self, query=''):
+        response = self.client.get(f'/api/cohorts/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def expected_sizes(self, orders):
+        """Số khách của mỗi cohort (tháng mua đầu tiên 'YYYY-MM') tính thẳng từ Order"""
+        first_months = {}
+        for customer_id, year, month in orders.values_list('customer_id', 'year', 'month'):
+            first_months[customer_id] = min(first_months.get(customer_id, (year, month)), (year, month))
+        return dict(Counter(f'{year:04d}-{month:02d}' for year, month in first_months.values()))
+
+    def test_matrix_matches_orders(self):
+        data = self.matrix()
+        last = Order.objects.order_by('-order_date').first()
+        self.assertEqual(data['last_month'], f'{last.year:04d}-{last.month:02d}')
+        self.assertEqual({cohort['cohort']: cohort['size'] for cohort in data['cohorts']},
+                         self.expected_sizes(Order.objects.all()))
+        for cohort in data['cohorts']:
+            with self.subTest(cohort=cohort['cohort']):
+                year, month = map(int, cohort['cohort'].split('-'))
+                self.assertEqual(len(cohort['customers']), (last.year - year) * 12 + last.month - month + 1)
+                self.assertEqual((cohort['customers'][0], cohort['retention'][0]), (cohort['size'], 100))
+                self.assertTrue(all(0 <= value <= 100 for value in cohort['retention']))
+        total = sum(Decimal(sales) for cohort in data['cohorts'] for sales in cohort['sales'])
+        self.assertAlmostEqual(float(total), self.frame['Sales'].sum(), places=2)
+
+    def test_segment_filter(self):
+        segment = CustomerSegment.objects.first()
+        data = self.matrix(f'segment_id={segment.id}')
+        self.assertEqual({cohort['cohort']: cohort['size'] for cohort in data['cohorts']},
+                         self.expected_sizes(Order.objects.filter(customer__segment=segment)))
+        # Giá trị không phải số nguyên cho kết quả rỗng như các bộ lọc khác
+        self.assertEqual(self.matrix('segment_id=abc')['cohorts'], [])
+
+
+class RFMTests(DashboardTestCase):
+
+    def get(self, path, query=''):
+        response = self.client.get(f'/api/rfm/{path}/?{query}')
+        self.assertEqual(response.status_code, 200, response.content)
+        return json.loads(response.content)
+
+    def test_top_customers(self):
+        sales = self.frame.groupby('Customer ID')['Sales'].sum().sort_values(ascending=False)
+        data = self.get('top-customers', 'n=5')
+        self.assertEqual(len(data['customers']), 5)
+        monetary = [float(customer['monetary']) for customer in data['customers']]
+        self.assertEqual(monetary, sorted(monetary, reverse=True))
+        self.assertAlmostEqual(monetary[0], sales.iloc[0], places=2)
+        self.assertEqual(data['customers'][0]['customer__customer_id'], sales.index[0])
+
+        scores = [customer['rfm_score'] for customer in self.get('top-customers', 'order=score&n=20')['customers']]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        champions = self.get('top-customers', 'rfm_segment=champions&n=50')['customers']
+        self.assertTrue(all(customer['rfm_segment'] == 'champions' for customer in champions))
+
+    def test_distribution_and_breakdown_cover_every_customer(self):
+        customers = self.frame['Customer ID'].nunique()
+        distribution = self.get('distribution')
+        self.assertEqual(distribution['customers'], customers)
+        for name in ('recency', 'frequency', 'monetary'):
+            with self.subTest(score=name):
+                self.assertEqual(len(distribution[name]), len(distribution['scores']))
+                self.assertEqual(sum(distribution[name]), customers)
+
+        breakdown = self.get('breakdown')
+        self.assertEqual(sum(row['customers'] for row in breakdown['results']), customers)
+        self.assertAlmostEqual(sum(float(row['total_sales']) for row in breakdown['results']),
+                               self.frame['Sales'].sum(), places=2)
+        self.assertEqual(sum(row['total_orders'] for row in breakdown['results']), self.frame['Order ID'].nunique())
+
+        segment = CustomerSegment.objects.first()
+        filtered = self.get('breakdown', f'segment_id={segment.id}&rfm_segment=loyal')['results']
+        self.assertTrue(all((row['segment__name'], row['rfm_segment']) == (segment.name, 'loyal') for row in filtered))
+        self.assertEqual(self.get('distribution', f'segment_id={segment.id}')['customers'],
+                         segment.customers.count())
+
+    def test_invalid_params_are_rejected(self):
+        for url in ('/api/rfm/top-customers/?order=recency', '/api/rfm/top-customers/?rfm_segment=vip',
+                    '/api/rfm/distribution/?rfm_segment=vip', '/api/rfm/breakdown/?rfm_segment=vip'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', json.loads(response.content))
+
+
+class ImportJobTests(DashboardTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.upload_dir = tempfile.mkdtemp()
+        self.addCleanup(os.rmdir, self.upload_dir)
+        overrides = self.settings(IMPORT_UPLOAD_DIR=self.upload_dir, IMPORT_JOBS_IN_PROCESS=False)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def upload(self, name, content, mode='incremental'):
+        """Gửi form nhập dữ liệu với một file"""
+        return self.client.post('/import-excel/', {'excel_file': SimpleUploadedFile(name, content), 'mode': mode})
+
+    def status(self, job):
+        response = self.client.get(f'/api/import-status/{job.id}/')
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def test_upload_is_queued_then_imported(self):
+        frame = pd.concat([self.frame, self.new_rows(30, seed=8)])
+        response = self.upload('data.csv', frame.to_csv(index=False).encode())
+        job = ImportJob.objects.get()
+        self.assertRedirects(response, f'/import-excel/?job={job.id}')
+        self.assertEqual(self.status(job)['status'], ImportJob.STATUS_PENDING)
+        self.assertEqual(len(os.listdir(self.upload_dir)), 1)
+
+        self.assertTrue(run_import_job(job.id))
+        status = self.status(job)
+        self.assertEqual((status['status'], status['percent']), (ImportJob.STATUS_SUCCEEDED, 100.0))
+        self.assertEqual((status['rows_processed'], status['total_rows']), (self.ROWS + 30, self.ROWS + 30))
+        self.assertEqual((status['report']['inserted'], status['report']['skipped']), (30, self.ROWS))
+        self.assertEqual(os.listdir(self.upload_dir), [])
+        # Job đã chạy không được nhận lại
+        self.assertIsNone(run_import_job(job.id))
+
+    def test_failed_job_removes_upload(self):
+        self.upload('data.csv', b'a,b\n1,2\n')
+        job = ImportJob.objects.get()
+        self.assertFalse(run_import_job(job.id))
+        status = self.status(job)
+        self.assertEqual(status['status'], ImportJob.STATUS_FAILED)
+        self.assertTrue(status['message'])
+        self.assertEqual(os.listdir(self.upload_dir), [])
+
+    def test_unsupported_file_is_rejected(self):
+        response = self.upload('notes.txt', b'hello')
+        self.assertContains(response, '.txt')
+        self.assertFalse(ImportJob.objects.exists())
+        self.assertEqual(os.listdir(self.upload_dir), [])
+
+    def test_invalid_mode_is_rejected(self):
+        response = self.upload('data.csv', b'a\n1\n', mode='bogus')
+        self.assertContains(response, 'bogus')
+        self.assertFalse(ImportJob.objects.exists())
+
+    def test_unknown_job_is_404(self):
+        self.assertEqual(self.client.get('/api/import-status/999999/').status_code, 404)
+
+
+class BenchmarkTests(DashboardTestCase):
+
+    def test_generator_is_deterministic(self):
+        frame = generate_frame(50, seed=3, start_row=101)
+        self.assertEqual(list(frame.columns), COLUMNS)
+        self.assertEqual(frame['Row ID'].tolist(), list(range(101, 151)))
+        self.assertTrue(frame.equals(generate_frame(50, seed=3, start_row=101)))
+        self.assertFalse(frame.equals(generate_frame(50, seed=4, start_row=101)))
+
+    def test_parse_size(self):
+        self.assertEqual(parse_size('100k'), 100_000)
+        self.assertEqual(parse_size('1_000'), 1000)
+        for value in ('abc', '0'):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                parse_size(value)
+
+    def test_run_benchmark_measures_every_scenario(self):
+        results = run_benchmark(iterations=1, endpoints=['/api/market-data/', '/api/top-n/'])
+        self.assertEqual(len(results['endpoints']), 5)
+        for row in results['endpoints']:
+            with self.subTest(endpoint=row['endpoint'], query=row['query']):
+                self.assertEqual(row['status'], 200)
+                self.assertGreater(row['queries'], 0)
+
+        comparison = compare_results(results, results)
+        self.assertEqual({row['ratio'] for row in comparison['endpoints']} - {None}, {1.0})
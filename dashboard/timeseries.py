@@ -0,0 +1,172 @@
+# dashboard/timeseries.py
+
+import datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Count, Max, Min, Sum
+from django.http import QueryDict
+
+from .cache import cache_key, get_cache, get_data_version
+from .models import SalesFact
+from .queries import FILTER_FIELDS, apply_filters
+
+# Các chỉ số của chuỗi thời gian (đều cộng dồn được giữa các ngày trong một bucket)
+TIMESERIES_MEASURES = {
+    'sales': lambda: Sum('sales'),
+    'profit': lambda: Sum('profit'),
+    'quantity': lambda: Sum('quantity'),
+    'lines': lambda: Count('id'),
+    # Mỗi đơn hàng chỉ có một ngày nên số đơn của các ngày cộng lại đúng bằng số đơn của bucket
+    'orders': lambda: Count('order', distinct=True),
+}
+
+# Giá trị của bucket không có dữ liệu (cùng kiểu với kết quả SUM trên cột Decimal)
+MEASURE_ZERO = {'sales': Decimal(0), 'profit': Decimal(0)}
+
+GRANULARITIES = ['day', 'week', 'month']
+
+# Số bucket tối đa trong một response
+MAX_BUCKETS = 5000
+
+
+def bucket_start(day, granularity):
+    """Ngày đầu của bucket chứa day (tuần bắt đầu từ thứ Hai)"""
+    if granularity == 'week':
+        return day - datetime.timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(start, granularity):
+    """Ngày đầu của bucket kế tiếp, ValueError nếu vượt quá ngày lớn nhất (9999-12-31)"""
+    try:
+        if granularity == 'week':
+            return start + datetime.timedelta(days=7)
+        if granularity == 'month':
+            return (start + datetime.timedelta(days=32)).replace(day=1)
+        return start + datetime.timedelta(days=1)
+    except OverflowError:
+        raise ValueError(f"Khoảng thời gian vượt quá ngày {datetime.date.max.isoformat()}")
+
+
+def bucket_range(start, end, granularity):
+    """Ngày đầu của mọi bucket phủ đoạn [start, end]"""
+    buckets = []
+    current = bucket_start(start, granularity)
+    while current <= end:
+        buckets.append(current)
+        if len(buckets) > MAX_BUCKETS:
+            raise ValueError(f"Quá {MAX_BUCKETS} bucket, hãy thu hẹp khoảng thời gian hoặc tăng granularity")
+        current = next_bucket(current, granularity)
+    return buckets
+
+
+def _parse_date(value, name):
+    """Ngày dạng YYYY-MM-DD"""
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} không hợp lệ: {value} (định dạng YYYY-MM-DD)")
+
+
+def parse_timeseries(params):
+    """
+    Tham số của chuỗi thời gian: start/end (mặc định ngày đầu/cuối có dữ liệu), granularity
+    (day, week, month) và measures (danh sách chỉ số cách nhau bởi dấu phẩy, mặc định sales).
+    ValueError nếu tham số không hợp lệ.
+    """
+    granularity = params.get('granularity') or 'day'
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity không hợp lệ: {granularity} (chọn một trong {', '.join(GRANULARITIES)})")
+    measures = [measure.strip() for measure in (params.get('measures') or 'sales').split(',') if measure.strip()]
+    unknown = [measure for measure in measures if measure not in TIMESERIES_MEASURES]
+    if unknown or not measures:
+        raise ValueError(
+            f"measures không hợp lệ: {', '.join(unknown)} (chọn trong {', '.join(TIMESERIES_MEASURES)})"
+        )
+
+    start = _parse_date(params['start'], 'start') if params.get('start') else None
+    end = _parse_date(params['end'], 'end') if params.get('end') else None
+    if start is None or end is None:
+        bounds = SalesFact.objects.aggregate(first=Min('order_date'), last=Max('order_date'))
+        start = start or bounds['first']
+        end = end or bounds['last']
+    if start and end and start > end:
+        raise ValueError("start phải nhỏ hơn hoặc bằng end")
+    return {'start': start, 'end': end, 'granularity': granularity, 'measures': list(dict.fromkeys(measures))}
+
+
+def _runs(buckets, granularity):
+    """Gom các bucket liên tiếp thành các đoạn ngày [đầu, cuối] để mỗi đoạn là một lần quét chỉ mục"""
+    runs = []
+    for bucket in buckets:
+        last_day = next_bucket(bucket, granularity) - datetime.timedelta(days=1)
+        if runs and runs[-1][1] + datetime.timedelta(days=1) == bucket:
+            runs[-1][1] = last_day
+        else:
+            runs.append([bucket, last_day])
+    return runs
+
+
+def compute_buckets(queryset, buckets, granularity, measures):
+    """
+    Giá trị các chỉ số của từng bucket: nhóm theo order_date trong SQL trên khoảng ngày
+    (quét chỉ mục order_date, không dùng hàm trích xuất trên cột), rồi cộng các ngày vào bucket.
+    """
+    values = {bucket: {measure: MEASURE_ZERO.get(measure, 0) for measure in measures} for bucket in buckets}
+    aggregates = {measure: TIMESERIES_MEASURES[measure]() for measure in measures}
+    for first, last in _runs(buckets, granularity):
+        rows = (queryset.filter(order_date__gte=first, order_date__lte=last)
+                .values('order_date').annotate(**aggregates).order_by())
+        for row in rows:
+            bucket = values[bucket_start(row['order_date'], granularity)]
+            for measure in measures:
+                bucket[measure] += row[measure] or 0
+    return values
+
+
+def timeseries(params):
+    """
+    Chuỗi thời gian dày đặc (bucket không có dữ liệu có giá trị 0) của các chỉ số theo bộ lọc chung.
+    Khoảng [start, end] được mở rộng ra biên của bucket; giá trị từng bucket được cache theo
+    phiên bản dữ liệu nên khi dịch cửa sổ thời gian chỉ các bucket mới phải tính.
+    """
+    spec = parse_timeseries(params)
+    granularity, measures = spec['granularity'], spec['measures']
+    if spec['start'] is None:
+        return {**spec, 'series': []}
+    buckets = bucket_range(spec['start'], spec['end'], granularity)
+
+    # Khoá của một bucket: bộ lọc + granularity + measures + ngày đầu bucket
+    series_params = QueryDict(mutable=True)
+    for name in FILTER_FIELDS:
+        if params.get(name):
+            series_params[name] = params.get(name)
+    series_params['granularity'] = granularity
+    series_params['measures'] = ','.join(measures)
+    version = get_data_version()
+    prefix = cache_key('timeseries', series_params, version)
+    keys = {bucket: f'{prefix}:{bucket.isoformat()}' for bucket in buckets}
+
+    cache = get_cache() if getattr(settings, 'DASHBOARD_CACHE_ENABLED', True) else None
+    cached = cache.get_many(list(keys.values())) if cache else {}
+    values = {bucket: cached[key] for bucket, key in keys.items() if key in cached}
+    missing = [bucket for bucket in buckets if bucket not in values]
+    if missing:
+        computed = compute_buckets(apply_filters(SalesFact.objects.all(), params), missing, granularity, measures)
+        values.update(computed)
+        if cache:
+            cache.set_many(
+                {keys[bucket]: value for bucket, value in computed.items()},
+                getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', None)
+            )
+
+    return {
+        'start': buckets[0],
+        'end': next_bucket(buckets[-1], granularity) - datetime.timedelta(days=1),
+        'granularity': granularity,
+        'measures': measures,
+        'series': [{'date': bucket, **values[bucket]} for bucket in buckets],
+    }
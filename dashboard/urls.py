@@ -17,4 +17,23 @@ urlpatterns = [
     path('api/market-data/', views.market_data, name='market_data'),
     path('api/customer-data/', views.customer_data, name='customer_data'),
     path('api/product-data/', views.product_data, name='product_data'),
+    path('api/product-metrics/', views.product_metrics_data, name='product_metrics_data'),
+
+    # Bản async của các API trang (chạy tốt nhất dưới ASGI: uvicorn/daphne ecommerce_dashboard.asgi)
+    path('api/async/overview-data/', views.overview_data_async, name='overview_data_async'),
+    path('api/async/market-data/', views.market_data_async, name='market_data_async'),
+    path('api/async/customer-data/', views.customer_data_async, name='customer_data_async'),
+    path('api/async/product-data/', views.product_data_async, name='product_data_async'),
+
+    path('api/top-n/', views.top_n_data, name='top_n_data'),
+    path('api/timeseries/', views.timeseries_data, name='timeseries_data'),
+    path('api/cohorts/', views.cohort_data, name='cohort_data'),
+    path('api/rfm/top-customers/', views.rfm_top_customers_data, name='rfm_top_customers_data'),
+    path('api/rfm/distribution/', views.rfm_distribution_data, name='rfm_distribution_data'),
+    path('api/rfm/breakdown/', views.rfm_breakdown_data, name='rfm_breakdown_data'),
+    path('api/widgets/', views.widgets_data, name='widgets_data'),
+    path('api/export/', views.export_data, name='export_data'),
+    path('api/import-status/<int:job_id>/', views.import_status, name='import_status'),
+    path('api/cache-stats/', views.cache_stats_data, name='cache_stats'),
+    path('api/perf/', views.perf_data, name='perf'),
 ]
\ No newline at end of file
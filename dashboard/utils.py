@@ -1,197 +1,492 @@
 # dashboard/utils.py
 
+import logging
+import os
+import time
 import pandas as pd
 from django.db import transaction
 from .models import (
     Region, Market, Country, State, City,
-    CustomerSegment, Customer, Category, 
+    CustomerSegment, Customer, Category,
     Subcategory, Product, Order, OrderDetail
 )
+from .cache import bump_data_version
+from .cohorts import refresh_cohorts
+from .facts import refresh_facts
+from .rfm import refresh_rfm
+from .rollups import refresh_rollups
+from .warmup import schedule_warmup
 
-def import_excel_data(excel_file):
-    """Nhập dữ liệu từ file Excel vào cơ sở dữ liệu"""
+logger = logging.getLogger(__name__)
+
+# Số bản ghi tối đa cho mỗi lệnh bulk_create
+BATCH_SIZE = 2000
+
+# Số dòng đọc và commit mỗi lần khi nhập theo luồng
+CHUNK_SIZE = 20000
+
+# Chế độ nhập dữ liệu
+# - append: chỉ thêm mới, Row ID trùng sẽ gây lỗi (hành vi mặc định)
+# - incremental: bỏ qua các dòng có Row ID đã tồn tại
+# - upsert: như incremental nhưng cập nhật các chỉ số (quantity/sales/discount/profit) đã thay đổi
+IMPORT_MODE_APPEND = 'append'
+IMPORT_MODE_INCREMENTAL = 'incremental'
+IMPORT_MODE_UPSERT = 'upsert'
+IMPORT_MODES = [IMPORT_MODE_APPEND, IMPORT_MODE_INCREMENTAL, IMPORT_MODE_UPSERT]
+
+# Định dạng file (phần mở rộng) nhập được
+IMPORT_FORMATS = ['xlsx', 'xlsm', 'xls', 'csv', 'parquet']
+
+# Các chỉ số của OrderDetail có thể được cập nhật khi upsert
+MEASURE_FIELDS = ['quantity', 'sales', 'discount', 'profit']
+
+# Các cột dùng làm khoá, được chuẩn hoá về chuỗi trước khi tra cứu
+KEY_COLUMNS = [
+    'Region', 'Market', 'Country', 'State', 'City', 'Segment', 'Customer ID',
+    'Category', 'Subcategory', 'Product', 'Order ID',
+]
+
+
+def _load_keys(model, fields, values=None):
+    """
+    Tải các khoá hiện có của một bảng: toàn bộ bằng một truy vấn duy nhất, hoặc chỉ các khoá
+    một cột trong values (truy vấn IN theo lô BATCH_SIZE giá trị)
+    """
+    if values is None:
+        return {
+            tuple(row[:-1]): row[-1]
+            for row in model.objects.values_list(*fields, 'id').iterator(chunk_size=BATCH_SIZE)
+        }
+    values = list(values)
+    key_map = {}
+    for start in range(0, len(values), BATCH_SIZE):
+        rows = model.objects.filter(**{f'{fields[0]}__in': values[start:start + BATCH_SIZE]})
+        key_map.update(((value,), pk) for value, pk in rows.values_list(fields[0], 'id'))
+    return key_map
+
+
+def _resolve_keys(key_maps, model, fields, frame, build, per_chunk=False):
+    """
+    Đảm bảo mọi khoá trong frame đã có trong bảng, trả về dict {khoá: id}.
+    Các khoá chưa có được tạo bằng bulk_create theo lô.
+    per_chunk=True (bảng lớn theo dữ liệu, vd. Order, khoá một cột): chỉ tải các khoá có trong frame
+    và không giữ lại trong key_maps, để bộ nhớ không tăng theo kích thước bảng và file.
+    """
+    if per_chunk:
+        key_map = _load_keys(model, fields, frame[fields[0]].unique())
+    else:
+        if model not in key_maps:
+            key_maps[model] = _load_keys(model, fields)
+        key_map = key_maps[model]
+
+    keys = list(frame[fields].itertuples(index=False, name=None))
+    missing = [i for i, key in enumerate(keys) if key not in key_map]
+    if not missing:
+        return key_map
+
+    rows = frame.iloc[missing].to_dict('records')
+    objs = model.objects.bulk_create([build(row) for row in rows], batch_size=BATCH_SIZE)
+    if all(obj.pk is not None for obj in objs):
+        key_map.update(zip((keys[i] for i in missing), (obj.pk for obj in objs)))
+    elif per_chunk:
+        # Backend không trả về id sau khi insert: tải lại khoá
+        key_map = _load_keys(model, fields, frame[fields[0]].unique())
+    else:
+        key_maps[model] = key_map = _load_keys(model, fields)
+    return key_map
+
+
+def _map_keys(df, columns, key_map):
+    """Ánh xạ các cột khoá của df sang id tương ứng (NaN nếu không có)"""
+    if len(columns) == 1:
+        return df[columns[0]].map({key[0]: pk for key, pk in key_map.items()})
+    keys = pd.Series(list(zip(*(df[column] for column in columns))), index=df.index)
+    return keys.map(key_map)
+
+
+def _coordinate(value):
+    """Giữ nguyên hành vi cũ: ô trống hoặc bằng 0 được coi là không có toạ độ"""
+    return value if value else None
+
+
+def _existing_details(row_ids):
+    """
+    Tải các OrderDetail hiện có trong khoảng Row ID của dữ liệu đầu vào
+    bằng một truy vấn quét theo chỉ mục unique của row_id.
+    """
+    columns = ['row_id', 'id'] + MEASURE_FIELDS
+    if row_ids.empty:
+        return pd.DataFrame(columns=columns)
+    queryset = OrderDetail.objects.filter(row_id__gte=int(row_ids.min()), row_id__lte=int(row_ids.max()))
+    rows = queryset.values_list(*columns).iterator(chunk_size=BATCH_SIZE)
+    existing = pd.DataFrame(list(rows), columns=columns)
+    return existing[existing['row_id'].isin(row_ids)]
+
+
+def _add_periods(periods, dates):
+    """Ghi nhận các (năm, tháng) bị ảnh hưởng để cập nhật dữ liệu tổng hợp sau khi nhập"""
+    if periods is None or dates.empty:
+        return
+    dates = pd.to_datetime(dates)
+    periods.update(zip(dates.dt.year.tolist(), dates.dt.month.tolist()))
+
+
+def _refresh_derived_data(periods):
+    """
+    Cập nhật các bảng dẫn xuất (fact, rollup, cohort, RFM) cho các tháng vừa thay đổi,
+    sau đó vô hiệu cache của các API khi transaction được commit
+    và tính trước JSON của mọi tổ hợp bộ lọc trên luồng nền.
+    Lần nhập không thêm/cập nhật dòng nào (periods rỗng) giữ nguyên cache và không tính trước lại.
+    """
+    if not periods:
+        return
+    refresh_facts(periods)
+    refresh_rollups(periods)
+    refresh_cohorts(periods)
+    refresh_rfm(periods)
+    transaction.on_commit(bump_data_version)
+    transaction.on_commit(schedule_warmup)
+
+
+def _update_changed_measures(df, existing, periods=None):
+    """Cập nhật các OrderDetail có chỉ số khác với dữ liệu mới, trả về số dòng đã cập nhật"""
+    merged = df.drop_duplicates('Row ID').merge(existing, left_on='Row ID', right_on='row_id')
+    if merged.empty:
+        return 0
+
+    # So sánh ở độ chính xác được lưu trong DB (2 chữ số thập phân)
+    changed = merged['Quantity'].astype(int) != merged['quantity'].astype(int)
+    for column, field in (('Sales', 'sales'), ('Discount', 'discount'), ('Profit', 'profit')):
+        changed |= merged[column].astype(float).round(2) != merged[field].astype(float)
+    merged = merged[changed]
+    _add_periods(periods, merged['Order Date'])
+
+    details = [
+        OrderDetail(
+            id=int(pk),
+            quantity=int(quantity),
+            sales=float(sales),
+            discount=float(discount),
+            profit=float(profit)
+        )
+        for pk, quantity, sales, discount, profit
+        in merged[['id', 'Quantity', 'Sales', 'Discount', 'Profit']].itertuples(index=False, name=None)
+    ]
+    OrderDetail.objects.bulk_update(details, MEASURE_FIELDS, batch_size=BATCH_SIZE)
+    return len(details)
+
+
+def _import_frame(df, key_maps, mode=IMPORT_MODE_APPEND, periods=None):
+    """
+    Nhập một DataFrame đã chuẩn hoá vào cơ sở dữ liệu.
+    key_maps lưu các dict {khoá: id} của các bảng dimension để tái sử dụng giữa các lần gọi
+    (khoá đơn hàng được tra theo từng phần);
+    periods (nếu có) được bổ sung các (năm, tháng) có dữ liệu thay đổi.
+    Trả về thống kê số dòng đã thêm, cập nhật và bỏ qua.
+    """
+    report = {'rows': len(df), 'inserted': 0, 'updated': 0, 'skipped': 0, 'invalid': 0, 'orders': 0}
+
+    # 0. Chế độ incremental/upsert: chỉ xử lý phần chênh lệch so với dữ liệu hiện có
+    if mode != IMPORT_MODE_APPEND:
+        df['Row ID'] = df['Row ID'].astype('int64')
+        existing = _existing_details(df['Row ID'])
+        is_existing = df['Row ID'].isin(existing['row_id'])
+        if mode == IMPORT_MODE_UPSERT:
+            report['updated'] = _update_changed_measures(df[is_existing], existing, periods)
+        report['skipped'] = int(is_existing.sum()) - report['updated']
+        df = df[~is_existing].copy()
+        if df.empty:
+            return report
+
+    # 1. Region và Market
+    regions = df[['Region']].drop_duplicates()
+    region_ids = _resolve_keys(
+        key_maps, Region, ['name'], regions.rename(columns={'Region': 'name'}),
+        lambda row: Region(name=row['name'])
+    )
+    df['region_id'] = _map_keys(df, ['Region'], region_ids)
+
+    markets = df.drop_duplicates('Market')[['Market', 'region_id']].rename(columns={'Market': 'name'})
+    market_ids = _resolve_keys(
+        key_maps, Market, ['name'], markets,
+        lambda row: Market(name=row['name'], region_id=row['region_id'])
+    )
+    df['market_id'] = _map_keys(df, ['Market'], market_ids)
+
+    # 2. Country, State, City
+    countries = df.drop_duplicates('Country').rename(columns={'Country': 'name'})
+    has_coordinates = 'Country latitude' in df.columns and 'Country longitude' in df.columns
+    country_ids = _resolve_keys(
+        key_maps, Country, ['name'], countries,
+        lambda row: Country(
+            name=row['name'],
+            market_id=row['market_id'],
+            latitude=_coordinate(row['Country latitude']) if has_coordinates else None,
+            longitude=_coordinate(row['Country longitude']) if has_coordinates else None
+        )
+    )
+    df['country_id'] = _map_keys(df, ['Country'], country_ids)
+
+    states = df[df['State'] != ''][['State', 'country_id']].drop_duplicates()
+    states = states.rename(columns={'State': 'name'})
+    state_ids = _resolve_keys(
+        key_maps, State, ['name', 'country_id'], states,
+        lambda row: State(name=row['name'], country_id=row['country_id'])
+    )
+    df['state_id'] = _map_keys(df, ['State', 'country_id'], state_ids)
+
+    cities = df[(df['City'] != '') & df['state_id'].notna()][['City', 'state_id']].drop_duplicates()
+    cities = cities.rename(columns={'City': 'name'})
+    city_ids = _resolve_keys(
+        key_maps, City, ['name', 'state_id'], cities,
+        lambda row: City(name=row['name'], state_id=int(row['state_id']))
+    )
+    df['city_id'] = _map_keys(df, ['City', 'state_id'], city_ids)
+
+    # 3. Phân khúc khách hàng và khách hàng
+    segments = df[['Segment']].drop_duplicates().rename(columns={'Segment': 'name'})
+    segment_ids = _resolve_keys(
+        key_maps, CustomerSegment, ['name'], segments,
+        lambda row: CustomerSegment(name=row['name'])
+    )
+    df['segment_id'] = _map_keys(df, ['Segment'], segment_ids)
+
+    customers = df.drop_duplicates('Customer ID')[['Customer ID', 'segment_id']]
+    customers = customers.rename(columns={'Customer ID': 'customer_id'})
+    customer_ids = _resolve_keys(
+        key_maps, Customer, ['customer_id'], customers,
+        lambda row: Customer(customer_id=row['customer_id'], segment_id=row['segment_id'])
+    )
+    df['customer_pk'] = _map_keys(df, ['Customer ID'], customer_ids)
+
+    # 4. Danh mục, danh mục con và sản phẩm
+    categories = df[['Category']].drop_duplicates().rename(columns={'Category': 'name'})
+    category_ids = _resolve_keys(
+        key_maps, Category, ['name'], categories,
+        lambda row: Category(name=row['name'])
+    )
+    df['category_id'] = _map_keys(df, ['Category'], category_ids)
+
+    subcategories = df[['Subcategory', 'category_id']].drop_duplicates()
+    subcategories = subcategories.rename(columns={'Subcategory': 'name'})
+    subcategory_ids = _resolve_keys(
+        key_maps, Subcategory, ['name', 'category_id'], subcategories,
+        lambda row: Subcategory(name=row['name'], category_id=row['category_id'])
+    )
+    df['subcategory_id'] = _map_keys(df, ['Subcategory', 'category_id'], subcategory_ids)
+
+    products = df[['Product', 'subcategory_id']].drop_duplicates()
+    products = products.rename(columns={'Product': 'name'})
+    product_ids = _resolve_keys(
+        key_maps, Product, ['name', 'subcategory_id'], products,
+        lambda row: Product(name=row['name'], subcategory_id=row['subcategory_id'])
+    )
+    df['product_id'] = _map_keys(df, ['Product', 'subcategory_id'], product_ids)
+
+    # 5. Đơn hàng và chi tiết đơn hàng
+    # Bỏ qua các dòng không xác định được city hoặc product
+    lines = df[df['city_id'].notna() & df['product_id'].notna()].copy()
+    lines['order_date'] = pd.to_datetime(lines['Order Date']).dt.date
+    _add_periods(periods, lines['Order Date'])
+
+    orders = lines.drop_duplicates('Order ID')[['Order ID', 'order_date', 'customer_pk', 'city_id']]
+    orders = orders.rename(columns={'Order ID': 'order_id'})
+    order_ids = _resolve_keys(
+        key_maps, Order, ['order_id'], orders,
+        lambda row: Order(
+            order_id=row['order_id'],
+            order_date=row['order_date'],
+            **Order.date_parts(row['order_date']),
+            customer_id=row['customer_pk'],
+            city_id=int(row['city_id'])
+        ),
+        per_chunk=True
+    )
+    lines['order_pk'] = _map_keys(lines, ['Order ID'], order_ids)
+
+    details = lines[['Row ID', 'order_pk', 'product_id', 'Quantity', 'Sales', 'Discount', 'Profit']]
+    batch = []
+    for row_id, order_pk, product_id, quantity, sales, discount, profit in details.itertuples(index=False, name=None):
+        batch.append(OrderDetail(
+            row_id=int(row_id),
+            order_id=int(order_pk),
+            product_id=int(product_id),
+            quantity=int(quantity),
+            sales=float(sales),
+            discount=float(discount),
+            profit=float(profit)
+        ))
+        if len(batch) >= BATCH_SIZE:
+            OrderDetail.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        OrderDetail.objects.bulk_create(batch)
+
+    report['inserted'] = len(details)
+    report['orders'] = len(orders)
+    report['invalid'] = len(df) - len(details)
+    return report
+
+
+def _prepare_frame(df):
+    """Chuẩn hoá DataFrame đọc từ file: điền ô trống và ép các cột khoá về chuỗi"""
+    df = df.fillna('')
+    for column in KEY_COLUMNS:
+        df[column] = df[column].astype(str)
+    return df
+
+
+def _file_format(source):
+    """Xác định định dạng file dựa vào phần mở rộng"""
+    name = getattr(source, 'name', None) or str(source)
+    return os.path.splitext(name)[1].lower().lstrip('.')
+
+
+def check_file_format(source):
+    """Kiểm tra file có định dạng mà iter_data_chunks đọc được (ValueError nếu không)"""
+    file_format = _file_format(source)
+    if file_format not in IMPORT_FORMATS:
+        raise ValueError(
+            f"Định dạng file không được hỗ trợ: .{file_format} (chọn một trong "
+            f"{', '.join('.' + name for name in IMPORT_FORMATS)})"
+        )
+
+
+def _iter_xlsx_chunks(source, chunk_size):
+    """Đọc sheet đầu tiên bằng openpyxl ở chế độ read-only, mỗi lần chunk_size dòng"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        chunk = []
+        for row in rows:
+            # Bỏ qua các dòng trống ở cuối sheet
+            if all(value is None for value in row):
+                continue
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield pd.DataFrame(chunk, columns=header)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=header)
+    finally:
+        workbook.close()
+
+
+def _iter_parquet_chunks(source, chunk_size):
+    """Đọc file Parquet theo từng batch (cần pyarrow)"""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Cần cài đặt pyarrow để nhập file Parquet")
+
+    for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_size):
+        yield batch.to_pandas()
+
+
+def iter_data_chunks(source, chunk_size=CHUNK_SIZE):
+    """
+    Đọc file dữ liệu (xlsx, csv, parquet) thành các DataFrame có tối đa chunk_size dòng,
+    để bộ nhớ sử dụng không phụ thuộc vào kích thước file.
+    """
+    check_file_format(source)
+    file_format = _file_format(source)
+    if file_format in ('xlsx', 'xlsm'):
+        return _iter_xlsx_chunks(source, chunk_size)
+    if file_format == 'csv':
+        return pd.read_csv(source, chunksize=chunk_size)
+    if file_format == 'parquet':
+        return _iter_parquet_chunks(source, chunk_size)
+    # Định dạng .xls cũ không hỗ trợ đọc theo luồng
+    return iter([pd.read_excel(source)])
+
+
+def _finish_report(report, started):
+    """Bổ sung thời gian và tốc độ nhập vào báo cáo"""
+    report['seconds'] = round(time.perf_counter() - started, 3)
+    report['rows_per_second'] = round(report['rows'] / report['seconds']) if report['seconds'] else report['rows']
+    return report
+
+
+def count_data_rows(source):
+    """Ước lượng số dòng dữ liệu của file mà không đọc toàn bộ nội dung (None nếu không biết)"""
+    file_format = _file_format(source)
+    if file_format == 'csv':
+        count = 0
+        with open(source, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                count += block.count(b'\n')
+        return max(count - 1, 0)
+    if file_format in ('xlsx', 'xlsm'):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(source, read_only=True)
+        try:
+            max_row = workbook.worksheets[0].max_row
+        finally:
+            workbook.close()
+        return max_row - 1 if max_row else None
+    if file_format == 'parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            return None
+        return pq.ParquetFile(source).metadata.num_rows
+    return None
+
+
+def _check_mode(mode):
+    """Kiểm tra chế độ nhập hợp lệ"""
+    if mode not in IMPORT_MODES:
+        raise ValueError(f"Chế độ nhập không hợp lệ: {mode}")
+
+
+def _success_message(report):
+    """Thông báo kết quả nhập kèm số dòng và thời gian"""
+    return (
+        "Dữ liệu đã được nhập thành công! ({inserted} dòng mới, {updated} dòng cập nhật, "
+        "{skipped} dòng bỏ qua trong {seconds} giây)"
+    ).format(**report)
+
+
+def import_data_streaming(source, chunk_size=CHUNK_SIZE, progress=None, mode=IMPORT_MODE_APPEND):
+    """
+    Nhập dữ liệu theo từng phần: mỗi phần được xử lý và commit trong transaction riêng,
+    chỉ giữ lại các dict khoá của dimension giữa các phần (khoá đơn hàng được tra theo từng phần).
+    progress (nếu có) được gọi với báo cáo tạm thời sau mỗi phần.
+    Trả về (thành công, thông báo, báo cáo) trong đó báo cáo chứa số dòng và thời gian nhập.
+    """
+    started = time.perf_counter()
+    report = {'rows': 0, 'inserted': 0, 'updated': 0, 'skipped': 0, 'invalid': 0, 'orders': 0, 'chunks': 0}
+    key_maps = {}
+    periods = set()
     try:
-        # Đọc file Excel
-        df = pd.read_excel(excel_file)
-        
-        # Xử lý dữ liệu thiếu
-        df = df.fillna('')
-        
-        # Sử dụng transaction để đảm bảo tính nhất quán
-        with transaction.atomic():
-            # 1. Xử lý Region và Market
-            regions = {}
-            markets = {}
-            
-            for _, row in df.drop_duplicates(['Region', 'Market']).iterrows():
-                region_name = row['Region']
-                market_name = row['Market']
-                
-                # Tạo hoặc lấy đối tượng Region
-                if region_name not in regions:
-                    region, created = Region.objects.get_or_create(name=region_name)
-                    regions[region_name] = region
-                
-                # Tạo hoặc lấy đối tượng Market
-                if market_name not in markets:
-                    market, created = Market.objects.get_or_create(
-                        name=market_name,
-                        region=regions[region_name]
-                    )
-                    markets[market_name] = market
-            
-            # 2. Xử lý Country, State, City
-            countries = {}
-            states = {}
-            cities = {}
-            
-            for _, row in df.drop_duplicates(['Country', 'State', 'City']).iterrows():
-                country_name = row['Country']
-                state_name = row['State']
-                city_name = row['City']
-                market_name = row['Market']
-                
-                # Lấy giá trị vĩ độ và kinh độ
-                latitude = row['Country latitude'] if 'Country latitude' in row and row['Country latitude'] else None
-                longitude = row['Country longitude'] if 'Country longitude' in row and row['Country longitude'] else None
-                
-                # Tạo hoặc lấy đối tượng Country
-                country_key = country_name
-                if country_key not in countries:
-                    country, created = Country.objects.get_or_create(
-                        name=country_name,
-                        defaults={
-                            'market': markets[market_name],
-                            'latitude': latitude,
-                            'longitude': longitude
-                        }
-                    )
-                    countries[country_key] = country
-                
-                # Tạo hoặc lấy đối tượng State
-                state_key = f"{country_name}_{state_name}"
-                if state_key not in states and state_name:
-                    state, created = State.objects.get_or_create(
-                        name=state_name,
-                        country=countries[country_key]
-                    )
-                    states[state_key] = state
-                
-                # Tạo hoặc lấy đối tượng City
-                city_key = f"{country_name}_{state_name}_{city_name}"
-                if city_key not in cities and city_name and state_name:
-                    city, created = City.objects.get_or_create(
-                        name=city_name,
-                        state=states[state_key]
-                    )
-                    cities[city_key] = city
-            
-            # 3. Xử lý phân khúc khách hàng và khách hàng
-            segments = {}
-            customers = {}
-            
-            for _, row in df.drop_duplicates(['Customer ID', 'Segment']).iterrows():
-                segment_name = row['Segment']
-                customer_id = row['Customer ID']
-                
-                # Tạo hoặc lấy đối tượng CustomerSegment
-                if segment_name not in segments:
-                    segment, created = CustomerSegment.objects.get_or_create(name=segment_name)
-                    segments[segment_name] = segment
-                
-                # Tạo hoặc lấy đối tượng Customer
-                if customer_id not in customers:
-                    customer, created = Customer.objects.get_or_create(
-                        customer_id=customer_id,
-                        defaults={
-                            'segment': segments[segment_name]
-                        }
-                    )
-                    customers[customer_id] = customer
-            
-            # 4. Xử lý danh mục, danh mục con và sản phẩm
-            categories = {}
-            subcategories = {}
-            products = {}
-            
-            for _, row in df.drop_duplicates(['Category', 'Subcategory', 'Product']).iterrows():
-                category_name = row['Category']
-                subcategory_name = row['Subcategory']
-                product_name = row['Product']
-                
-                # Tạo hoặc lấy đối tượng Category
-                if category_name not in categories:
-                    category, created = Category.objects.get_or_create(name=category_name)
-                    categories[category_name] = category
-                
-                # Tạo hoặc lấy đối tượng Subcategory
-                subcategory_key = f"{category_name}_{subcategory_name}"
-                if subcategory_key not in subcategories:
-                    subcategory, created = Subcategory.objects.get_or_create(
-                        name=subcategory_name,
-                        category=categories[category_name]
-                    )
-                    subcategories[subcategory_key] = subcategory
-                
-                # Tạo hoặc lấy đối tượng Product
-                product_key = f"{category_name}_{subcategory_name}_{product_name}"
-                if product_key not in products:
-                    product, created = Product.objects.get_or_create(
-                        name=product_name,
-                        subcategory=subcategories[subcategory_key]
-                    )
-                    products[product_key] = product
-            
-            # 5. Xử lý đơn hàng và chi tiết đơn hàng
-            orders = {}
-            
-            for _, row in df.iterrows():
-                row_id = row['Row ID']
-                order_id = row['Order ID']
-                order_date = pd.to_datetime(row['Order Date']).date()
-                customer_id = row['Customer ID']
-                city_name = row['City']
-                state_name = row['State']
-                country_name = row['Country']
-                product_name = row['Product']
-                subcategory_name = row['Subcategory']
-                category_name = row['Category']
-                
-                # Tạo keys
-                city_key = f"{country_name}_{state_name}_{city_name}"
-                product_key = f"{category_name}_{subcategory_name}_{product_name}"
-                
-                # Lấy city và product
-                city = cities.get(city_key)
-                product = products.get(product_key)
-                
-                # Nếu không tìm thấy city hoặc product, bỏ qua record này
-                if not city or not product:
-                    continue
-                
-                # Tạo hoặc lấy đối tượng Order
-                if order_id not in orders:
-                    order, created = Order.objects.get_or_create(
-                        order_id=order_id,
-                        defaults={
-                            'order_date': order_date,
-                            'customer': customers[customer_id],
-                            'city': city
-                        }
-                    )
-                    orders[order_id] = order
-                
-                # Tạo đối tượng OrderDetail
-                OrderDetail.objects.create(
-                    row_id=row_id,
-                    order=orders[order_id],
-                    product=product,
-                    quantity=int(row['Quantity']),
-                    sales=float(row['Sales']),
-                    discount=float(row['Discount']),
-                    profit=float(row['Profit'])
-                )
-                
-        return True, "Dữ liệu đã được nhập thành công!"
+        _check_mode(mode)
+        for chunk in iter_data_chunks(source, chunk_size):
+            with transaction.atomic():
+                chunk_report = _import_frame(_prepare_frame(chunk), key_maps, mode, periods)
+            for key, value in chunk_report.items():
+                report[key] += value
+            report['chunks'] += 1
+            if progress:
+                progress(report)
+
+        _refresh_derived_data(periods)
+        _finish_report(report, started)
+        return True, _success_message(report), report
     except Exception as e:
-        return False, f"Lỗi khi nhập dữ liệu: {str(e)}"
\ No newline at end of file
+        message = f"Lỗi khi nhập dữ liệu (phần {report['chunks'] + 1}): {str(e)}"
+        # Các phần trước đó đã được commit: vẫn cập nhật dữ liệu tổng hợp cho chúng
+        try:
+            _refresh_derived_data(periods)
+        except Exception as refresh_error:
+            logger.exception("Lỗi khi cập nhật các bảng dẫn xuất sau lần nhập lỗi")
+            report['refresh_error'] = str(refresh_error)
+            message += f"; dữ liệu tổng hợp chưa được cập nhật: {str(refresh_error)}"
+        _finish_report(report, started)
+        return False, message, report
+
@@ -6,20 +6,26 @@ from django.shortcuts import render
 import json
 from django.shortcuts import render, redirect
 from django.http import JsonResponse
-from django.db.models import Sum, Count, Avg, F, Q
-from django.db.models.functions import ExtractYear, ExtractMonth, ExtractWeekDay
-from .models import (
-    Region, Market, Country, State, City,
-    CustomerSegment, Customer, Category, 
-    Subcategory, Product, Order, OrderDetail
+from django.views.decorators.csrf import csrf_exempt
+from django.shortcuts import get_object_or_404
+from .models import Market, CustomerSegment, Category, Subcategory, ImportJob, SalesRollup
+from .cache import cache_stats, cached_api, conditional_api
+from .cohorts import cohort_matrix
+from .jobs import job_status, submit_import
+from .perf import perf_summary
+from .rfm import rfm_breakdown, rfm_distribution, rfm_top_customers
+from .export import export_response
+from .engines import abuild_payload, build_payload, build_widgets, get_engine, round_decimals
+from .serialization import api_response
+from .timeseries import timeseries
+from .queries import (
+    DEFAULT_TOP_N, DIMENSIONS, MAX_TOP_N, METRICS, apply_filters, parse_int, parse_limit, top_n_per_group
 )
-from .utils import import_excel_data
 
 def overview(request):
     """Hiển thị trang tổng quan"""
     # Lấy danh sách năm để hiển thị trong bộ lọc
-    years = OrderDetail.objects.annotate(year=ExtractYear('order__order_date'))\
-        .values('year').distinct().order_by('year')
+    years = SalesRollup.objects.values('year').distinct().order_by('year')
     
     context = {
         'years': years,
@@ -63,272 +69,229 @@ def product(request):
     return render(request, 'dashboard/product.html', context)
 
 def import_excel(request):
-    """Xử lý nhập dữ liệu từ file Excel"""
+    """Xử lý nhập dữ liệu từ file Excel: lưu file và tạo job chạy nền"""
     if request.method == 'POST' and request.FILES.get('excel_file'):
-        excel_file = request.FILES['excel_file']
-        success, message = import_excel_data(excel_file)
-        if success:
-            return redirect('overview')
-        else:
-            # Xử lý lỗi
-            return render(request, 'dashboard/import.html', {'error': message})
-    else:
-        return render(request, 'dashboard/import.html', {'title': 'Nhập dữ liệu'})
+        mode = request.POST.get('mode', 'append')
+        try:
+            if mode not in dict(ImportJob.MODE_CHOICES):
+                raise ValueError(f"Chế độ nhập không hợp lệ: {mode}")
+            job = submit_import(request.FILES['excel_file'], mode)
+        except ValueError as e:
+            return render(request, 'dashboard/import.html', {
+                'title': 'Nhập dữ liệu',
+                'modes': ImportJob.MODE_CHOICES,
+                'error': str(e)
+            })
+        return redirect(f"{request.path}?job={job.id}")
+
+    context = {'title': 'Nhập dữ liệu', 'modes': ImportJob.MODE_CHOICES}
+    job_id = parse_int(request.GET.get('job'))
+    if job_id is not None:
+        context['job'] = ImportJob.objects.filter(id=job_id).first()
+    return render(request, 'dashboard/import.html', context)
+
+def import_status(request, job_id):
+    """API endpoint cho tiến độ của một job nhập dữ liệu"""
+    job = get_object_or_404(ImportJob, id=job_id)
+    return JsonResponse(job_status(job))
 
+@conditional_api
+@cached_api
 def overview_data(request):
     """API endpoint cho dữ liệu tổng quan"""
-    # KPIs tổng hợp
-    total_sales = OrderDetail.objects.aggregate(total=Sum('sales'))['total'] or 0
-    total_profit = OrderDetail.objects.aggregate(total=Sum('profit'))['total'] or 0
-    total_quantity = OrderDetail.objects.aggregate(total=Sum('quantity'))['total'] or 0
-    
-    # Các tham số lọc
-    year = request.GET.get('year')
-    month = request.GET.get('month')
-    quarter = request.GET.get('quarter')
-    
-    # Áp dụng bộ lọc nếu có
-    queryset = OrderDetail.objects.all()
-    if year:
-        queryset = queryset.filter(order__order_date__year=year)
-    if month:
-        queryset = queryset.filter(order__order_date__month=month)
-    if quarter:
-        months = []
-        if quarter == '1':
-            months = [1, 2, 3]
-        elif quarter == '2':
-            months = [4, 5, 6]
-        elif quarter == '3':
-            months = [7, 8, 9]
-        elif quarter == '4':
-            months = [10, 11, 12]
-        queryset = queryset.filter(order__order_date__month__in=months)
-    
-    # Doanh số theo thị trường
-    sales_by_market = list(queryset.values('order__city__state__country__market__name')
-                          .annotate(total_sales=Sum('sales'))
-                          .order_by('-total_sales'))
-    
-    # Số lượng theo năm
-    quantity_by_year = list(queryset.annotate(year=ExtractYear('order__order_date'))
-                           .values('year')
-                           .annotate(total_quantity=Sum('quantity'))
-                           .order_by('year'))
-    
-    # Lợi nhuận theo danh mục
-    profit_by_category = list(queryset.values('product__subcategory__category__name')
-                             .annotate(total_profit=Sum('profit'))
-                             .order_by('-total_profit'))
-    
-    # Doanh số theo phân khúc khách hàng
-    sales_by_segment = list(queryset.values('order__customer__segment__name')
-                           .annotate(total_sales=Sum('sales'))
-                           .order_by('-total_sales'))
-    
-    # Phân phối số lượng đơn hàng
-    order_quantity_distribution = list(queryset.values('quantity')
-                                     .annotate(count=Count('id'))
-                                     .order_by('quantity'))
-    
-    data = {
-        'kpi': {
-            'total_sales': float(total_sales),
-            'total_profit': float(total_profit),
-            'total_quantity': total_quantity
-        },
-        'sales_by_market': sales_by_market,
-        'quantity_by_year': quantity_by_year,
-        'profit_by_category': profit_by_category,
-        'sales_by_segment': sales_by_segment,
-        'order_quantity_distribution': order_quantity_distribution
-    }
-    
-    return JsonResponse(data)
+    return api_response(request, build_payload('overview', request.GET))
 
+@conditional_api
+@cached_api
 def market_data(request):
     """API endpoint cho dữ liệu thị trường"""
-    # Tham số lọc
-    market_id = request.GET.get('market_id')
-    
-    # Base queryset
-    queryset = OrderDetail.objects.all()
-    
-    # Áp dụng bộ lọc nếu có
-    if market_id:
-        queryset = queryset.filter(order__city__state__country__market_id=market_id)
-    
-    # Doanh số theo thị trường
-    sales_by_market = list(queryset.values('order__city__state__country__market__name')
-                          .annotate(total_sales=Sum('sales'))
-                          .order_by('-total_sales'))
-    
-    # Top 5 sản phẩm bán chạy nhất ở mỗi thị trường
-    markets = Market.objects.all()
-    top_products_by_market = {}
-    
-    for market in markets:
-        top_products = list(queryset.filter(order__city__state__country__market=market)
-                          .values('product__name')
-                          .annotate(total_sales=Sum('sales'))
-                          .order_by('-total_sales')[:5])
-        top_products_by_market[market.name] = top_products
-    
-    # Lợi nhuận theo vùng và thị trường
-    profit_by_region_market = list(queryset.values(
-                                 'order__city__state__country__market__region__name', 
-                                 'order__city__state__country__market__name')
-                                .annotate(total_profit=Sum('profit'))
-                                .order_by('order__city__state__country__market__region__name', '-total_profit'))
-    
-    data = {
-        'sales_by_market': sales_by_market,
-        'top_products_by_market': top_products_by_market,
-        'profit_by_region_market': profit_by_region_market
-    }
-    
-    return JsonResponse(data)
+    return api_response(request, build_payload('market', request.GET))
 
+@conditional_api
+@cached_api
 def customer_data(request):
     """API endpoint cho dữ liệu khách hàng"""
-    # Tham số lọc
-    segment_id = request.GET.get('segment_id')
-    
-    # Base queryset
-    queryset = OrderDetail.objects.all()
-    
-    # Áp dụng bộ lọc nếu có
-    if segment_id:
-        queryset = queryset.filter(order__customer__segment_id=segment_id)
-    
-    # Tổng số khách hàng
-    total_customers = Customer.objects.count()
-    if segment_id:
-        total_customers = Customer.objects.filter(segment_id=segment_id).count()
-    
-    # Giá trị đơn hàng trung bình
-    # Giá trị đơn hàng trung bình (AOV) - công thức mới
-    aov = queryset.values('order__order_id') \
-        .annotate(order_total=Sum('sales')) \
-        .aggregate(avg=Avg('order_total'))['avg'] or 0    
-        
-    # Doanh thu trung bình mỗi khách hàng
-    revenue_per_customer = queryset.values('order__customer') \
-        .annotate(total_revenue=Sum('sales')) \
-        .aggregate(avg_revenue=Avg('total_revenue'))['avg_revenue'] or 0
-    
-    # Khách hàng theo phân khúc
-    customers_by_segment = list(Customer.objects.values('segment__name')
-                               .annotate(count=Count('id'))
-                               .order_by('-count'))
-    
-    # Phân phối tần suất mua hàng
-    orders_per_customer = queryset.values('order__customer__customer_id') \
-        .annotate(order_count=Count('order__order_id', distinct=True)) \
-        .values_list('order_count', flat=True)
-    
-    # Tạo histogram từ dữ liệu
-    purchase_frequency_counts = {}
-    for count in orders_per_customer:
-        if count not in purchase_frequency_counts:
-            purchase_frequency_counts[count] = 0
-        purchase_frequency_counts[count] += 1
-    
-    # Chuyển đổi sang định dạng list cho API
-    purchase_frequency = [
-        {"order_count": order_count, "customer_count": count} 
-        for order_count, count in purchase_frequency_counts.items()
-    ]
-    
-    # Sắp xếp theo số lượng đơn hàng
-    purchase_frequency.sort(key=lambda x: x["order_count"])
-    
-    # Top 10 khách hàng theo doanh số
-    top_customers = list(queryset.values('order__customer__customer_id')
-                        .annotate(
-                            total_sales=Sum('sales'),
-                            total_profit=Sum('profit'),
-                            profit_margin=Sum('profit') * 100 / Sum('sales')
-                        )
-                        .order_by('-total_sales')[:10])
-    
-    data = {
-        'kpi': {
-            'total_customers': total_customers,
-            'aov': float(aov),
-            'revenue_per_customer': float(revenue_per_customer)
-        },
-        'customers_by_segment': customers_by_segment,
-        'purchase_frequency': purchase_frequency,
-        'top_customers': top_customers
-    }
-    
-    return JsonResponse(data)
+    return api_response(request, build_payload('customer', request.GET))
 
+@conditional_api
+@cached_api
 def product_data(request):
-    """API endpoint cho dữ liệu sản phẩm"""
-    # Các tham số lọc
-    category_id = request.GET.get('category_id')
-    subcategory_id = request.GET.get('subcategory_id')
-    product_id = request.GET.get('product_id')
-    
-    # Base queryset
-    queryset = OrderDetail.objects.all()
-    
-    # Áp dụng bộ lọc nếu có
-    if category_id:
-        queryset = queryset.filter(product__subcategory__category_id=category_id)
-    if subcategory_id:
-        queryset = queryset.filter(product__subcategory_id=subcategory_id)
-    if product_id:
-        queryset = queryset.filter(product_id=product_id)
-    
-    # Doanh số, lợi nhuận và % tỷ lệ lợi nhuận theo danh mục, danh mục con, sản phẩm
-    product_metrics = list(queryset.values(
-            'product__subcategory__category__name', 
-            'product__subcategory__name', 
-            'product__name'
-        )
-        .annotate(
-            total_sales=Sum('sales'),
-            total_profit=Sum('profit'),
-            profit_margin=Sum('profit') * 100 / Sum('sales')
-        )
-        .order_by('-total_sales'))
-    
-    # Giảm giá trung bình và tỷ lệ lợi nhuận theo danh mục sản phẩm
-    category_metrics = list(queryset.values('product__subcategory__category__name')
-                          .annotate(
-                              avg_discount=Avg('discount') * 100,
-                              avg_profit_margin=Sum('profit') * 100 / Sum('sales')
-                          )
-                          .order_by('product__subcategory__category__name'))
-    
-    # Doanh số cao điểm theo tháng
-    peak_sales_by_month = list(queryset.annotate(month=ExtractMonth('order__order_date'))
-                              .values('month')
-                              .annotate(total_sales=Sum('sales'))
-                              .order_by('-total_sales'))
-    
-    # Doanh số cao điểm theo ngày trong tuần
-    peak_sales_by_day = list(queryset.annotate(day=ExtractWeekDay('order__order_date'))
-                            .values('day')
-                            .annotate(total_sales=Sum('sales'))
-                            .order_by('-total_sales'))
-    # Doanh số theo tháng và ngày trong tuần (cho heatmap)
-    sales_by_month_day = list(queryset.annotate(
-            month=ExtractMonth('order__order_date'),
-            day=ExtractWeekDay('order__order_date')
-        ).values('month', 'day')
-        .annotate(total_sales=Sum('sales'))
-        .order_by('month', 'day'))
-    
+    """API endpoint cho dữ liệu sản phẩm (product_metrics chỉ gồm trang đầu, xem product_metrics_data)"""
+    try:
+        return api_response(request, build_payload('product', request.GET))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+# Bản async (ASGI) của các API trang: các widget độc lập của trang chạy đồng thời
+# trên các luồng có kết nối DB riêng, độ trễ gần với truy vấn chậm nhất thay vì tổng
+@conditional_api
+@cached_api
+async def overview_data_async(request):
+    """API endpoint async cho dữ liệu tổng quan"""
+    return api_response(request, await abuild_payload('overview', request.GET))
+
+@conditional_api
+@cached_api
+async def market_data_async(request):
+    """API endpoint async cho dữ liệu thị trường"""
+    return api_response(request, await abuild_payload('market', request.GET))
+
+@conditional_api
+@cached_api
+async def customer_data_async(request):
+    """API endpoint async cho dữ liệu khách hàng"""
+    return api_response(request, await abuild_payload('customer', request.GET))
+
+@conditional_api
+@cached_api
+async def product_data_async(request):
+    """API endpoint async cho dữ liệu sản phẩm"""
+    try:
+        return api_response(request, await abuild_payload('product', request.GET))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+@conditional_api
+@cached_api
+def product_metrics_data(request):
+    """
+    API endpoint cho danh sách chỉ số sản phẩm có phân trang theo con trỏ
+    (vd. ?sort=margin&order=asc&limit=50&q=chair&fields=product,sales,margin),
+    trang sau lấy bằng ?cursor=<next_cursor> cùng các tham số còn lại.
+    """
+    try:
+        return api_response(request, build_widgets(['product_metrics_page'], request.GET)['product_metrics_page'])
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+@csrf_exempt
+@conditional_api
+@cached_api
+def widgets_data(request):
+    """
+    API batch: chỉ tính các widget được chọn, với bộ lọc chung, trong một request
+    (truy vấn con dùng chung chỉ chạy một lần).
+    GET ?widgets=sales_by_market,top_customers&year=2014 (có cache), hoặc
+    POST JSON {"widgets": ["sales_by_market", "top_customers"], "filters": {"year": 2014}}.
+    Mỗi widget chỉ dùng những tham số lọc nó hỗ trợ.
+    """
+    if request.method == 'POST':
+        try:
+            body = json.loads(request.body or b'{}')
+            widgets = body.get('widgets') or []
+            params = {name: str(value) for name, value in (body.get('filters') or {}).items()}
+        except (ValueError, TypeError, AttributeError):
+            return JsonResponse({'error': 'Body JSON không hợp lệ'}, status=400)
+        if not isinstance(widgets, list) or not all(isinstance(widget, str) for widget in widgets):
+            return JsonResponse({
+                'error': 'widgets phải là danh sách (JSON array) tên widget',
+                'widgets': sorted(get_engine().WIDGETS)
+            }, status=400)
+    else:
+        widgets = [widget.strip() for widget in request.GET.get('widgets', '').split(',') if widget.strip()]
+        params = request.GET
+
+    if not widgets:
+        return JsonResponse({
+            'error': 'Cần danh sách widget',
+            'widgets': sorted(get_engine().WIDGETS)
+        }, status=400)
+    try:
+        return api_response(request, build_widgets(widgets, params))
+    except ValueError as e:
+        return JsonResponse({'error': str(e), 'widgets': sorted(get_engine().WIDGETS)}, status=400)
+
+@conditional_api
+@cached_api
+def top_n_data(request):
+    """
+    API endpoint cho top N phần tử theo nhóm, dùng được cho mọi cặp chiều
+    (vd. ?group=region&item=product&n=10&metric=profit), có hỗ trợ các tham số lọc chung.
+    """
+    group = request.GET.get('group', 'market')
+    item = request.GET.get('item', 'product')
+    metric = request.GET.get('metric', 'sales')
+    if group not in DIMENSIONS or item not in DIMENSIONS or group == item or metric not in METRICS:
+        return JsonResponse({
+            'error': 'Tham số không hợp lệ',
+            'dimensions': list(DIMENSIONS),
+            'metrics': METRICS
+        }, status=400)
+    n = parse_limit(request.GET.get('n'), DEFAULT_TOP_N, MAX_TOP_N)
+
+    queryset = apply_filters(SalesRollup.objects.all(), request.GET)
     data = {
-        'product_metrics': product_metrics,
-        'category_metrics': category_metrics,
-        'peak_sales_by_month': peak_sales_by_month,
-        'peak_sales_by_day': peak_sales_by_day,
-        'sales_by_month_day': sales_by_month_day  
-        }
-    
-    return JsonResponse(data)
\ No newline at end of file
+        'group': group,
+        'item': item,
+        'metric': metric,
+        'n': n,
+        'results': top_n_per_group(queryset, DIMENSIONS[group], DIMENSIONS[item], n,
+                                   metric=metric, item_key='name', value_key=f'total_{metric}')
+    }
+    return api_response(request, round_decimals(data))
+
+@conditional_api
+@cached_api
+def timeseries_data(request):
+    """
+    API endpoint cho chuỗi thời gian liên tục theo khoảng ngày bất kỳ, có hỗ trợ các tham số lọc chung
+    (vd. ?start=2014-01-01&end=2014-03-31&granularity=week&measures=sales,profit,orders&market_id=1).
+    """
+    try:
+        return api_response(request, round_decimals(timeseries(request.GET)))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+@conditional_api
+@cached_api
+def cohort_data(request):
+    """API endpoint cho ma trận retention theo cohort khách hàng (tính sẵn khi nhập), lọc theo ?segment_id="""
+    return api_response(request, round_decimals(cohort_matrix(request.GET)))
+
+@conditional_api
+@cached_api
+def rfm_top_customers_data(request):
+    """
+    API endpoint cho top N khách hàng theo điểm RFM tính sẵn khi nhập
+    (vd. ?n=20&order=score&rfm_segment=champions&segment_id=1)
+    """
+    try:
+        return api_response(request, rfm_top_customers(request.GET))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+@conditional_api
+@cached_api
+def rfm_distribution_data(request):
+    """API endpoint cho phân bố số khách hàng theo điểm R, F, M, lọc theo ?segment_id=&rfm_segment="""
+    try:
+        return api_response(request, rfm_distribution(request.GET))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+@conditional_api
+@cached_api
+def rfm_breakdown_data(request):
+    """API endpoint cho số khách và doanh số theo phân khúc x nhóm RFM, lọc theo ?segment_id=&rfm_segment="""
+    try:
+        return api_response(request, round_decimals(rfm_breakdown(request.GET)))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+def export_data(request):
+    """
+    Xuất các dòng đơn hàng (kèm tên dimension) theo cùng bộ lọc với các trang dashboard,
+    gửi dần dạng stream: ?format=csv|xlsx|parquet&year=2014&market_id=1...
+    """
+    try:
+        return export_response(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+def cache_stats_data(request):
+    """API endpoint cho thống kê hit/miss của cache các API dữ liệu"""
+    return JsonResponse(cache_stats())
+
+def perf_data(request):
+    """API endpoint cho số liệu hiệu năng theo view (phân vị thời gian, số truy vấn, truy vấn chậm nhất)"""
+    return JsonResponse(perf_summary(request.GET.get('view')))
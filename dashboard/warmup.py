@@ -0,0 +1,144 @@
+# dashboard/warmup.py
+
+import itertools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.pool import ThreadPool
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.http import JsonResponse, QueryDict
+
+from .cache import cache_key, get_cache, get_data_version
+from .engines import build_payload
+from .models import Category, CustomerSegment, Market, SalesRollup, Subcategory
+
+logger = logging.getLogger(__name__)
+
+# Trang -> tên view của API dữ liệu (tên endpoint trong khoá cache của cached_api)
+PAGE_ENDPOINTS = {
+    'overview': 'overview_data',
+    'market': 'market_data',
+    'customer': 'customer_data',
+    'product': 'product_data',
+}
+
+# Tham số cố định JS luôn gửi kèm (static/js/product.js chỉ lấy trang đầu 10 sản phẩm)
+BASE_PARAMS = {
+    'product': {'limit': 10},
+}
+
+# Một worker lên lịch: mỗi lần nhập chỉ làm nóng một lượt, các lượt nối tiếp nhau
+_scheduler = ThreadPoolExecutor(max_workers=1, thread_name_prefix='cache-warm')
+
+
+def _optional(values):
+    """Giá trị rỗng (không lọc) và mọi giá trị của một bộ lọc"""
+    return [None, *values]
+
+
+def filter_combinations(pages=None):
+    """
+    Mọi tổ hợp bộ lọc mà giao diện có thể gửi, theo trang: (trang, dict tham số).
+    - overview: năm x quý x tháng (mỗi bộ lọc có thể để trống)
+    - market: từng thị trường; customer: từng phân khúc
+    - product: từng danh mục, từng danh mục con, và danh mục kèm danh mục con của nó
+    """
+    pages = pages or list(PAGE_ENDPOINTS)
+    options = {}
+    if 'overview' in pages:
+        years = SalesRollup.objects.values_list('year', flat=True).distinct().order_by('year')
+        options['overview'] = [
+            {'year': year, 'quarter': quarter, 'month': month}
+            for year, quarter, month in itertools.product(
+                _optional(years), _optional(range(1, 5)), _optional(range(1, 13))
+            )
+        ]
+    if 'market' in pages:
+        options['market'] = [
+            {'market_id': market_id}
+            for market_id in _optional(Market.objects.order_by('id').values_list('id', flat=True))
+        ]
+    if 'customer' in pages:
+        options['customer'] = [
+            {'segment_id': segment_id}
+            for segment_id in _optional(CustomerSegment.objects.order_by('id').values_list('id', flat=True))
+        ]
+    if 'product' in pages:
+        subcategories = list(Subcategory.objects.order_by('id').values_list('category_id', 'id'))
+        options['product'] = [
+            {},
+            *({'category_id': category_id} for category_id in Category.objects.order_by('id').values_list('id', flat=True)),
+            *({'subcategory_id': subcategory_id} for _, subcategory_id in subcategories),
+            *({'category_id': category_id, 'subcategory_id': subcategory_id}
+              for category_id, subcategory_id in subcategories),
+        ]
+
+    for page in pages:
+        for params in options[page]:
+            params = {**BASE_PARAMS.get(page, {}), **params}
+            yield page, QueryDict(urlencode({name: value for name, value in params.items() if value is not None}))
+
+
+def _warm_one(page, params, version, force):
+    """Tính và lưu JSON của một tổ hợp (giống hệt nội dung cached_api lưu); False nếu đã có sẵn"""
+    try:
+        cache = get_cache()
+        key = cache_key(PAGE_ENDPOINTS[page], params, version)
+        if not force and cache.get(key) is not None:
+            return False
+        # Các tổ hợp đã chạy song song trên pool làm nóng nên widget được tính tuần tự
+        content = JsonResponse(build_payload(page, params, workers=1)).content
+        cache.set(key, content, getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', None))
+        return True
+    finally:
+        connections.close_all()
+
+
+def warm_cache(pages=None, workers=None, force=False, log=None):
+    """
+    Tính trước JSON của mọi tổ hợp bộ lọc (filter_combinations) cho phiên bản dữ liệu hiện tại
+    và lưu vào cache của dashboard, trên một pool DASHBOARD_WARM_WORKERS luồng.
+    Dừng sớm nếu dữ liệu được nhập lại trong lúc chạy (các khoá đã thuộc phiên bản cũ).
+    """
+    log = log or (lambda message: None)
+    started = time.perf_counter()
+    version = get_data_version()
+    combinations = list(filter_combinations(pages))
+    workers = workers or getattr(settings, 'DASHBOARD_WARM_WORKERS', 2)
+    result = {'version': version, 'combinations': len(combinations), 'warmed': 0, 'skipped': 0, 'stale': False}
+
+    # ThreadPool (không phải ThreadPoolExecutor) để vẫn chạy được khi tiến trình nhập dữ liệu
+    # ngắn hạn đã kết thúc luồng chính và luồng nền đang hoàn tất
+    with ThreadPool(processes=max(workers, 1)) as pool:
+        tasks = pool.imap_unordered(lambda item: _warm_one(*item, version, force), combinations)
+        for done, warmed in enumerate(tasks, 1):
+            result['warmed' if warmed else 'skipped'] += 1
+            if done % 50 == 0:
+                log(f"  {done}/{len(combinations)} tổ hợp")
+                if get_data_version() != version:
+                    result['stale'] = True
+                    break
+
+    result['seconds'] = round(time.perf_counter() - started, 2)
+    return result
+
+
+def _warm_in_background():
+    """Làm nóng cache trên luồng nền sau khi nhập, lỗi chỉ được ghi log"""
+    close_old_connections()
+    try:
+        result = warm_cache()
+        logger.info("Đã làm nóng cache: %s", result)
+    except Exception:
+        logger.exception("Lỗi khi làm nóng cache")
+    finally:
+        close_old_connections()
+
+
+def schedule_warmup():
+    """Xếp lịch làm nóng cache (sau khi một lần nhập được commit), nếu được bật"""
+    if getattr(settings, 'DASHBOARD_CACHE_ENABLED', True) and getattr(settings, 'DASHBOARD_WARM_ON_IMPORT', True):
+        _scheduler.submit(_warm_in_background)
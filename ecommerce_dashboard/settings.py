@@ -42,6 +42,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'dashboard.middleware.PerformanceMiddleware',
+    'dashboard.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -75,13 +77,97 @@ WSGI_APPLICATION = 'ecommerce_dashboard.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# SQLite production profile: WAL journaling lets readers run while an import writes.
+# 'readonly' opens the same file read-only and serves every read made outside a write
+# transaction (see dashboard.database.ReadWriteRouter), so dashboards stay responsive
+# during long imports. Connections are kept open between requests; set CONN_MAX_AGE
+# to 0 when serving through ASGI.
+SQLITE_PATH = BASE_DIR / 'db.sqlite3'
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'NAME': SQLITE_PATH,
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Seconds a writer waits for the lock before "database is locked"
+            'timeout': 20,
+        },
+    },
+    'readonly': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f'{SQLITE_PATH.as_uri()}?mode=ro',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+DATABASE_ROUTERS = ['dashboard.database.ReadWriteRouter']
+DASHBOARD_READ_DATABASE = 'readonly'
+
+# Pragmas applied to every new SQLite connection (journal_mode only on writable ones)
+DASHBOARD_SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',  # safe with WAL, fsync only at checkpoints
+    'cache_size': -64000,  # KiB (negative), i.e. ~64 MB page cache per connection
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'memory',
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# The 'dashboard' cache stores the JSON payloads of the /api/*-data/ endpoints.
+# A file-based backend is shared by all worker processes, so an import in one
+# process invalidates the cached payloads for every process.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'dashboard': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache' / 'dashboard',
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
 }
 
+DASHBOARD_CACHE_ALIAS = 'dashboard'
+DASHBOARD_CACHE_ENABLED = True
+# Entries stay valid until the next import bumps the data version
+DASHBOARD_CACHE_TIMEOUT = None
+# Precompute every filter combination's JSON into the cache after each import
+# (also available at deploy time via `manage.py warm_cache`)
+DASHBOARD_WARM_ON_IMPORT = True
+DASHBOARD_WARM_WORKERS = 2
+
+# Backend computing the /api/*-data/ payloads: 'orm' (SQL on the rollup tables)
+# or 'columnar' (NumPy arrays of SalesFact held in memory, reloaded after each import)
+DASHBOARD_ENGINE = 'orm'
+# Widgets of a sync page view are computed one after another on the request thread (1);
+# > 1 computes independent widgets concurrently on the shared widget pool
+DASHBOARD_WIDGET_WORKERS = 1
+# Threads of the long-lived widget pool used by the async views (and by sync views when
+# DASHBOARD_WIDGET_WORKERS > 1); each thread keeps its DB connections between requests
+DASHBOARD_WIDGET_POOL_SIZE = 4
+
+# Per-request instrumentation (query count, DB/Python time, Server-Timing header),
+# summarised per view at /api/perf/. Lower the sample rate (e.g. 0.05) under heavy load.
+DASHBOARD_PERF_ENABLED = True
+DASHBOARD_PERF_SAMPLE_RATE = 1.0
+# Number of most recent samples kept per view for the rolling percentiles
+DASHBOARD_PERF_WINDOW = 1000
+
+# Compress JSON responses of at least this many bytes (brotli when installed and
+# accepted by the client, otherwise gzip)
+DASHBOARD_COMPRESSION_ENABLED = True
+DASHBOARD_COMPRESSION_MIN_BYTES = 1024
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -122,6 +208,16 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static'),
 ]
 
+# Uploaded files and background import jobs
+
+MEDIA_ROOT = BASE_DIR / 'media'
+IMPORT_UPLOAD_DIR = MEDIA_ROOT / 'imports'
+
+# Number of in-process import workers; keep 1 with SQLite (single writer).
+# Set IMPORT_JOBS_IN_PROCESS = False to run jobs with `manage.py process_import_jobs` instead.
+IMPORT_WORKERS = 1
+IMPORT_JOBS_IN_PROCESS = True
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
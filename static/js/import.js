@@ -0,0 +1,62 @@
+// static/js/import.js
+
+// Poll the import job status endpoint and update the progress card
+const POLL_INTERVAL_MS = 1000;
+
+const formatSeconds = (seconds) => {
+    if (seconds === null || seconds === undefined) return '-';
+    if (seconds >= 60) {
+        return Math.floor(seconds / 60) + 'm ' + Math.round(seconds % 60) + 's';
+    }
+    return Math.round(seconds) + 's';
+};
+
+const updateProgress = (status) => {
+    const bar = document.getElementById('import-progress-bar');
+    const text = document.getElementById('import-progress-text');
+
+    const percent = status.percent !== null ? status.percent : 0;
+    bar.style.width = percent + '%';
+    bar.textContent = status.percent !== null ? percent + '%' : '';
+
+    const total = status.total_rows ? ' / ' + status.total_rows.toLocaleString() : '';
+    text.textContent = `${status.status}: ${status.rows_processed.toLocaleString()}${total} rows, ` +
+        `${Math.round(status.rows_per_second).toLocaleString()} rows/s, ETA ${formatSeconds(status.eta_seconds)}`;
+};
+
+const showResult = (status) => {
+    const bar = document.getElementById('import-progress-bar');
+    const result = document.getElementById('import-result');
+    bar.classList.remove('progress-bar-animated');
+
+    result.classList.remove('d-none');
+    if (status.status === 'succeeded') {
+        result.classList.add('alert-success');
+        result.innerHTML = `${status.message} <a href="/">View dashboard</a>`;
+    } else {
+        bar.classList.add('bg-danger');
+        result.classList.add('alert-danger');
+        result.textContent = status.message;
+    }
+};
+
+const pollStatus = (url) => {
+    fetch(url)
+        .then(response => response.json())
+        .then(status => {
+            updateProgress(status);
+            if (status.status === 'succeeded' || status.status === 'failed') {
+                showResult(status);
+            } else {
+                setTimeout(() => pollStatus(url), POLL_INTERVAL_MS);
+            }
+        })
+        .catch(error => console.error('Error fetching import status:', error));
+};
+
+document.addEventListener('DOMContentLoaded', () => {
+    const card = document.getElementById('import-job');
+    if (card) {
+        pollStatus(card.dataset.statusUrl);
+    }
+});
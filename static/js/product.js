@@ -8,12 +8,11 @@ const fetchData = () => {
     
     // Build URL with filter parameters
     let url = '/api/product-data/';
-    const params = [];
+    // The chart only shows the top 10 products, so request a 10-row first page
+    const params = ['limit=10'];
     if (categoryId) params.push(`category_id=${categoryId}`);
     if (subcategoryId) params.push(`subcategory_id=${subcategoryId}`);
-    if (params.length > 0) {
-        url += '?' + params.join('&');
-    }
+    url += '?' + params.join('&');
     
     // Call API to get data
     fetch(url)